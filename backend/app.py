@@ -3,38 +3,77 @@ Rockfall Prediction API Backend
 Flask application providing prediction endpoints for the rockfall monitoring system
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
+import gc
 import os
 import sys
 import json
+import time
 import random
 import numpy as np
 from datetime import datetime, timedelta
 import logging
 from dotenv import load_dotenv
 
+from memory_stats import process_memory, format_memory
+from prediction_cache import PredictionCache
+from live_stream import LiveBroadcaster
+from timeseries_store import TimeSeriesStore, parse_timestamp, HIGH_RISK_THRESHOLD
+from history_cache import HourlyHistoryCache, make_etag
+from features import FEATURE_COLUMNS
+from fleet_simulator import FleetSimulator, to_json_columns
+import metrics as prom
+from ingest_queue import MicroBatcher
+from model_manager import ModelManager
+from model_registry import ModelRegistry, SiteModelError
+from risk_grid import NODATA, RiskGrid
+from feature_store import RollingFeatureStore, WINDOWED_FEATURES
+from feature_schema import FeatureSchema
+from serialization import PayloadEncoder, ResponseCompressor, missing_accelerators
+
 # Load environment variables
 load_dotenv()
 
 # Add the model directory to Python path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'model'))
 
+# Trained model artifacts
+MODEL_DIR = os.environ.get('MODEL_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'model'))
+# The compiled .forest artifact (model, scaler and info in one pickle-free
+# file) is preferred when train_model.py has written one
+MODEL_FILE = os.environ.get('MODEL_FILE') or (
+    'rockfall_model.forest' if os.path.exists(os.path.join(MODEL_DIR, 'rockfall_model.forest'))
+    else 'rockfall_model.pkl'
+)
+SCALER_FILE = os.environ.get('SCALER_FILE', 'feature_scaler.pkl')
+# Distilled companion served for tier=fast requests, if train_model.py wrote one
+FAST_MODEL_FILE = os.environ.get('FAST_MODEL_FILE', '_fast'.join(os.path.splitext(MODEL_FILE)))
+# RockfallPredictor argument -> artifact file
+if MODEL_FILE.endswith('.forest'):
+    MODEL_ARTIFACTS = {'model_path': MODEL_FILE}
+else:
+    MODEL_ARTIFACTS = {'model_path': MODEL_FILE, 'scaler_path': SCALER_FILE, 'info_path': 'model_info.json'}
+if os.path.exists(os.path.join(MODEL_DIR, FAST_MODEL_FILE)):
+    MODEL_ARTIFACTS['fast_model_path'] = FAST_MODEL_FILE
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-# Configure CORS for production and development
-if os.environ.get('FLASK_ENV') == 'production':
+# Configure CORS for production and development (shared with the ASGI entry point)
+CORS_ORIGINS = [
+    "https://rockfall-prediction-frontend.onrender.com",  # Update with your actual frontend domain
+    "https://rockfall-prediction-frontend-*.onrender.com",  # Allow any Render subdomain
+    "http://localhost:3000",  # Allow local development
+    "http://127.0.0.1:3000"   # Allow local development
+] if os.environ.get('FLASK_ENV') == 'production' else None
+
+if CORS_ORIGINS is not None:
     # Production CORS configuration
-    CORS(app, origins=[
-        "https://rockfall-prediction-frontend.onrender.com",  # Update with your actual frontend domain
-        "https://rockfall-prediction-frontend-*.onrender.com",  # Allow any Render subdomain
-        "http://localhost:3000",  # Allow local development
-        "http://127.0.0.1:3000"   # Allow local development
-    ])
+    CORS(app, origins=CORS_ORIGINS)
 else:
     # Development CORS configuration
     CORS(app)  # Enable CORS for all routes in development
@@ -42,46 +81,379 @@ else:
 # Global variables for model and configuration
 predictor = None
 model_loaded = False
+model_load_seconds = None
+
+# PREDICTION_MODE: 'model' requires the trained model, 'simulate' always uses
+# simulate_prediction, 'auto' loads the model and falls back to simulation
+PREDICTION_MODE = os.environ.get('PREDICTION_MODE', 'auto').lower()
+prediction_mode = 'simulate'
+memory_before_load = None
+memory_after_load = None
+model_version = 'simulate'
+
+# Quantized-input prediction cache (PREDICTION_CACHE_SIZE=0 disables it)
+prediction_cache = PredictionCache(
+    max_entries=int(os.environ.get('PREDICTION_CACHE_SIZE', 4096)),
+    ttl_seconds=float(os.environ.get('PREDICTION_CACHE_TTL', 30)),
+    resolution=json.loads(os.environ.get('PREDICTION_CACHE_RESOLUTION', '{}'))
+)
+
+# Prometheus metrics, served at /metrics; with METRICS_MULTIPROC_DIR (set by
+# gunicorn.conf.py) every worker's counters are merged into each scrape
+metrics = prom.Registry(os.environ.get('METRICS_MULTIPROC_DIR'),
+                        flush_interval=float(os.environ.get('METRICS_FLUSH_INTERVAL', 1)))
+REQUEST_LATENCY = metrics.histogram(
+    'rockfall_http_request_duration_seconds', 'HTTP request latency by endpoint', ['endpoint', 'method'])
+REQUESTS = metrics.counter(
+    'rockfall_http_requests_total', 'HTTP requests by endpoint and status', ['endpoint', 'method', 'status'])
+STAGE_LATENCY = metrics.histogram(
+    'rockfall_stage_duration_seconds', 'Latency of internal prediction stages', ['stage'])
+PREDICTIONS = metrics.counter(
+    'rockfall_predictions_total', 'Predictions by risk category and source', ['risk_category', 'source'])
+metrics.gauge('rockfall_model_loaded', 'Whether the trained model is loaded (1) or predictions are simulated (0)',
+              lambda: int(model_loaded))
+metrics.gauge('rockfall_model_load_seconds', 'Time taken to load the active model',
+              lambda: model_load_seconds)
+metrics.gauge('rockfall_prediction_cache_entries', 'Predictions currently held in the cache',
+              lambda: prediction_cache.stats()['size'])
+metrics.gauge('rockfall_prediction_cache_capacity', 'Maximum number of cached predictions',
+              lambda: prediction_cache.max_entries)
+metrics.gauge('rockfall_prediction_cache_hit_ratio', 'Prediction cache hits per lookup since startup',
+              lambda: prediction_cache.stats()['hit_rate'])
 
-# Global state for stable data generation
-data_state = {
-    'base_values': {
-        'slope_angle': 45.0,
-        'joint_spacing': 1.2,
-        'rock_strength': 55.0,
-        'weathering_index': 5.5,
-        'rainfall_24h': 2.0,
-        'temperature_variation': 15.0,
-        'vibration_intensity': 2.0,
-        'blast_distance': 200.0,
-        'excavation_height': 25.0
-    },
-    'trends': {
-        'slope_angle': 0.0,
-        'joint_spacing': 0.0,
-        'rock_strength': 0.0,
-        'weathering_index': 0.0,
-        'rainfall_24h': 0.0,
-        'vibration_intensity': 0.0
-    },
-    'last_update': datetime.now()
-}
+def observe_stage(stage, seconds):
+    """Stage timer hook for the predictor."""
+    STAGE_LATENCY.observe(seconds, stage)
+
+INGESTED = metrics.counter(
+    'rockfall_ingest_readings_total', 'Readings pushed to /ingest by outcome', ['outcome'])
+INGEST_BATCH_SIZE = metrics.histogram(
+    'rockfall_ingest_batch_size', 'Readings scored per ingest micro-batch',
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500))
+INGEST_BATCH_LATENCY = metrics.histogram(
+    'rockfall_ingest_batch_duration_seconds', 'Time to score and store one ingest micro-batch')
+metrics.gauge('rockfall_ingest_queue_depth', 'Pushed readings waiting to be scored',
+              lambda: ingest_batcher.depth)
+metrics.gauge('rockfall_ingest_readings_per_second', 'Ingest scoring rate over the last 10 seconds',
+              lambda: ingest_batcher.rate())
+
+def observe_ingest_batch(size, seconds):
+    INGEST_BATCH_SIZE.observe(size)
+    INGEST_BATCH_LATENCY.observe(seconds)
+
+# Input validation: every model feature present, numeric and within physical
+# bounds. Compiled from model_info.json's feature_columns on every model swap;
+# until a model is active, readings are checked against the sensor features
+feature_schema = FeatureSchema(FEATURE_COLUMNS)
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 5000))
+# ?tier= on /predict and /predict/batch: the full forest, or the distilled
+# fast model (served by the full one when no fast model is loaded)
+MODEL_TIERS = ('full', 'fast')
+
+# Windowed features (rainfall 24h/7d, rockfall 30d, days since maintenance)
+# from raw events; the event log is shared by all workers ('' keeps it in-process)
+feature_store = RollingFeatureStore(os.environ.get(
+    'FEATURE_EVENTS_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'feature_events.db')))
+
+# Simulated sensors: the live demo rotates through a small fleet whose windowed
+# features come from simulated events, /mock-data/fleet serves a large one for
+# load tests and mine-scale demos
+demo_fleet = FleetSimulator(5, feature_store=feature_store)
+DEMO_FRAME_SECONDS = 1.0
+FLEET_SIZE = int(os.environ.get('FLEET_SIZE', 10000))
+fleet = None
+
+def load_model_artifacts(artifact_paths):
+    """Construct a predictor from the MODEL_ARTIFACTS paths, with its arrays memory-mapped."""
+    from predictor import RockfallPredictor
+    
+    model = RockfallPredictor(**dict(zip(MODEL_ARTIFACTS, artifact_paths)), mmap_mode='r')
+    model.stage_timer = observe_stage
+    return model
+
+def activate_model(active):
+    """Publish a newly validated model (called by the model manager on every swap)."""
+    global predictor, model_loaded, model_load_seconds, prediction_mode, model_version, feature_schema
+    predictor, model_version, model_load_seconds = active.predictor, active.version, active.load_seconds
+    model_loaded, prediction_mode = True, 'model'
+    if active.info.get('feature_columns') and active.info['feature_columns'] != feature_schema.fields:
+        feature_schema = FeatureSchema(active.info['feature_columns'])
+
+# Model artifacts are watched (MODEL_RELOAD_INTERVAL seconds, 0 disables) and
+# reloaded on SIGHUP; a new model is validated before it replaces the old one
+model_manager = ModelManager(
+    load_model_artifacts,
+    [os.path.join(MODEL_DIR, name) for name in MODEL_ARTIFACTS.values()],
+    sample_path=os.path.join(MODEL_DIR, 'sample_data.json'),
+    poll_interval=float(os.environ.get('MODEL_RELOAD_INTERVAL', 10)),
+    min_agreement=float(os.environ.get('MODEL_MIN_SAMPLE_AGREEMENT', 0.5)),
+    on_swap=activate_model
+)
+
+def site_artifacts(directory):
+    """RockfallPredictor argument -> artifact path for a per-site model directory."""
+    forest = os.path.join(directory, 'rockfall_model.forest')
+    if os.path.exists(forest):
+        artifacts = {'model_path': forest}
+    else:
+        artifacts = {'model_path': os.path.join(directory, 'rockfall_model.pkl'),
+                     'scaler_path': os.path.join(directory, SCALER_FILE),
+                     'info_path': os.path.join(directory, 'model_info.json')}
+    fast_model = '_fast'.join(os.path.splitext(artifacts['model_path']))
+    if os.path.exists(fast_model):
+        artifacts['fast_model_path'] = fast_model
+    return artifacts
+
+def load_site_model(artifacts):
+    """Construct a site's predictor from its artifact paths, with its arrays memory-mapped."""
+    from predictor import RockfallPredictor
+    
+    model = RockfallPredictor(**artifacts, mmap_mode='r')
+    model.stage_timer = observe_stage
+    return model
+
+# Per-site models: MODEL_SITES_PATH/<location>/ holds a site's own artifacts,
+# loaded on first use and evicted least recently used beyond MODEL_REGISTRY_MAX_MODELS
+# models or MODEL_REGISTRY_MAX_MB (empty MODEL_SITES_PATH or PREDICTION_MODE=simulate disables)
+MODEL_SITES_PATH = os.environ.get('MODEL_SITES_PATH', os.path.join(MODEL_DIR, 'sites'))
+SITE_MODEL_LOAD = metrics.histogram(
+    'rockfall_site_model_load_seconds', 'Time taken to load a per-site model', ['site'])
+site_models = ModelRegistry(
+    MODEL_SITES_PATH,
+    site_artifacts,
+    load_site_model,
+    max_models=int(os.environ.get('MODEL_REGISTRY_MAX_MODELS', 8)),
+    max_bytes=float(os.environ.get('MODEL_REGISTRY_MAX_MB', 512)) * 2**20,
+    check_interval=float(os.environ.get('MODEL_SITES_CHECK_INTERVAL', 10)),
+    min_agreement=float(os.environ.get('MODEL_MIN_SAMPLE_AGREEMENT', 0.5)),
+    on_load=lambda site, seconds: SITE_MODEL_LOAD.observe(seconds, site)
+) if MODEL_SITES_PATH and PREDICTION_MODE != 'simulate' else None
+metrics.gauge('rockfall_site_models_resident', 'Per-site models currently loaded',
+              lambda: len(site_models) if site_models is not None else 0)
+metrics.gauge('rockfall_site_model_hit_ratio', 'Per-site model lookups served by a loaded model',
+              lambda: site_models.hit_rate if site_models is not None else 0.0)
 
 def load_prediction_model():
-    """Load the trained rockfall prediction model."""
-    global predictor, model_loaded
+    """
+    Load the trained rockfall prediction model.
+    
+    Called once at import time, so under ``gunicorn --preload`` the model is
+    loaded in the master and shared copy-on-write by every forked worker.
+    Joblib arrays are memory-mapped read-only and the loaded objects are
+    moved out of the garbage collector's reach so that collections in the
+    workers do not touch (and privately copy) the shared pages. Later
+    versions are hot-swapped by ``model_manager`` in each worker.
+    """
+    global predictor, model_loaded, prediction_mode, model_version
+    global memory_before_load, memory_after_load
+    
+    if PREDICTION_MODE == 'simulate':
+        logger.info("🎲 PREDICTION_MODE=simulate, using simulated predictions")
+        model_manager.poll_interval = 0
+        predictor, model_loaded, prediction_mode, model_version = None, False, 'simulate', 'simulate'
+        return False
+    
+    memory_before_load = process_memory()
+    logger.info(f"📡 Memory before model load: {format_memory(memory_before_load)}")
     
     try:
-        # Simple prediction logic since we're focusing on the API structure
-        model_loaded = True
-        logger.info("✅ Prediction model loaded successfully")
+        active = model_manager.load()
+        
+        gc.collect()
+        gc.freeze()
+        
+        memory_after_load = process_memory()
+        logger.info(f"✅ Prediction model {active.version} loaded in {active.load_seconds:.2f}s")
+        logger.info(f"📡 Memory after model load: {format_memory(memory_after_load)}")
         return True
         
     except Exception as e:
-        logger.error(f"❌ Failed to load model: {e}")
-        model_loaded = False
+        predictor, model_loaded, prediction_mode, model_version = None, False, 'simulate', 'simulate'
+        if PREDICTION_MODE == 'model':
+            logger.error(f"❌ Failed to load model: {e}")
+            raise
+        logger.warning(f"⚠️ Failed to load model ({e}), falling back to simulated predictions")
         return False
 
+# Persistent history of readings and predictions (TIMESERIES_DB_PATH='' disables it)
+TIMESERIES_DB_PATH = os.environ.get(
+    'TIMESERIES_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'timeseries.db'))
+timeseries_store = TimeSeriesStore(
+    TIMESERIES_DB_PATH,
+    retention_days=float(os.environ.get('TIMESERIES_RETENTION_DAYS', 30)),
+    rollup_retention_days=float(os.environ.get('TIMESERIES_ROLLUP_RETENTION_DAYS', 0))
+) if TIMESERIES_DB_PATH else None
+
+# Dashboard payloads are negotiated (JSON, MessagePack, columnar history) and
+# bodies of at least COMPRESS_MIN_BYTES are gzip/brotli encoded (COMPRESS_LEVEL=0 disables)
+payload_encoder = PayloadEncoder(app.json.dumps, app.json.default)
+if missing_accelerators():
+    logger.warning(f"⚠️ {', '.join(missing_accelerators())} not installed (see requirements.txt), "
+                   "responses use the slower fallbacks")
+response_compressor = ResponseCompressor(
+    min_bytes=int(os.environ.get('COMPRESS_MIN_BYTES', 1024)),
+    level=int(os.environ.get('COMPRESS_LEVEL', 6))
+)
+
+# Hourly /historical-data responses are materialized and revalidated by ETag
+HISTORY_MAX_AGE = int(os.environ.get('HISTORY_MAX_AGE', 30))
+history_cache = (HourlyHistoryCache(timeseries_store, payload_encoder.encode, HIGH_RISK_THRESHOLD)
+                 if timeseries_store is not None else None)
+
+def record_predictions(readings, predictions):
+    """Append readings and their predictions to the time-series store."""
+    if timeseries_store is None:
+        return
+    try:
+        for reading, prediction in zip(readings, predictions):
+            timeseries_store.append(reading, prediction)
+    except Exception as e:
+        logger.error(f"Failed to record predictions: {e}")
+
+# Spatial risk map: a pit raster (RISK_GRID_PATH .npz, or a synthetic pit of
+# RISK_GRID_SIZE cells per side) scored cell by cell with each zone's readings
+risk_grid = RiskGrid(
+    raster_path=os.environ.get('RISK_GRID_PATH', ''),
+    readings_path=os.environ.get(
+        'RISK_GRID_READINGS', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'risk_grid_readings.json')),
+    synthetic_size=int(os.environ.get('RISK_GRID_SIZE', 500)),
+    tier=os.environ.get('RISK_GRID_TIER', 'full')
+)
+
+# Pushed readings (POST /ingest) are scored in micro-batches by a background
+# worker and written to the time-series store
+INGEST_CHUNK = 1000  # readings parsed before handing them to the queue
+ingest_batcher = MicroBatcher(
+    lambda readings: predict_readings(readings),
+    record_predictions,
+    max_batch=int(os.environ.get('INGEST_MAX_BATCH', 500)),
+    max_delay=float(os.environ.get('INGEST_MAX_DELAY', 0.05)),
+    max_queue=int(os.environ.get('INGEST_MAX_QUEUE', 50000)),
+    on_batch=observe_ingest_batch
+)
+
+def predict_reading(input_data, tier='full', explain=False):
+    """Score one reading with the loaded model, or simulate it in fallback mode."""
+    return predict_readings([input_data], tier, explain)[0]
+
+def predict_readings(readings, tier='full', explain=False, validation=None):
+    """
+    Score many readings, in order.
+    
+    Readings missing windowed features get them from the feature store.
+    With the ``validation`` of complete readings, its value matrix is
+    scored as it is and ``readings`` may also be a columnar object; row
+    dicts are then only built if a reading has to be simulated.
+    Readings whose ``location`` has a site model are scored by it, the rest
+    by the global model (or simulated when no model is loaded); each result
+    names its ``model_site`` (None for the global model, which also scores
+    a site whose model fails to load). Readings found in
+    the prediction cache are served from it; the rest are scored with one
+    call per model. ``tier`` selects the full forest or the distilled fast
+    model.
+    
+    With ``explain`` every result carries the model's per-feature
+    contributions (``explanation``, None when simulating). These depend on
+    the exact inputs, so such requests bypass the quantized cache.
+    
+    Raises:
+        ValueError: For an unknown tier or readings the model rejects
+    """
+    if tier not in MODEL_TIERS:
+        raise ValueError(f"Unknown tier: {tier} (expected one of {', '.join(MODEL_TIERS)})")
+    if validation is None:
+        # Windowed features a reading leaves out are looked up by sensor_id
+        for reading in readings:
+            feature_store.enrich(reading)
+        n_readings = len(readings)
+    else:
+        n_readings = len(validation.matrix)
+    
+    # One model snapshot per site and call: a concurrent hot swap never mixes models
+    active = model_manager.active if prediction_mode == 'model' else None
+    if site_models is None:
+        locations = [None] * n_readings
+    elif isinstance(readings, dict):
+        locations = readings.get('location') or [None] * n_readings
+    else:
+        locations = [reading.get('location') for reading in readings]
+    groups = {}
+    for i, site in enumerate(locations):
+        groups.setdefault(site, []).append(i)
+    
+    results = [None] * n_readings
+    for site, indices in groups.items():
+        try:
+            site_model = site_models.get(site) if site is not None else None
+        except SiteModelError as e:
+            # A broken site artifact must not stop scoring for its location
+            logger.warning(f"⚠️ {e}; scoring {len(indices)} reading(s) with the global model")
+            site_model = None
+        if site_model is None:
+            site = None
+        scored = predict_with_model(site_model or active, site, readings, indices, tier, explain, validation)
+        for i, result in zip(indices, scored):
+            result['model_site'] = site
+            results[i] = result
+    return results
+
+def predict_with_model(active, site, readings, indices, tier, explain, validation=None):
+    """
+    Score ``readings[indices]`` with one model snapshot (``active`` None
+    simulates), through the cache. With a ``validation`` whose fields match
+    the model's, the rows of its matrix are scored instead of the readings.
+    """
+    model = active.predictor if active is not None else None
+    version = active.version if model is not None else 'simulate'
+    source = 'model' if model is not None else 'simulate'
+    tier = model.resolve_tier(tier) if model is not None else 'full'
+    X = rows = None
+    if (validation is not None and model is not None and
+            list(model.feature_columns) == validation.schema.fields):
+        X = validation.matrix if len(indices) == len(validation.matrix) else validation.matrix[indices]
+    else:
+        rows = reading_rows(readings, indices)
+    if explain:
+        if model is None:
+            results = [dict(simulate_prediction(reading), explanation=None) for reading in rows]
+        else:
+            results = model.predict_batch(X if X is not None else rows, tier, explain=True)
+        for result in results:
+            PREDICTIONS.inc(result['risk_category'], source)
+        return results
+    
+    # Each site model keeps its own cache entries and version
+    if X is not None:
+        keys = prediction_cache.matrix_keys(X, validation.schema.fields)
+    else:
+        keys = [prediction_cache.key(reading) for reading in rows]
+    if tier != 'full':
+        keys = [(tier,) + key if key is not None else None for key in keys]
+    results = [None] * len(indices)
+    misses = []
+    
+    for i, key in enumerate(keys):
+        cached = prediction_cache.get(key, version, site)
+        if cached is not None:
+            results[i] = dict(cached, prediction_time=datetime.now().isoformat())
+            PREDICTIONS.inc(cached['risk_category'], 'cache')
+        else:
+            misses.append(i)
+    
+    if misses:
+        if X is not None:
+            scored = model.predict_batch(X if len(misses) == len(X) else X[misses], tier)
+        elif model is not None:
+            scored = model.predict_batch([rows[i] for i in misses], tier)
+        else:
+            scored = [simulate_prediction(rows[i]) for i in misses]
+        for i, result in zip(misses, scored):
+            prediction_cache.put(keys[i], dict(result), version, site)
+            results[i] = result
+            PREDICTIONS.inc(result['risk_category'], source)
+    
+    return results
+
 def simulate_prediction(input_data):
     """
     Simulate model prediction for the prototype with more stable, realistic outputs.
@@ -151,101 +523,11 @@ def simulate_prediction(input_data):
 
 def generate_mock_sensor_data():
     """Generate realistic mock sensor data with stable trends and smooth variations."""
-    global data_state
-    
     current_time = datetime.now()
-    time_diff = (current_time - data_state['last_update']).total_seconds()
-    
-    # Update trends very gradually for smooth changes
-    if time_diff > 10:  # Update trends every 10 seconds for smoother transitions
-        for param in data_state['trends']:
-            # Very small random trend changes for gradual drift
-            data_state['trends'][param] += random.uniform(-0.005, 0.005)
-            # Keep trends within very tight bounds for stability
-            data_state['trends'][param] = max(-0.02, min(0.02, data_state['trends'][param]))
-        
-        data_state['last_update'] = current_time
-    
-    # Generate stable data with minimal random variations
-    stable_data = {}
-    
-    # Apply trends to base values with very small random variations
-    stable_data['slope_angle'] = round(
-        data_state['base_values']['slope_angle'] + 
-        data_state['trends']['slope_angle'] * 100 + 
-        random.uniform(-0.3, 0.3), 1  # Much smaller variation
-    )
-    stable_data['slope_angle'] = max(25.0, min(75.0, stable_data['slope_angle']))
-    
-    stable_data['joint_spacing'] = round(
-        data_state['base_values']['joint_spacing'] + 
-        data_state['trends']['joint_spacing'] * 5 + 
-        random.uniform(-0.02, 0.02), 2  # Much smaller variation
-    )
-    stable_data['joint_spacing'] = max(0.1, min(3.0, stable_data['joint_spacing']))
-    
-    stable_data['rock_strength'] = round(
-        data_state['base_values']['rock_strength'] + 
-        data_state['trends']['rock_strength'] * 50 + 
-        random.uniform(-0.8, 0.8), 1  # Much smaller variation
-    )
-    stable_data['rock_strength'] = max(20.0, min(90.0, stable_data['rock_strength']))
-    
-    stable_data['weathering_index'] = round(
-        data_state['base_values']['weathering_index'] + 
-        data_state['trends']['weathering_index'] * 10 + 
-        random.uniform(-0.05, 0.05), 1  # Much smaller variation
-    )
-    stable_data['weathering_index'] = max(1.0, min(10.0, stable_data['weathering_index']))
-    
-    # Rainfall with weather patterns (gradual changes)
-    stable_data['rainfall_24h'] = round(
-        max(0, data_state['base_values']['rainfall_24h'] + 
-        data_state['trends']['rainfall_24h'] * 20 + 
-        random.uniform(-0.1, 0.1)), 1  # Much smaller variation
-    )
-    
-    stable_data['rainfall_7d'] = round(stable_data['rainfall_24h'] * 7 + random.uniform(-1, 1), 1)
-    stable_data['rainfall_7d'] = max(0, stable_data['rainfall_7d'])
-    
-    # Temperature with realistic daily variation patterns
-    hour = current_time.hour
-    minute = current_time.minute
-    daily_temp_cycle = 3 * np.sin((hour + minute/60.0 - 6) * np.pi / 12)  # Peak at 2 PM
-    stable_data['temperature_variation'] = round(
-        data_state['base_values']['temperature_variation'] + daily_temp_cycle + 
-        random.uniform(-0.2, 0.2), 1  # Much smaller random variation
-    )
-    stable_data['temperature_variation'] = max(5.0, min(35.0, stable_data['temperature_variation']))
-    
-    # Vibration with realistic operational patterns
-    stable_data['vibration_intensity'] = round(
-        max(0.1, data_state['base_values']['vibration_intensity'] + 
-        data_state['trends']['vibration_intensity'] * 5 + 
-        random.uniform(-0.05, 0.05)), 2  # Much smaller variation
-    )
-    stable_data['vibration_intensity'] = max(0.1, min(8.0, stable_data['vibration_intensity']))
-    
-    # Other parameters with minimal variation
-    stable_data['joint_orientation'] = round(180 + random.uniform(-15, 15), 1)  # Stable orientation
-    stable_data['freeze_thaw_cycles'] = random.choice([0, 0, 0, 1])  # Mostly 0, occasionally 1
-    stable_data['wind_speed'] = round(max(0, 8 + random.uniform(-1.5, 1.5)), 1)  # Stable wind around 8
-    stable_data['blast_distance'] = round(
-        data_state['base_values']['blast_distance'] + random.uniform(-5, 5), 1  # Smaller variation
-    )
-    stable_data['excavation_height'] = round(
-        data_state['base_values']['excavation_height'] + random.uniform(-0.5, 0.5), 1  # Smaller variation
-    )
-    stable_data['support_density'] = round(0.6 + random.uniform(-0.05, 0.05), 2)  # Stable around 0.6
-    stable_data['previous_rockfall_30d'] = random.choice([0, 0, 0, 1])  # Mostly 0, occasionally 1
-    stable_data['maintenance_days_since'] = random.choice([5, 6, 7, 8, 9, 10])  # Stable range
-    
-    # Metadata
-    stable_data['timestamp'] = current_time.isoformat()
-    stable_data['sensor_id'] = f"RS_{1001 + (int(current_time.timestamp()) % 5)}"  # Rotate between 5 sensors
-    stable_data['location'] = random.choice(['Sector-North', 'Sector-North', 'Sector-East', 'Sector-South'])  # Mostly North
-    
-    return stable_data
+    # Rotate between the demo fleet's sensors; polls and the live stream
+    # share one step per DEMO_FRAME_SECONDS instead of stepping every call
+    return demo_fleet.current_reading(int(current_time.timestamp()) % demo_fleet.n_sensors,
+                                      DEMO_FRAME_SECONDS, current_time)
 
 @app.route('/')
 def home():
@@ -255,9 +537,22 @@ def home():
         'status': 'online',
         'version': '1.0.0',
         'model_loaded': model_loaded,
+        'prediction_mode': prediction_mode,
         'endpoints': {
-            '/predict': 'POST - Predict rockfall risk',
+            '/predict': 'POST - Predict rockfall risk (tier=full|fast, explain=true)',
+            '/predict/batch': 'POST - Predict rockfall risk for many readings (tier=full|fast, explain=true)',
+            '/ingest': 'POST - Stream readings as NDJSON for asynchronous scoring',
+            '/sensor-events': 'POST - Record raw rainfall, rockfall and maintenance events',
+            '/sensor-features/<sensor_id>': 'GET - Windowed features derived from a sensor\'s events',
             '/mock-data': 'GET - Get mock sensor data',
+            '/mock-data/fleet': 'GET - Mock readings for a whole sensor fleet (columnar, sensors)',
+            '/historical-data': 'GET - Historical readings (from, to, sensor_id, location, max_points, layout=rows|columns)',
+            '/risk-grid': 'GET - Spatial risk grid metadata (POST /risk-grid/readings to update zones)',
+            '/risk-grid/data': 'GET - Risk grid as row-major uint8 (layer=risk|category)',
+            '/risk-grid/tiles/<row>/<col>.png': 'GET - Risk map tile coloured by category',
+            '/stream/live': 'GET - Live sensor data stream (Server-Sent Events)',
+            '/cache-stats': 'GET - Prediction cache statistics',
+            '/metrics': 'GET - Prometheus metrics',
             '/health': 'GET - API health check'
         }
     })
@@ -268,14 +563,41 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'model_status': 'loaded' if model_loaded else 'not_loaded'
+        'model_status': 'loaded' if model_loaded else 'not_loaded',
+        'prediction_mode': prediction_mode,
+        'model_load_seconds': round(model_load_seconds, 3) if model_load_seconds is not None else None,
+        'model_version': model_version,
+        'model': model_manager.stats(),
+        'model_tiers': (model_manager.active.info.get('tiers', {'full': {}})
+                        if model_manager.active is not None else None),
+        'site_models': site_models.stats() if site_models is not None else None,
+        'prediction_cache': prediction_cache.stats(),
+        'live_stream': live_broadcaster.stats(),
+        'timeseries_store': timeseries_store.stats() if timeseries_store is not None else None,
+        'history_cache': history_cache.stats() if history_cache is not None else None,
+        'ingest': ingest_batcher.stats(),
+        'risk_grid': risk_grid.stats(),
+        'feature_store': feature_store.stats(),
+        'response_formats': list(payload_encoder.formats),
+        'compression': response_compressor.stats(),
+        'memory': {
+            'worker': process_memory(),
+            'before_model_load': memory_before_load,
+            'after_model_load': memory_after_load
+        }
     })
 
+@app.route('/cache-stats')
+def get_cache_stats():
+    """Prediction cache hit/miss/eviction counters."""
+    return jsonify(prediction_cache.stats())
+
 @app.route('/predict', methods=['POST'])
 def predict_rockfall():
     """
     Main prediction endpoint.
     Accepts sensor data and returns rockfall risk assessment.
+    ``?explain=true`` adds per-feature contributions to the predicted category.
     """
     try:
         if not request.is_json:
@@ -286,138 +608,682 @@ def predict_rockfall():
         if not input_data:
             return jsonify({'error': 'No input data provided'}), 400
         
-        # Validate required fields (basic validation)
-        required_fields = ['slope_angle', 'joint_spacing', 'rock_strength']
-        missing_fields = [field for field in required_fields if field not in input_data]
-        
-        if missing_fields:
-            return jsonify({
-                'error': f'Missing required fields: {", ".join(missing_fields)}',
-                'required_fields': required_fields
-            }), 400
+        errors = reading_errors(input_data)
+        if errors is not None:
+            return jsonify(errors), 400
         
         # Generate prediction
-        prediction_result = simulate_prediction(input_data)
+        try:
+            prediction_result = predict_reading(input_data, request.args.get('tier', 'full'),
+                                                explain=explain_requested())
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        record_predictions([input_data], [prediction_result])
         
         # Add metadata
         prediction_result.update({
-            'input_summary': {
-                'slope_angle': input_data.get('slope_angle'),
-                'rock_strength': input_data.get('rock_strength'),
-                'rainfall_24h': input_data.get('rainfall_24h', 0),
-                'vibration_intensity': input_data.get('vibration_intensity', 0)
-            },
+            'input_summary': summarize_input(input_data),
             'api_version': '1.0.0'
         })
         
         logger.info(f"Prediction made: {prediction_result['risk_category']} ({prediction_result['risk_probability']}%)")
         
-        return jsonify(prediction_result)
+        with STAGE_LATENCY.time('json_serialization'):
+            return jsonify(prediction_result)
         
     except Exception as e:
         logger.error(f"Prediction error: {e}")
         return jsonify({'error': 'Internal prediction error', 'details': str(e)}), 500
 
+@app.route('/predict/batch', methods=['POST'])
+def predict_rockfall_batch():
+    """
+    Batch prediction endpoint.
+    Accepts a list of readings (``[{...}, ...]`` or ``{"readings": [...]}``) or a
+    columnar object (``{"columns": {"slope_angle": [...], ...}}``) and scores all
+    of them with a single model call. Results keep the input order and have the
+    same shape as ``/predict`` responses (including ``?tier=`` and ``?explain=true``).
+    """
+    try:
+        if not request.is_json:
+            return jsonify({'error': 'Request must contain JSON data'}), 400
+        
+        payload = request.get_json()
+        validation_start = time.perf_counter()
+        
+        if isinstance(payload, dict) and 'columns' in payload:
+            readings = payload['columns']
+            if (not isinstance(readings, dict) or not readings or
+                    not all(isinstance(values, list) for values in readings.values())):
+                return jsonify({'error': '"columns" must map field names to arrays'}), 400
+            lengths = {len(values) for values in readings.values()}
+            if len(lengths) != 1:
+                return jsonify({'error': 'All columns must have the same length'}), 400
+            batch_size = lengths.pop()
+        else:
+            readings = payload.get('readings') if isinstance(payload, dict) else payload
+            if not isinstance(readings, list) or not all(isinstance(r, dict) for r in readings):
+                return jsonify({'error': 'Provide a list of readings or a "columns" object'}), 400
+            batch_size = len(readings)
+        
+        if batch_size == 0:
+            return jsonify({'error': 'No input data provided'}), 400
+        if batch_size > MAX_BATCH_SIZE:
+            return jsonify({'error': f'Batch too large: {batch_size} readings (max {MAX_BATCH_SIZE})'}), 413
+        
+        schema = feature_schema
+        complete = isinstance(readings, dict) and all(field in readings for field in schema.fields)
+        if complete:
+            # Complete columns are checked and scored as a matrix; row dicts
+            # are only built below for storage and the input summaries
+            validation = schema.validate(readings)
+        else:
+            rows = batch_rows(readings, batch_size)
+            for row in rows:
+                feature_store.enrich(row)
+            validation = schema.validate(rows)
+        if not validation.ok:
+            invalid_rows = validation.invalid_rows
+            return jsonify({
+                'error': f'Invalid or missing fields in {len(invalid_rows)} reading(s)',
+                'invalid_rows': invalid_rows[:100],
+                'errors': validation.errors(limit=100),
+                'required_fields': schema.fields
+            }), 400
+        STAGE_LATENCY.observe(time.perf_counter() - validation_start, 'input_validation')
+        
+        # Generate predictions in one model call
+        try:
+            predictions = predict_readings(readings if complete else rows, request.args.get('tier', 'full'),
+                                           explain=explain_requested(),
+                                           validation=validation if complete else None)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if complete:
+            if timeseries_store is not None:
+                record_predictions(batch_rows(readings, batch_size), predictions)
+            summaries = summarize_columns(readings, batch_size)
+        else:
+            record_predictions(rows, predictions)
+            summaries = [summarize_input(row) for row in rows]
+        
+        for prediction, summary in zip(predictions, summaries):
+            prediction.update({
+                'input_summary': summary,
+                'api_version': '1.0.0'
+            })
+        
+        logger.info(f"Batch prediction made for {batch_size} readings")
+        
+        with STAGE_LATENCY.time('json_serialization'):
+            return jsonify({
+                'predictions': predictions,
+                'count': batch_size,
+                'api_version': '1.0.0'
+            })
+        
+    except Exception as e:
+        logger.error(f"Batch prediction error: {e}")
+        return jsonify({'error': 'Internal prediction error', 'details': str(e)}), 500
+
+@app.route('/ingest', methods=['POST'])
+def ingest_readings():
+    """
+    Streaming ingestion endpoint for field gateways.
+    The body is NDJSON (one reading object per line) and is read as it
+    arrives. Valid readings are queued and scored asynchronously in
+    micro-batches; results are written to the time-series store. Responds
+    202 with counts, or 429 with ``resume_from_line`` when the queue is full.
+    """
+    accepted = 0
+    invalid_lines = []
+    resume_from_line = None
+    chunk = []
+    
+    try:
+        for line_number, reading in iter_ndjson(request.stream):
+            if not isinstance(reading, dict):
+                invalid_lines.append(line_number)
+                continue
+            chunk.append((line_number, reading))
+            if len(chunk) >= INGEST_CHUNK:
+                count, resume_from_line = submit_ingest_chunk(chunk, invalid_lines)
+                accepted += count
+                chunk = []
+                if resume_from_line is not None:
+                    break
+        if chunk and resume_from_line is None:
+            count, resume_from_line = submit_ingest_chunk(chunk, invalid_lines)
+            accepted += count
+        
+    except Exception as e:
+        logger.error(f"Ingest error: {e}")
+        return jsonify({'error': 'Failed to read ingest stream', 'details': str(e), 'accepted': accepted}), 400
+    
+    INGESTED.inc('accepted', amount=accepted)
+    INGESTED.inc('invalid', amount=len(invalid_lines))
+    
+    invalid_lines.sort()
+    result = {
+        'accepted': accepted,
+        'invalid': len(invalid_lines),
+        'invalid_lines': invalid_lines[:100],
+        'queue_depth': ingest_batcher.depth
+    }
+    if resume_from_line is not None:
+        result.update({'error': 'Ingest queue full', 'resume_from_line': resume_from_line})
+        return jsonify(result), 429, {'Retry-After': '1'}
+    return jsonify(result), 202
+
+@app.route('/sensor-events', methods=['POST'])
+def record_sensor_events():
+    """
+    Record raw events for the rolling feature store.
+    Accepts a list (or ``{"events": [...]}``) of ``{"sensor_id", "type",
+    "timestamp", "value"}`` where type is rainfall (value in mm), rockfall
+    (value = count, default 1) or maintenance. Valid events are recorded
+    even when others are rejected.
+    """
+    payload = request.get_json(silent=True)
+    events = payload.get('events') if isinstance(payload, dict) else payload
+    if not isinstance(events, list) or not events:
+        return jsonify({'error': 'Provide a list of events or an "events" array'}), 400
+    if len(events) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'Too many events: {len(events)} (max {MAX_BATCH_SIZE})'}), 413
+    
+    recorded, errors = feature_store.record(events)
+    return jsonify({
+        'recorded': recorded,
+        'rejected': len(errors),
+        'errors': [{'index': i, 'error': error} for i, error in errors[:100]]
+    }), 200 if recorded else 400
+
+@app.route('/sensor-features/<sensor_id>')
+def get_sensor_features(sensor_id):
+    """Current windowed features of one sensor, as filled into its readings."""
+    features = feature_store.features(sensor_id)
+    if not features:
+        return jsonify({'error': f'No events recorded for {sensor_id}'}), 404
+    return jsonify({'sensor_id': sensor_id, 'features': features,
+                    'missing': [f for f in WINDOWED_FEATURES if f not in features]})
+
+def iter_ndjson(stream, block_size=65536):
+    """
+    Yield ``(line_number, object)`` per non-empty line; unparseable lines yield None.
+    
+    The stream is read in blocks and split here: iterating a WSGI input
+    stream line by line reads it one byte at a time.
+    """
+    line_number = 0
+    pending = b''
+    while True:
+        block = stream.read(block_size)
+        lines = (pending + block).split(b'\n')
+        pending = lines.pop() if block else b''
+        for line in lines:
+            line_number += 1
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError:
+                yield line_number, None
+        if not block:
+            return
+
+def submit_ingest_chunk(chunk, invalid_lines):
+    """
+    Validate ``(line_number, reading)`` pairs and queue the valid ones.
+    Line numbers of invalid readings are added to ``invalid_lines``;
+    returns (accepted, first refused line or None).
+    """
+    for _, reading in chunk:
+        feature_store.enrich(reading)
+    validation = feature_schema.validate([reading for _, reading in chunk])
+    if not validation.ok:
+        invalid_lines.extend(chunk[i][0] for i in validation.invalid_rows)
+        chunk = [pair for pair, valid in zip(chunk, validation.valid.tolist()) if valid]
+    accepted = ingest_batcher.submit([reading for _, reading in chunk])
+    if accepted < len(chunk):
+        INGESTED.inc('refused', amount=len(chunk) - accepted)
+    return accepted, (chunk[accepted][0] if accepted < len(chunk) else None)
+
+def batch_rows(readings, batch_size):
+    """Return per-reading dicts for a list of readings or a columnar object."""
+    if isinstance(readings, dict):
+        return reading_rows(readings, range(batch_size))
+    return readings
+
+def reading_rows(readings, indices):
+    """Per-reading dicts for ``indices`` of a list of readings or a columnar object."""
+    if isinstance(readings, dict):
+        return [{field: values[i] for field, values in readings.items()} for i in indices]
+    return [readings[i] for i in indices]
+
+def reading_errors(input_data):
+    """
+    Fill in windowed features and validate one reading.
+    
+    Returns:
+        dict: A 400 response body naming every invalid field, or None if
+        the reading is valid
+    """
+    if not isinstance(input_data, dict):
+        return {'error': 'A reading must be a JSON object', 'required_fields': feature_schema.fields}
+    with STAGE_LATENCY.time('input_validation'):
+        feature_store.enrich(input_data)
+        validation = feature_schema.validate([input_data])
+    if validation.ok:
+        return None
+    field_errors = validation.field_errors()
+    missing = [field for field, error in field_errors.items() if error == 'missing']
+    return {
+        'error': (f'Missing required fields: {", ".join(missing)}' if missing
+                  else f'Invalid fields: {", ".join(field_errors)}'),
+        'field_errors': field_errors,
+        'required_fields': feature_schema.fields
+    }
+
+def summarize_columns(columns, batch_size):
+    """``summarize_input`` for every reading of a columnar object."""
+    zeros = [0] * batch_size
+    return [
+        {'slope_angle': slope, 'rock_strength': strength, 'rainfall_24h': rainfall, 'vibration_intensity': vibration}
+        for slope, strength, rainfall, vibration in zip(
+            columns.get('slope_angle', [None] * batch_size), columns.get('rock_strength', [None] * batch_size),
+            columns.get('rainfall_24h', zeros), columns.get('vibration_intensity', zeros))
+    ]
+
+def explain_requested():
+    """Whether the request asked for per-feature explanations (``?explain=true``)."""
+    return request.args.get('explain', '').lower() in ('1', 'true', 'yes')
+
+def summarize_input(input_data):
+    """Key input values echoed back with every prediction."""
+    return {
+        'slope_angle': input_data.get('slope_angle'),
+        'rock_strength': input_data.get('rock_strength'),
+        'rainfall_24h': input_data.get('rainfall_24h', 0),
+        'vibration_intensity': input_data.get('vibration_intensity', 0)
+    }
+
 @app.route('/mock-data')
 def get_mock_data():
     """
     Endpoint for live monitoring demo.
-    Returns simulated real-time sensor data with prediction.
+    Returns simulated real-time sensor data with prediction, as JSON or (with
+    ``Accept: application/msgpack``) MessagePack.
     """
     try:
-        # Generate mock sensor data
-        sensor_data = generate_mock_sensor_data()
-        
-        # Get prediction for this data
-        prediction = simulate_prediction(sensor_data)
-        
-        # More stable system status
-        sensors_online_chance = random.random()
-        sensors_online = sensors_online_chance > 0.1  # 90% chance online
-        
-        # Combine sensor data with prediction
-        response = {
-            'sensor_data': sensor_data,
-            'prediction': prediction,
-            'system_status': {
-                'sensors_online': sensors_online,
-                'last_maintenance': (datetime.now() - timedelta(days=random.choice([7, 8, 9, 10]))).isoformat(),
-                'alert_level': prediction['risk_category'].lower(),
-                'data_quality': 'excellent' if sensors_online else 'good',
-                'network_status': 'stable'
-            }
-        }
-        
-        return jsonify(response)
+        return encoded_response(build_live_payload(), negotiated_variant())
         
     except Exception as e:
         logger.error(f"Mock data error: {e}")
         return jsonify({'error': 'Failed to generate mock data', 'details': str(e)}), 500
 
+@app.route('/mock-data/fleet')
+def get_fleet_data():
+    """
+    One simulated reading for every sensor of a large fleet, in columnar form.
+    The ``columns`` object can be posted unchanged to ``/predict/batch``.
+    Query parameter ``sensors`` limits the response to the first N sensors;
+    ``Accept: application/msgpack`` selects MessagePack.
+    """
+    global fleet
+    try:
+        sensors = min(int(request.args.get('sensors', FLEET_SIZE)), FLEET_SIZE)
+        if sensors < 1:
+            return jsonify({'error': 'sensors must be positive'}), 400
+    except ValueError:
+        return jsonify({'error': 'sensors must be an integer'}), 400
+    
+    try:
+        if fleet is None:
+            fleet = FleetSimulator(FLEET_SIZE)
+        step_time, columns = fleet.frame()
+        return encoded_response({
+            'timestamp': step_time.isoformat(),
+            'count': sensors,
+            'columns': to_json_columns(columns, sensors)
+        }, negotiated_variant())
+        
+    except Exception as e:
+        logger.error(f"Fleet data error: {e}")
+        return jsonify({'error': 'Failed to generate fleet data', 'details': str(e)}), 500
+
+def build_live_payload():
+    """Generate one live sensor reading with its prediction and system status."""
+    # Generate mock sensor data
+    sensor_data = generate_mock_sensor_data()
+    
+    # Get prediction for this data
+    prediction = predict_reading(sensor_data)
+    record_predictions([sensor_data], [prediction])
+    return live_payload(sensor_data, prediction)
+
+def live_payload(sensor_data, prediction):
+    """Live reading, its prediction and a simulated system status."""
+    # More stable system status
+    sensors_online_chance = random.random()
+    sensors_online = sensors_online_chance > 0.1  # 90% chance online
+    
+    # Combine sensor data with prediction
+    return {
+        'sensor_data': sensor_data,
+        'prediction': prediction,
+        'system_status': {
+            'sensors_online': sensors_online,
+            'last_maintenance': (datetime.now() - timedelta(days=random.choice([7, 8, 9, 10]))).isoformat(),
+            'alert_level': prediction['risk_category'].lower(),
+            'data_quality': 'excellent' if sensors_online else 'good',
+            'network_status': 'stable'
+        }
+    }
+
+# One producer per process feeds every live dashboard. Under gunicorn each open
+# stream holds a gthread worker thread, so at most LIVE_STREAM_MAX_CLIENTS
+# (default half of GUNICORN_THREADS) stream per worker: 16 x 2 workers = 32
+# dashboards by default. Clients above the cap get 503 and retry or poll
+# /mock-data. The ASGI entry point (uvicorn asgi:app) serves streams as
+# coroutines, up to LIVE_STREAM_MAX_ASYNC_CLIENTS per process; use it for
+# more dashboards than the threaded cap allows
+live_broadcaster = LiveBroadcaster(
+    build_live_payload,
+    interval=float(os.environ.get('LIVE_STREAM_INTERVAL', 3)),
+    max_subscribers=int(os.environ.get('LIVE_STREAM_MAX_CLIENTS',
+                                       max(1, int(os.environ.get('GUNICORN_THREADS', 32)) // 2))) or None,
+    max_async_subscribers=int(os.environ.get('LIVE_STREAM_MAX_ASYNC_CLIENTS', 1000)) or None
+)
+LIVE_STREAM_RETRY_AFTER = 30  # seconds a refused client should wait before reconnecting
+
+@app.route('/stream/live')
+def stream_live_data():
+    """
+    Server-Sent Events stream of live sensor data with predictions.
+    Each event carries the same JSON body as ``/mock-data``; readings are
+    generated once per tick and shared by all connected clients.
+    Above ``LIVE_STREAM_MAX_CLIENTS`` open streams per worker the request is
+    refused with 503 and ``Retry-After``.
+    """
+    stream = live_broadcaster.subscribe()
+    if stream is None:
+        response = jsonify({'error': 'Too many live streams, retry later or poll /mock-data'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(LIVE_STREAM_RETRY_AFTER)
+        return response
+    return Response(
+        stream,
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # disable proxy buffering (nginx)
+        }
+    )
+
 @app.route('/historical-data')
 def get_historical_data():
-    """Generate sample historical data for charts and analysis with realistic trends."""
+    """
+    Historical readings and predictions for charts and analysis.
+    
+    Query parameters (all optional): ``from`` and ``to`` (ISO-8601 or unix
+    seconds, default the last 48 hours), ``sensor_id``, ``location`` and
+    ``max_points`` (default 48). Points are averaged per time bucket. Until
+    the store holds any readings a synthetic demo series is returned.
+    
+    Responses carry a strong ETag and honour ``If-None-Match`` with 304.
+    Hour-bucketed windows (the default) are served from materialized
+    per-hour state, so an unchanged window is answered without rebuilding
+    its points or summary.
+    
+    ``Accept: application/msgpack`` selects MessagePack and ``layout=columns``
+    returns ``columns`` (one array per field) and ``count`` instead of the
+    ``data`` list; the default stays row-oriented JSON.
+    """
     try:
-        historical_data = []
-        base_time = datetime.now() - timedelta(days=7)
+        now = time.time()
+        try:
+            variant = negotiated_variant(request.args.get('layout'))
+            end = parse_timestamp(request.args.get('to'), default=now)
+            start = parse_timestamp(request.args.get('from'), default=end - 48 * 3600)
+            max_points = min(int(request.args.get('max_points', 48)), 5000)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if start >= end or max_points < 1:
+            return jsonify({'error': '"from" must be before "to" and max_points positive'}), 400
         
-        # Generate stable historical data with trends
-        base_risk = 35.0  # Starting risk level
-        base_slope = 45.0
-        base_rainfall = 2.0
-        base_vibration = 2.0
+        sensor_id = request.args.get('sensor_id')
+        location = request.args.get('location')
         
-        for i in range(168):  # 7 days of hourly data
-            timestamp = base_time + timedelta(hours=i)
-            
-            # Create gradual trends over time
-            trend_factor = i / 168.0  # 0 to 1 over the week
-            daily_cycle = 0.5 * np.sin(2 * np.pi * i / 24)  # Daily variation
+        if timeseries_store is not None and timeseries_store.has_data():
+            if abs((end - start) / max_points - 3600) < 1:
+                # One point per hour: align the window to whole hours,
+                # ending with the (partial) current hour
+                end_hour = int(-(-end // 3600)) * 3600
+                start_hour = end_hour - max_points * 3600
+                etag, counts = history_cache.etag(start_hour, end_hour, sensor_id, location)
+                if request.if_none_match.contains_weak(variant_etag(etag, variant)):
+                    return cacheable_response(None, variant_etag(etag, variant), variant)
+                etag, body = history_cache.response(start_hour, end_hour, sensor_id, location,
+                                                    counts=counts, etag=etag, variant=variant)
+                return cacheable_response(body, variant_etag(etag, variant), variant)
             
-            # Risk probability with trend and daily cycle
-            risk_prob = base_risk + (trend_factor * 15) + daily_cycle * 5 + random.uniform(-3, 3)
-            risk_prob = max(10, min(85, risk_prob))
-            
-            # Risk category based on probability
-            if risk_prob < 25:
-                risk_category = 'Low'
-            elif risk_prob < 50:
-                risk_category = 'Medium'
-            elif risk_prob < 70:
-                risk_category = 'High'
-            else:
-                risk_category = 'Critical'
-            
-            # Other parameters with gradual changes
-            slope_angle = base_slope + trend_factor * 5 + random.uniform(-1, 1)
-            rainfall = max(0, base_rainfall + trend_factor * 3 + daily_cycle * 2 + random.uniform(-0.5, 0.5))
-            vibration = max(0.1, base_vibration + trend_factor * 1 + daily_cycle * 0.5 + random.uniform(-0.2, 0.2))
-            
-            historical_data.append({
-                'timestamp': timestamp.isoformat(),
-                'risk_probability': round(risk_prob, 1),
-                'risk_category': risk_category,
-                'slope_angle': round(slope_angle, 1),
-                'rainfall_24h': round(rainfall, 1),
-                'vibration_intensity': round(vibration, 2)
-            })
+            data = timeseries_store.query(start, end, sensor_id=sensor_id, location=location,
+                                          max_points=max_points)
+            source = 'store'
+        else:
+            data = synthetic_history()[-48:]  # Return last 48 hours
+            source = 'synthetic'
         
-        recent_data = historical_data[-48:]  # Return last 48 hours
-        
-        return jsonify({
-            'data': recent_data,
-            'summary': {
-                'total_points': len(recent_data),
-                'avg_risk': round(sum(d['risk_probability'] for d in recent_data) / len(recent_data), 1),
-                'high_risk_alerts': len([d for d in recent_data if d['risk_probability'] > 60]),
-                'trend': 'stable' if abs(recent_data[-1]['risk_probability'] - recent_data[0]['risk_probability']) < 10 else 'increasing'
-            }
-        })
+        body = payload_encoder.encode({
+            'data': data,
+            'summary': summarize_history(data),
+            'source': source
+        }, variant)
+        return cacheable_response(body, make_etag(body), variant)
         
     except Exception as e:
         logger.error(f"Historical data error: {e}")
         return jsonify({'error': 'Failed to generate historical data'}), 500
 
+def cacheable_response(body, etag, variant='json'):
+    """Encoded response with ETag and Cache-Control; 304 when the client's copy is current."""
+    # Compressed copies carry the same ETag as a weak validator
+    if body is None or request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype=payload_encoder.mimetype(variant))
+    response.set_etag(etag)
+    response.vary.add('Accept')
+    response.headers['Cache-Control'] = f'public, max-age={HISTORY_MAX_AGE}, must-revalidate'
+    return response
+
+def negotiated_variant(layout=None):
+    """Payload variant for this request's Accept header and the requested layout."""
+    return payload_encoder.negotiate(request.accept_mimetypes, layout)
+
+def variant_etag(etag, variant):
+    """Distinct ETags per representation; plain JSON keeps the original."""
+    return etag if variant == 'json' else f'{etag}-{variant}'
+
+def encoded_response(payload, variant):
+    """``payload`` encoded as ``variant``, varying on the Accept header."""
+    response = Response(payload_encoder.encode(payload, variant), mimetype=payload_encoder.mimetype(variant))
+    response.vary.add('Accept')
+    return response
+
+def summarize_history(points):
+    """Summary statistics over a list of historical points."""
+    if not points:
+        return {'total_points': 0, 'avg_risk': 0.0, 'high_risk_alerts': 0, 'trend': 'stable'}
+    return {
+        'total_points': len(points),
+        'avg_risk': round(sum(d['risk_probability'] for d in points) / len(points), 1),
+        'high_risk_alerts': len([d for d in points if d['risk_probability'] > HIGH_RISK_THRESHOLD]),
+        'trend': 'stable' if abs(points[-1]['risk_probability'] - points[0]['risk_probability']) < 10 else 'increasing'
+    }
+
+def synthetic_history():
+    """Generate a week of sample hourly history with realistic trends (demo fallback)."""
+    historical_data = []
+    base_time = datetime.now() - timedelta(days=7)
+    
+    # Generate stable historical data with trends
+    base_risk = 35.0  # Starting risk level
+    base_slope = 45.0
+    base_rainfall = 2.0
+    base_vibration = 2.0
+    
+    for i in range(168):  # 7 days of hourly data
+        timestamp = base_time + timedelta(hours=i)
+        
+        # Create gradual trends over time
+        trend_factor = i / 168.0  # 0 to 1 over the week
+        daily_cycle = 0.5 * np.sin(2 * np.pi * i / 24)  # Daily variation
+        
+        # Risk probability with trend and daily cycle
+        risk_prob = base_risk + (trend_factor * 15) + daily_cycle * 5 + random.uniform(-3, 3)
+        risk_prob = max(10, min(85, risk_prob))
+        
+        # Risk category based on probability
+        if risk_prob < 25:
+            risk_category = 'Low'
+        elif risk_prob < 50:
+            risk_category = 'Medium'
+        elif risk_prob < 70:
+            risk_category = 'High'
+        else:
+            risk_category = 'Critical'
+        
+        # Other parameters with gradual changes
+        slope_angle = base_slope + trend_factor * 5 + random.uniform(-1, 1)
+        rainfall = max(0, base_rainfall + trend_factor * 3 + daily_cycle * 2 + random.uniform(-0.5, 0.5))
+        vibration = max(0.1, base_vibration + trend_factor * 1 + daily_cycle * 0.5 + random.uniform(-0.2, 0.2))
+        
+        historical_data.append({
+            'timestamp': timestamp.isoformat(),
+            'risk_probability': round(risk_prob, 1),
+            'risk_category': risk_category,
+            'slope_angle': round(slope_angle, 1),
+            'rainfall_24h': round(rainfall, 1),
+            'vibration_intensity': round(vibration, 2)
+        })
+    
+    return historical_data
+
+def refreshed_risk_grid():
+    """The risk grid brought up to date with the active model, or None without one."""
+    active = model_manager.active
+    if active is None or prediction_mode != 'model':
+        return None
+    risk_grid.refresh(active.predictor, active.version)
+    return active.predictor
+
+def grid_unavailable():
+    return jsonify({'error': 'The risk grid needs the trained model (prediction mode is simulate)'}), 503
+
+@app.route('/risk-grid')
+def get_risk_grid():
+    """Grid geometry, zone readings, category counts and the last refresh."""
+    model = refreshed_risk_grid()
+    if model is None:
+        return grid_unavailable()
+    return jsonify(risk_grid.metadata(model.risk_categories))
+
+@app.route('/risk-grid/readings', methods=['POST'])
+def update_risk_grid_readings():
+    """
+    Update environmental readings and rescore the affected cells.
+    Accepts ``{"readings": {"<zone>": {...}}}`` for individual zones or
+    ``{"reading": {...}}`` for every zone; omitted features keep their values.
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not (isinstance(payload.get('readings'), dict)
+                                             or isinstance(payload.get('reading'), dict)):
+        return jsonify({'error': 'Provide {"readings": {zone: reading}} or {"reading": reading}'}), 400
+    if prediction_mode != 'model':
+        return grid_unavailable()
+    
+    try:
+        if 'reading' in payload:
+            refreshed_risk_grid()  # loads the raster, so its zones are known
+            readings = {zone: payload['reading'] for zone in risk_grid.zone_names}
+        else:
+            readings = payload['readings']
+        risk_grid.set_readings(readings)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    active = model_manager.active
+    return jsonify(risk_grid.refresh(active.predictor, active.version))
+
+@app.route('/risk-grid/data')
+def get_risk_grid_data():
+    """
+    The whole grid as row-major uint8 bytes: ``layer=risk`` (0-100, the default)
+    or ``layer=category`` (index into the risk categories); 255 is outside the pit.
+    """
+    layer = request.args.get('layer', 'risk')
+    if layer not in ('risk', 'category'):
+        return jsonify({'error': 'layer must be risk or category'}), 400
+    if refreshed_risk_grid() is None:
+        return grid_unavailable()
+    
+    body, etag = risk_grid.layer(layer)
+    response = Response(status=304) if request.if_none_match.contains_weak(etag) else Response(
+        body, mimetype='application/octet-stream')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Grid-Rows'] = str(risk_grid.shape[0])
+    response.headers['X-Grid-Cols'] = str(risk_grid.shape[1])
+    response.headers['X-Grid-Nodata'] = str(NODATA)
+    return response
+
+@app.route('/risk-grid/tiles/<int:tile_row>/<int:tile_col>.png')
+def get_risk_grid_tile(tile_row, tile_col):
+    """One ``tile_size`` square of the grid as a PNG (transparent outside the pit)."""
+    model = refreshed_risk_grid()
+    if model is None:
+        return grid_unavailable()
+    
+    tile = risk_grid.tile(tile_row, tile_col, model.risk_categories)
+    if tile is None:
+        return jsonify({'error': 'Tile outside the grid', 'tiles': list(risk_grid.tile_grid)}), 404
+    etag, png = tile
+    response = Response(status=304) if request.if_none_match.contains(etag) else Response(
+        png, mimetype='image/png')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus metrics: request and stage latency histograms, counters and gauges."""
+    return Response(metrics.render(), content_type=prom.CONTENT_TYPE)
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    if prediction_mode == 'model':
+        model_manager.ensure_watching()
+
+@app.after_request
+def record_request_metrics(response):
+    """Count every response and observe its latency under the matched route."""
+    start = g.get('request_start')
+    if start is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        REQUEST_LATENCY.observe(time.perf_counter() - start, endpoint, request.method)
+        REQUESTS.inc(endpoint, request.method, str(response.status_code))
+    return response
+
+@app.after_request
+def compress_response(response):
+    """gzip/brotli encode large JSON, MessagePack and binary bodies the client accepts."""
+    return response_compressor(response, request.accept_encodings)
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors."""
@@ -428,14 +1294,17 @@ def internal_error(error):
     """Handle 500 errors."""
     return jsonify({'error': 'Internal server error'}), 500
 
+# Load the model once at import time (in the gunicorn master with --preload)
+load_prediction_model()
+
 # Initialize the application
 if __name__ == '__main__':
     print("🚀 Starting Rockfall Prediction API Server")
     print("=" * 50)
-    
-    # Load the model
-    print("📡 Loading prediction model...")
-    load_prediction_model()
+    print(f"📡 Prediction mode: {prediction_mode}")
+    if prediction_mode == 'model':
+        model_manager.install_signal_handler()
+        model_manager.ensure_watching()
     
     # Start the server
     port = int(os.environ.get('PORT', 5000))
@@ -446,8 +1315,14 @@ if __name__ == '__main__':
     print(f"🎯 API endpoints:")
     print(f"   GET  / - API status")
     print(f"   POST /predict - Rockfall prediction")
+    print(f"   POST /predict/batch - Batch rockfall prediction")
+    print(f"   POST /ingest - Streaming NDJSON ingestion")
     print(f"   GET  /mock-data - Live sensor simulation")
+    print(f"   GET  /stream/live - Live sensor stream (SSE)")
     print(f"   GET  /historical-data - Historical trend data")
+    print(f"   GET  /risk-grid - Spatial risk grid (data, tiles, readings)")
+    print(f"   GET  /cache-stats - Prediction cache statistics")
+    print(f"   GET  /metrics - Prometheus metrics")
     print(f"   GET  /health - Health check")
     
     app.run(host='0.0.0.0', port=port, debug=debug_mode)
\ No newline at end of file
@@ -0,0 +1,534 @@
+"""
+ASGI Entry Point
+Async alternative to the Flask app for the dashboard routes (/, /health,
+/predict, /mock-data, /stream/live, /historical-data, /metrics): requests
+are handled on an event loop, forest evaluation runs in a preforked pool of
+processes that hold the model, store queries run on threads and each live
+stream is a coroutine rather than a server thread
+
+Run with: uvicorn asgi:app --port 5000
+"""
+
+import asyncio
+import fnmatch
+import io
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from werkzeug.wrappers import Request, Response
+
+# Loads the model once, before the pool forks (like gunicorn --preload)
+import app as api
+import metrics as prom
+from memory_stats import process_memory
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker():
+    # Ctrl+C reaches the whole process group; let the server shut the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # The fork inherits the server's SIGTERM handler, which would make the
+    # worker ignore the executor's terminate() when the pool breaks
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    if api.prediction_mode == 'model':
+        api.model_manager.ensure_watching()
+
+
+def _worker_ready(delay):
+    time.sleep(delay)  # keep this worker busy so the others get a task too
+    return os.getpid()
+
+
+def _score(readings, tier, explain):
+    return api.predict_readings(readings, tier, explain)
+
+
+class InferencePool:
+    """
+    Processes that score readings off the event loop.
+
+    Each worker is forked from the server after the model was loaded, so
+    workers share its memory-mapped arrays, and runs ``predict_readings``
+    with its own prediction cache and artifact watcher, like a gunicorn
+    worker. Platforms without fork spawn workers that load the model
+    themselves. With ``workers=0`` (or simulated predictions) readings are
+    scored on the event loop.
+
+    When a worker dies the pool is replaced once, on a thread and under a
+    lock: the requests that were in flight fail, later ones wait for the
+    new pool. Tasks are submitted from a thread too, since ``submit`` on
+    a pool that is being torn down blocks until the teardown finishes.
+    """
+
+    def __init__(self, workers):
+        self.workers = int(workers)
+        self.start_method = None
+        self.pids = []
+        self._executor = None
+        self._restart_lock = None  # asyncio.Lock, created on the event loop
+
+        self.submitted = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.restarts = 0
+        self.seconds_total = 0.0
+
+    def start(self):
+        """Start every worker and wait until each has answered."""
+        if self.workers <= 0 or api.prediction_mode != 'model' or self._executor is not None:
+            return
+        self.start_method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+        self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(self.start_method),
+                                             initializer=_init_worker)
+        futures = [self._executor.submit(_worker_ready, 0.05) for _ in range(self.workers)]
+        self.pids = sorted({future.result() for future in futures})
+        logger.info(f"✅ Inference pool ready: {len(self.pids)} {self.start_method}ed workers")
+
+    async def _replace(self, executor):
+        """Restart the pool if ``executor`` is still the current one (a worker died, e.g. killed for memory)."""
+        async with self._restart_lock:
+            if self._executor is executor:
+                logger.error("❌ Inference worker died, restarting the pool")
+                self.restarts += 1
+                await asyncio.to_thread(self._restart)
+
+    def _restart(self):
+        self.shutdown()
+        self.start()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    async def score(self, readings, tier='full', explain=False):
+        """
+        ``predict_readings`` in a worker process.
+
+        Raises:
+            ValueError: For an unknown tier or readings the model rejects
+        """
+        if self._restart_lock is None:
+            self._restart_lock = asyncio.Lock()
+        if self._restart_lock.locked():
+            async with self._restart_lock:
+                pass  # wait for the pool being restarted
+        executor = self._executor
+        if executor is not None and getattr(executor, '_broken', False):
+            # Broken since the last request: replace it before submitting
+            await self._replace(executor)
+            executor = self._executor
+        if executor is None:
+            return _score(readings, tier, explain)
+        start = time.perf_counter()
+        self.submitted += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            future = await asyncio.to_thread(executor.submit, _score, readings, tier, explain)
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            await self._replace(executor)
+            raise
+        finally:
+            self.in_flight -= 1
+            self.seconds_total += time.perf_counter() - start
+
+    def stats(self):
+        """Workers and dispatch counters for /health."""
+        return {
+            'workers': len(self.pids) if self._executor is not None else 0,
+            'start_method': self.start_method,
+            'pids': self.pids,
+            'submitted': self.submitted,
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'restarts': self.restarts,
+            'mean_ms': round(self.seconds_total / self.submitted * 1000, 3) if self.submitted else None
+        }
+
+
+# ASGI_INFERENCE_WORKERS processes evaluate the forest (0 scores on the event loop)
+inference_pool = InferencePool(int(os.environ.get('ASGI_INFERENCE_WORKERS', os.cpu_count() or 1)))
+
+
+def json_response(payload, status=200):
+    return Response(api.app.json.dumps(payload), status=status, mimetype='application/json')
+
+
+def encoded_response(payload, variant):
+    """``payload`` encoded as ``variant``, varying on the Accept header."""
+    response = Response(api.payload_encoder.encode(payload, variant),
+                        mimetype=api.payload_encoder.mimetype(variant))
+    response.vary.add('Accept')
+    return response
+
+
+class EventStream(Response):
+    """A Server-Sent Events response whose body is sent frame by frame as ``frames`` yields it."""
+
+    def __init__(self, frames):
+        super().__init__(mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # disable proxy buffering (nginx)
+        })
+        self.frames = frames
+
+
+def cacheable_response(request, body, etag, variant='json'):
+    """Encoded response with ETag and Cache-Control; 304 when the client's copy is current."""
+    if body is None or request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype=api.payload_encoder.mimetype(variant))
+    response.set_etag(etag)
+    response.vary.add('Accept')
+    response.headers['Cache-Control'] = f'public, max-age={api.HISTORY_MAX_AGE}, must-revalidate'
+    return response
+
+
+def explain_requested(request):
+    """Whether the request asked for per-feature explanations (``?explain=true``)."""
+    return request.args.get('explain', '').lower() in ('1', 'true', 'yes')
+
+
+async def home(request):
+    """API status endpoint."""
+    return json_response({
+        'message': 'Rockfall Prediction API',
+        'status': 'online',
+        'version': '1.0.0',
+        'server': 'asgi',
+        'model_loaded': api.model_loaded,
+        'prediction_mode': api.prediction_mode,
+        'endpoints': {
+            '/predict': 'POST - Predict rockfall risk (tier=full|fast, explain=true)',
+            '/mock-data': 'GET - Get mock sensor data',
+            '/stream/live': 'GET - Server-Sent Events stream of live data',
+            '/historical-data': 'GET - Historical readings (from, to, sensor_id, location, max_points, layout=rows|columns)',
+            '/metrics': 'GET - Prometheus metrics',
+            '/health': 'GET - API health check'
+        }
+    })
+
+
+async def health_check(request):
+    """Health check endpoint for monitoring."""
+    return json_response({
+        'status': 'healthy',
+        'timestamp': datetime.now().isoformat(),
+        'server': 'asgi',
+        'model_status': 'loaded' if api.model_loaded else 'not_loaded',
+        'prediction_mode': api.prediction_mode,
+        'model_load_seconds': round(api.model_load_seconds, 3) if api.model_load_seconds is not None else None,
+        'model_version': api.model_version,
+        'model': api.model_manager.stats(),
+        'model_tiers': (api.model_manager.active.info.get('tiers', {'full': {}})
+                        if api.model_manager.active is not None else None),
+        'inference_pool': inference_pool.stats(),
+        'timeseries_store': api.timeseries_store.stats() if api.timeseries_store is not None else None,
+        'history_cache': api.history_cache.stats() if api.history_cache is not None else None,
+        'feature_store': api.feature_store.stats(),
+        'response_formats': list(api.payload_encoder.formats),
+        'compression': api.response_compressor.stats(),
+        'memory': {
+            'server': process_memory(),
+            'before_model_load': api.memory_before_load,
+            'after_model_load': api.memory_after_load
+        }
+    })
+
+
+async def predict_rockfall(request):
+    """
+    Main prediction endpoint (same contract as the Flask ``/predict``).
+    The reading is scored by an inference worker while the event loop keeps
+    serving other requests.
+    """
+    if not request.is_json:
+        return json_response({'error': 'Request must contain JSON data'}, 400)
+    input_data = request.get_json(silent=True)
+    if not input_data:
+        return json_response({'error': 'No input data provided'}, 400)
+
+    # Windowed features are filled in here so the stored reading has them too
+    errors = api.reading_errors(input_data)
+    if errors is not None:
+        return json_response(errors, 400)
+
+    try:
+        prediction_result = (await inference_pool.score([input_data], request.args.get('tier', 'full'),
+                                                        explain_requested(request)))[0]
+    except ValueError as e:
+        return json_response({'error': str(e)}, 400)
+
+    api.record_predictions([input_data], [prediction_result])
+    prediction_result.update({
+        'input_summary': api.summarize_input(input_data),
+        'api_version': '1.0.0'
+    })
+    logger.info(f"Prediction made: {prediction_result['risk_category']} ({prediction_result['risk_probability']}%)")
+
+    with api.STAGE_LATENCY.time('json_serialization'):
+        return json_response(prediction_result)
+
+
+async def get_mock_data(request):
+    """
+    Endpoint for live monitoring demo.
+    Returns simulated real-time sensor data with prediction, as JSON or (with
+    ``Accept: application/msgpack``) MessagePack.
+    """
+    variant = api.payload_encoder.negotiate(request.accept_mimetypes)
+    sensor_data = api.generate_mock_sensor_data()
+    prediction = (await inference_pool.score([sensor_data]))[0]
+    api.record_predictions([sensor_data], [prediction])
+    return encoded_response(api.live_payload(sensor_data, prediction), variant)
+
+
+async def stream_live_data(request):
+    """
+    Server-Sent Events stream of live sensor data (same events as the Flask
+    ``/stream/live``). An open stream is a coroutine waiting for the next
+    tick, so up to ``LIVE_STREAM_MAX_ASYNC_CLIENTS`` dashboards share one
+    process; above that the request is refused with 503 and ``Retry-After``.
+    """
+    frames = api.live_broadcaster.subscribe_async()
+    if frames is None:
+        response = json_response({'error': 'Too many live streams, retry later or poll /mock-data'}, 503)
+        response.headers['Retry-After'] = str(api.LIVE_STREAM_RETRY_AFTER)
+        return response
+    return EventStream(frames)
+
+
+def historical_data(request):
+    """The Flask ``/historical-data`` handler, run on a thread because it queries SQLite."""
+    now = time.time()
+    try:
+        variant = api.payload_encoder.negotiate(request.accept_mimetypes, request.args.get('layout'))
+        end = api.parse_timestamp(request.args.get('to'), default=now)
+        start = api.parse_timestamp(request.args.get('from'), default=end - 48 * 3600)
+        max_points = min(int(request.args.get('max_points', 48)), 5000)
+    except ValueError as e:
+        return json_response({'error': str(e)}, 400)
+    if start >= end or max_points < 1:
+        return json_response({'error': '"from" must be before "to" and max_points positive'}, 400)
+
+    sensor_id = request.args.get('sensor_id')
+    location = request.args.get('location')
+    store = api.timeseries_store
+
+    if store is not None and store.has_data():
+        if abs((end - start) / max_points - 3600) < 1:
+            end_hour = int(-(-end // 3600)) * 3600
+            start_hour = end_hour - max_points * 3600
+            etag, counts = api.history_cache.etag(start_hour, end_hour, sensor_id, location)
+            if request.if_none_match.contains_weak(api.variant_etag(etag, variant)):
+                return cacheable_response(request, None, api.variant_etag(etag, variant), variant)
+            etag, body = api.history_cache.response(start_hour, end_hour, sensor_id, location,
+                                                    counts=counts, etag=etag, variant=variant)
+            return cacheable_response(request, body, api.variant_etag(etag, variant), variant)
+
+        data = store.query(start, end, sensor_id=sensor_id, location=location, max_points=max_points)
+        source = 'store'
+    else:
+        data = api.synthetic_history()[-48:]
+        source = 'synthetic'
+
+    body = api.payload_encoder.encode({
+        'data': data,
+        'summary': api.summarize_history(data),
+        'source': source
+    }, variant)
+    return cacheable_response(request, body, api.make_etag(body), variant)
+
+
+async def get_historical_data(request):
+    """Historical readings and predictions for charts (see the Flask handler for parameters)."""
+    return await asyncio.to_thread(historical_data, request)
+
+
+async def get_metrics(request):
+    """Prometheus metrics of the server process (stage timings of inference stay in the workers)."""
+    return Response(api.metrics.render(), content_type=prom.CONTENT_TYPE)
+
+
+ROUTES = {
+    '/': {'GET': home},
+    '/health': {'GET': health_check},
+    '/predict': {'POST': predict_rockfall},
+    '/mock-data': {'GET': get_mock_data},
+    '/stream/live': {'GET': stream_live_data},
+    '/historical-data': {'GET': get_historical_data},
+    '/metrics': {'GET': get_metrics}
+}
+
+
+def wsgi_environ(scope, body):
+    """A WSGI environ for ``scope``, so requests can be read with werkzeug like in Flask."""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': None,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False
+    }
+    for name, value in scope['headers']:
+        key = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if key == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif key != 'CONTENT_LENGTH':
+            key = f'HTTP_{key}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+def add_cors_headers(request, response):
+    """CORS headers for the dashboard, with the origins the Flask app allows."""
+    origin = request.headers.get('Origin')
+    if origin is None:
+        return
+    if api.CORS_ORIGINS is None:
+        response.headers['Access-Control-Allow-Origin'] = '*'
+    elif any(fnmatch.fnmatchcase(origin, pattern) for pattern in api.CORS_ORIGINS):
+        response.headers['Access-Control-Allow-Origin'] = origin
+        response.vary.add('Origin')
+
+
+def close_streams_on_exit():
+    """
+    Chain the server's SIGINT/SIGTERM handlers so that open live streams end.
+
+    uvicorn waits for open responses before shutting down, and a live stream
+    never finishes by itself.
+    """
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        previous = signal.getsignal(signum)
+        if not callable(previous):
+            continue
+
+        def handler(sig, frame, previous=previous):
+            loop.call_soon_threadsafe(api.live_broadcaster.close_async_streams)
+            previous(sig, frame)
+        try:
+            signal.signal(signum, handler)
+        except ValueError:
+            return  # not the main thread (embedded server); streams end when clients leave
+
+
+async def send_event_stream(response, receive, send):
+    """Send ``response.frames`` until the stream ends or the client disconnects."""
+    async def forward():
+        async for frame in response.frames:
+            await send({'type': 'http.response.body', 'body': frame, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def disconnected():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    tasks = [asyncio.ensure_future(forward()), asyncio.ensure_future(disconnected())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await response.frames.aclose()
+
+
+async def dispatch(request):
+    methods = ROUTES.get(request.path)
+    if methods is None:
+        return json_response({'error': 'Endpoint not found'}, 404)
+    method = 'GET' if request.method == 'HEAD' else request.method
+    if method == 'OPTIONS':
+        response = Response(status=200)
+        response.headers['Allow'] = response.headers['Access-Control-Allow-Methods'] = \
+            ', '.join([*methods, 'OPTIONS'])
+        if 'Access-Control-Request-Headers' in request.headers:
+            response.headers['Access-Control-Allow-Headers'] = request.headers['Access-Control-Request-Headers']
+        return response
+    handler = methods.get(method)
+    if handler is None:
+        return json_response({'error': 'Method not allowed'}, 405)
+    try:
+        return await handler(request)
+    except Exception as e:
+        logger.error(f"{request.method} {request.path} error: {e}")
+        return json_response({'error': 'Internal server error', 'details': str(e)}, 500)
+
+
+async def app(scope, receive, send):
+    """The ASGI application."""
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    inference_pool.start()
+                    if api.prediction_mode == 'model':
+                        api.model_manager.ensure_watching()
+                    close_streams_on_exit()
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                inference_pool.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        return
+
+    start = time.perf_counter()
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body', False):
+            break
+
+    request = Request(wsgi_environ(scope, b''.join(chunks)))
+    response = await dispatch(request)
+    add_cors_headers(request, response)
+    api.response_compressor(response, request.accept_encodings)
+
+    route = request.path if request.path in ROUTES else 'unmatched'
+    api.REQUEST_LATENCY.observe(time.perf_counter() - start, route, request.method)
+    api.REQUESTS.inc(route, request.method, str(response.status_code))
+
+    body = response.get_data()
+    await send({
+        'type': 'http.response.start',
+        'status': response.status_code,
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in response.headers.items()]
+    })
+    if isinstance(response, EventStream):
+        if request.method != 'HEAD':
+            await send_event_stream(response, receive, send)
+            return
+        await response.frames.aclose()
+    await send({'type': 'http.response.body', 'body': b'' if request.method == 'HEAD' else body})
@@ -0,0 +1,124 @@
+"""
+Serialization Benchmark
+Bytes on the wire and encode time of dashboard payloads for every response
+format (JSON, MessagePack, columnar history) and content encoding
+"""
+
+import argparse
+import json
+import logging
+from datetime import datetime, timedelta
+
+# Payloads are built in-process; benchmark_suite points every store at a
+# temp dir, so it is imported before app
+from benchmark_suite import measure
+import app as api
+from fleet_simulator import FleetSimulator, to_json_columns
+from serialization import brotli, msgpack, orjson
+
+VARIANTS = ['json', 'json+columns', 'msgpack', 'msgpack+columns']
+ENCODINGS = ['identity', 'gzip', 'br']
+
+
+def history_payload(points):
+    """A /historical-data body of ``points`` hourly points (synthetic weeks back to back)."""
+    data = []
+    while len(data) < points:
+        data.extend(api.synthetic_history())
+    data = data[:points]
+    start = datetime.now() - timedelta(hours=points)
+    for i, point in enumerate(data):
+        point['timestamp'] = (start + timedelta(hours=i)).isoformat()
+    return {'data': data, 'summary': api.summarize_history(data), 'source': 'store'}
+
+
+def build_payloads(fleet_sensors=1000):
+    """Representative dashboard responses: live reading, history windows and a fleet snapshot."""
+    fleet = FleetSimulator(fleet_sensors, seed=0)
+    columns = fleet.step()
+    return {
+        'live reading': api.build_live_payload(),
+        'history 48 h': history_payload(48),
+        'history 5000 h': history_payload(5000),
+        f'fleet {fleet_sensors}': {
+            'timestamp': fleet.last_step.isoformat(),
+            'count': fleet_sensors,
+            'columns': to_json_columns(columns)
+        }
+    }
+
+
+def run_benchmark(duration=0.5, fleet_sensors=1000):
+    """
+    Encode every payload in every available variant and content encoding.
+
+    Returns:
+        dict: Library availability and one row per (payload, variant,
+        encoding) with ``bytes``, ``encode_ms`` (serialization),
+        ``compress_ms`` and ``total_ms`` (medians)
+    """
+    encoder = api.payload_encoder
+    compressor = api.response_compressor
+    results = {
+        'libraries': {'orjson': orjson is not None, 'msgpack': msgpack is not None, 'brotli': brotli is not None},
+        'compress_level': compressor.level,
+        'rows': []
+    }
+
+    for name, payload in build_payloads(fleet_sensors).items():
+        # Baseline: what jsonify produced before negotiation existed
+        body = api.app.json.dumps(payload).encode()
+        timing = measure(lambda: api.app.json.dumps(payload), duration)
+        results['rows'].append({'payload': name, 'variant': 'json (flask)', 'encoding': 'identity',
+                                'bytes': len(body), 'encode_ms': timing['p50_ms'],
+                                'compress_ms': 0.0, 'total_ms': timing['p50_ms']})
+
+        for variant in VARIANTS:
+            if variant.startswith('msgpack') and msgpack is None:
+                continue
+            if variant.endswith('+columns') and not isinstance(payload.get('data'), list):
+                continue
+            body = encoder.encode(payload, variant)
+            encode_ms = measure(lambda: encoder.encode(payload, variant), duration)['p50_ms']
+            for encoding in ENCODINGS:
+                if encoding == 'identity':
+                    compressed, compress_ms = body, 0.0
+                elif encoding in compressor.encodings:
+                    compressed = compressor.compress(body, encoding)
+                    compress_ms = measure(lambda: compressor.compress(body, encoding), duration)['p50_ms']
+                else:
+                    continue
+                results['rows'].append({'payload': name, 'variant': variant, 'encoding': encoding,
+                                        'bytes': len(compressed), 'encode_ms': encode_ms,
+                                        'compress_ms': compress_ms, 'total_ms': round(encode_ms + compress_ms, 4)})
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark response formats and compression')
+    parser.add_argument('--duration', type=float, default=0.5, help='Seconds spent timing each case')
+    parser.add_argument('--fleet-sensors', type=int, default=1000)
+    parser.add_argument('--output', help='Optional path for a JSON copy of the results')
+    args = parser.parse_args()
+
+    logging.getLogger('app').setLevel(logging.WARNING)
+
+    print("📦 Rockfall Response Serialization Benchmark")
+    print("=" * 78)
+
+    results = run_benchmark(args.duration, args.fleet_sensors)
+
+    missing = [lib for lib, available in results['libraries'].items() if not available]
+    if missing:
+        print(f"⚠️ Not installed (skipped or using the standard library): {', '.join(missing)}")
+    print(f"Medians, compression level {results['compress_level']}\n")
+    print(f"{'payload':<16} {'variant':<16} {'encoding':<9} {'bytes':>10} {'encode ms':>10} "
+          f"{'compress ms':>12} {'total ms':>9}")
+    for row in results['rows']:
+        print(f"{row['payload']:<16} {row['variant']:<16} {row['encoding']:<9} {row['bytes']:>10,} "
+              f"{row['encode_ms']:>10.3f} {row['compress_ms']:>12.3f} {row['total_ms']:>9.3f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results saved to {args.output}")
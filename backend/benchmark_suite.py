@@ -0,0 +1,230 @@
+"""
+Backend Benchmark Suite
+Times the prediction and data paths in-process (direct calls and the Flask
+test client), reports ops/sec and p50/p99 latency, and compares the results
+against a stored baseline so that performance regressions fail the run
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+# Benchmark against isolated state (every store and data file lives in a
+# fresh temp dir, never backend/data) and, unless asked otherwise, the
+# uncached prediction path so runs are comparable. Must be set before
+# importing app.
+BENCH_DIR = tempfile.mkdtemp(prefix='rockfall-bench-')
+for variable, filename in (('TIMESERIES_DB_PATH', 'timeseries.db'),
+                           ('FEATURE_EVENTS_DB_PATH', 'feature_events.db'),
+                           ('RISK_GRID_READINGS', 'risk_grid_readings.json')):
+    os.environ.setdefault(variable, os.path.join(BENCH_DIR, filename))
+os.environ.setdefault('PREDICTION_CACHE_SIZE', '0')
+
+import app as api
+from fleet_simulator import FleetSimulator
+
+# Reference results compared against by default, recorded with a model from
+# train_model.py at its defaults (MODEL_PATH pointing at it) and --duration 2;
+# re-record with --output benchmark_baseline.json after an intended change
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+SAMPLE_READING = {
+    'slope_angle': 45.5,
+    'joint_spacing': 0.8,
+    'joint_orientation': 120.0,
+    'rock_strength': 55.2,
+    'weathering_index': 4.5,
+    'rainfall_24h': 5.2,
+    'rainfall_7d': 22.8,
+    'temperature_variation': 18.5,
+    'freeze_thaw_cycles': 2,
+    'wind_speed': 7.3,
+    'vibration_intensity': 2.1,
+    'blast_distance': 200.0,
+    'excavation_height': 28.5,
+    'support_density': 0.65,
+    'previous_rockfall_30d': 1,
+    'maintenance_days_since': 15
+}
+
+
+def measure(func, duration=1.0, min_ops=20, warmup=3):
+    """
+    Call ``func`` repeatedly for about ``duration`` seconds.
+
+    Returns:
+        dict: ``ops``, ``ops_per_sec``, ``mean_ms``, ``p50_ms`` and ``p99_ms``
+    """
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    deadline = time.perf_counter() + duration
+    while len(timings) < min_ops or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    timings = np.array(timings) * 1000
+    return {
+        'ops': len(timings),
+        'ops_per_sec': round(1000 / timings.mean(), 1),
+        'mean_ms': round(float(timings.mean()), 4),
+        'p50_ms': round(float(np.percentile(timings, 50)), 4),
+        'p99_ms': round(float(np.percentile(timings, 99)), 4)
+    }
+
+
+def seed_history(hours=48, sensors=20, readings_per_hour=6):
+    """Fill the benchmark store with simulated readings spanning ``hours``."""
+    fleet = FleetSimulator(sensors, seed=0)
+    now = time.time()
+    for step in range(hours * readings_per_hour):
+        ts = now - hours * 3600 + step * 3600 / readings_per_hour
+        columns = fleet.step(datetime.fromtimestamp(ts))
+        readings = [fleet.reading(columns, i) for i in range(sensors)]
+        for reading, prediction in zip(readings, api.predict_readings(readings)):
+            api.timeseries_store.append(reading, prediction, timestamp=ts)
+    api.timeseries_store.flush()
+
+
+def build_cases(batch_size=100):
+    """Name -> zero-argument callable for every benchmarked path."""
+    client = api.app.test_client()
+    fleet = FleetSimulator(batch_size, seed=1)
+    batch = fleet.step()
+
+    def request(method, url, **kwargs):
+        def call():
+            response = getattr(client, method)(url, **kwargs)
+            if response.status_code != 200:
+                raise RuntimeError(f"{method.upper()} {url} returned {response.status_code}")
+        return call
+
+    rows = [fleet.reading(batch, i) for i in range(batch_size)]
+    cases = {
+        'simulate_prediction': lambda: api.simulate_prediction(SAMPLE_READING),
+        'generate_mock_sensor_data': api.generate_mock_sensor_data,
+        'feature_schema.validate': lambda: api.feature_schema.validate([SAMPLE_READING]),
+        f'feature_schema.validate[{batch_size}]': lambda: api.feature_schema.validate(rows),
+        f'feature_schema.validate[{batch_size}] columns': lambda: api.feature_schema.validate(batch),
+    }
+    if api.predictor is not None:
+        cases['predictor.predict'] = lambda: api.predictor.predict(SAMPLE_READING)
+        cases[f'predictor.predict_batch[{batch_size}]'] = lambda: api.predictor.predict_batch(batch)
+        cases['predictor.predict explain'] = lambda: api.predictor.predict(SAMPLE_READING, explain=True)
+        cases[f'predictor.predict_batch[{batch_size}] explain'] = lambda: api.predictor.predict_batch(
+            batch, explain=True)
+    cases.update({
+        'POST /predict': request('post', '/predict', json=SAMPLE_READING),
+        'POST /predict?explain=true': request('post', '/predict?explain=true', json=SAMPLE_READING),
+        'GET /mock-data': request('get', '/mock-data'),
+        'GET /historical-data': request('get', '/historical-data'),
+        'GET /historical-data?max_points=200': request('get', '/historical-data?max_points=200'),
+    })
+    return cases
+
+
+def run_suite(duration=1.0, batch_size=100, only=None):
+    """Run every benchmark case and return a result dictionary."""
+    if api.timeseries_store is not None and not api.timeseries_store.has_data():
+        seed_history()
+
+    results = {
+        'created': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'machine': f"{platform.machine()}, {os.cpu_count()} CPUs",
+        'prediction_mode': api.prediction_mode,
+        'prediction_cache': api.prediction_cache.enabled,
+        'duration_seconds': duration,
+        'cases': {}
+    }
+    for name, func in build_cases(batch_size).items():
+        if only and not any(pattern in name for pattern in only):
+            continue
+        results['cases'][name] = measure(func, duration)
+    return results
+
+
+def compare(results, baseline, tolerance=0.25, p99_tolerance=1.0):
+    """
+    Compare ``results`` with ``baseline``.
+
+    A case regresses when its throughput drops by more than ``tolerance``
+    or its p99 latency grows by more than ``p99_tolerance`` (fractions of
+    the baseline value; tail latency is noisier, hence the wider default).
+
+    Returns:
+        list: ``(case, message)`` for every regression
+    """
+    regressions = []
+    if baseline.get('prediction_mode') != results.get('prediction_mode'):
+        print(f"⚠️ Baseline was recorded in '{baseline.get('prediction_mode')}' mode, "
+              f"this run is '{results.get('prediction_mode')}'")
+    if baseline.get('machine') != results.get('machine'):
+        print(f"⚠️ Baseline was recorded on {baseline.get('machine')}, this run is on "
+              f"{results.get('machine')}; absolute numbers may not be comparable")
+
+    for name, current in results['cases'].items():
+        previous = baseline.get('cases', {}).get(name)
+        if previous is None:
+            continue
+        if current['ops_per_sec'] < previous['ops_per_sec'] * (1 - tolerance):
+            regressions.append((name, f"ops/sec {previous['ops_per_sec']} -> {current['ops_per_sec']}"))
+        elif current['p99_ms'] > previous['p99_ms'] * (1 + p99_tolerance):
+            regressions.append((name, f"p99 {previous['p99_ms']} ms -> {current['p99_ms']} ms"))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the Rockfall Prediction backend in-process')
+    parser.add_argument('--duration', type=float, default=1.0, help='Seconds spent on each case')
+    parser.add_argument('--batch-size', type=int, default=100, help='Rows per predict_batch call')
+    parser.add_argument('--only', nargs='+', help='Run only cases whose name contains one of these')
+    parser.add_argument('--output', help='Save results as JSON (e.g. to record a new baseline)')
+    parser.add_argument('--baseline', default=BASELINE_PATH,
+                        help="Baseline JSON to compare against (default: the committed benchmark_baseline.json, "
+                             "'' to skip the comparison)")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed relative drop in ops/sec before a case counts as a regression')
+    parser.add_argument('--p99-tolerance', type=float, default=1.0,
+                        help='Allowed relative growth in p99 latency')
+    args = parser.parse_args()
+
+    logging.getLogger('app').setLevel(logging.WARNING)
+
+    print("⏱️ Rockfall Backend Benchmark Suite")
+    print("=" * 78)
+
+    results = run_suite(duration=args.duration, batch_size=args.batch_size, only=args.only)
+
+    print(f"Mode: {results['prediction_mode']}, prediction cache "
+          f"{'on' if results['prediction_cache'] else 'off'}\n")
+    print(f"{'case':<38} {'ops/sec':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for name, row in results['cases'].items():
+        print(f"{name:<38} {row['ops_per_sec']:>10.1f} {row['p50_ms']:>10.3f} {row['p99_ms']:>10.3f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.p99_tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) against {args.baseline} "
+                  f"(tolerance {args.tolerance:.0%}):")
+            for name, message in regressions:
+                print(f"   {name}: {message}")
+            sys.exit(1)
+        print(f"\n✅ No regressions against {args.baseline}")
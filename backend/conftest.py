@@ -0,0 +1,68 @@
+"""
+Shared Test Fixtures
+Makes the model package importable and trains one tiny model and one small
+compiled forest per test session, so tests never depend on artifacts in the
+developer's tree
+"""
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_SOURCE_DIR = os.path.join(BACKEND_DIR, '..', 'model')
+sys.path.append(MODEL_SOURCE_DIR)
+
+from compiled_forest import CompiledForest
+from features import FEATURE_COLUMNS
+
+
+@pytest.fixture(scope='session')
+def model_dir(tmp_path_factory):
+    """A directory with every artifact train_model.py writes, from a small, fast forest."""
+    directory = tmp_path_factory.mktemp('model')
+    subprocess.run(
+        [sys.executable, 'train_model.py', '--samples', '2000', '--n-estimators', '10', '--max-depth', '6',
+         '--fast-estimators', '4', '--n-jobs', '1', '--no-trace-memory', '--output-dir', str(directory)],
+        cwd=MODEL_SOURCE_DIR, check=True, stdout=subprocess.DEVNULL
+    )
+    return str(directory)
+
+
+@pytest.fixture
+def server_env(model_dir, tmp_path):
+    """Environment for a server process: the test model and every store in a temp dir."""
+    env = dict(os.environ)
+    env.update({
+        'MODEL_PATH': model_dir,
+        'MODEL_SITES_PATH': str(tmp_path / 'sites'),
+        'MODEL_RELOAD_INTERVAL': '0',
+        'TIMESERIES_DB_PATH': str(tmp_path / 'timeseries.db'),
+        'FEATURE_EVENTS_DB_PATH': str(tmp_path / 'feature_events.db'),
+        'RISK_GRID_READINGS': str(tmp_path / 'risk_grid_readings.json'),
+        'RISK_GRID_SIZE': '50',
+    })
+    return env
+
+
+@pytest.fixture(scope='session')
+def forest():
+    """
+    A small forest trained behind a scaler on features of very different scales.
+
+    Returns:
+        tuple: (sklearn model, scaler, CompiledForest, training matrix)
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import StandardScaler
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, len(FEATURE_COLUMNS))) * np.linspace(0.01, 500, len(FEATURE_COLUMNS)) + 40
+    y = np.digitize(X[:, 0] / 200 + X[:, 5] / 3000 + rng.normal(scale=0.2, size=len(X)), [-0.3, 0, 0.3])
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=15, max_depth=8, random_state=0)
+    model.fit(scaler.transform(X), y)
+    return model, scaler, CompiledForest.from_sklearn(model, scaler, FEATURE_COLUMNS), X
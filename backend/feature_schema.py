@@ -0,0 +1,218 @@
+"""
+Feature Schema
+Validation and coercion of the model's input features: every feature must
+be present, numeric, finite and physically plausible, checked for a whole
+batch column by column with NumPy
+"""
+
+import numpy as np
+
+# Physically possible range of each feature (inclusive). Deliberately wider
+# than the synthetic training data, which train_model.py clips to slope
+# 10-90, joint spacing 0.1-5, rock strength 10-100, excavation height 5-100
+# and blast distance 50-1000: these reject impossible readings, not unusual ones.
+FEATURE_BOUNDS = {
+    'slope_angle': (0, 90),                 # degrees
+    'joint_spacing': (0, 50),               # meters
+    'joint_orientation': (0, 360),          # degrees
+    'rock_strength': (0, 400),              # MPa
+    'weathering_index': (0, 10),            # 0-10 scale
+    'rainfall_24h': (0, 2000),              # mm
+    'rainfall_7d': (0, 5000),               # mm
+    'temperature_variation': (-60, 60),     # °C
+    'freeze_thaw_cycles': (0, 365),         # count
+    'wind_speed': (0, 120),                 # m/s
+    'vibration_intensity': (0, 1000),       # mm/s
+    'blast_distance': (0, 10000),           # meters
+    'excavation_height': (0, 1000),         # meters
+    'support_density': (0, 1),              # ratio
+    'previous_rockfall_30d': (0, 1000),     # count
+    'maintenance_days_since': (0, 36500),   # days
+}
+INTEGER_FEATURES = frozenset({'freeze_thaw_cycles', 'previous_rockfall_30d'})
+
+# Error codes per (row, feature), in order of precedence
+OK, MISSING, NOT_A_NUMBER, NOT_FINITE, BELOW_MINIMUM, ABOVE_MAXIMUM, NOT_WHOLE = range(7)
+
+_NUMERIC_TYPES = (int, float, np.integer, np.floating)
+
+
+class ValidationResult:
+    """
+    Outcome of validating a batch.
+
+    ``matrix`` holds the coerced values (float64, one column per schema
+    field, NaN where a value is missing or not a number) and ``codes`` the
+    error code of every value; ``valid`` marks the rows without errors.
+    """
+
+    def __init__(self, schema, matrix, codes):
+        self.schema = schema
+        self.matrix = matrix
+        self.codes = codes
+        self.valid = ~codes.any(axis=1)
+
+    @property
+    def ok(self):
+        return bool(self.valid.all())
+
+    @property
+    def invalid_rows(self):
+        return np.flatnonzero(~self.valid).tolist()
+
+    def errors(self, limit=None):
+        """Errors as ``{'row', 'field', 'error'}`` dicts, by row then field order."""
+        rows, columns = np.nonzero(self.codes)
+        if limit is not None:
+            rows, columns = rows[:limit], columns[:limit]
+        return [{'row': int(row), 'field': self.schema.fields[column],
+                 'error': self.schema.message(self.codes[row, column], column)}
+                for row, column in zip(rows.tolist(), columns.tolist())]
+
+    def field_errors(self, row=0):
+        """Field -> error message for one row."""
+        return {self.schema.fields[column]: self.schema.message(self.codes[row, column], column)
+                for column in np.flatnonzero(self.codes[row]).tolist()}
+
+
+class FeatureSchema:
+    """
+    Input validation for one model, compiled once.
+
+    ``feature_columns`` (from ``model_info.json``) fixes the required fields
+    and the column order; each field's bounds come from ``bounds`` and
+    counts must be whole numbers. The bounds are held as arrays so checking
+    a batch is a handful of vectorized comparisons over its value matrix;
+    a batch of plain numbers is converted to that matrix in one call, other
+    input column by column.
+
+    Numeric strings are coerced to numbers (and written back to the
+    readings, so the cache and the model see numbers); booleans, other
+    strings, NaN and infinities are errors, and null counts as missing.
+    """
+
+    def __init__(self, feature_columns, bounds=None, integer_features=INTEGER_FEATURES):
+        bounds = FEATURE_BOUNDS if bounds is None else bounds
+        self.fields = list(feature_columns)
+        self.minimum = np.array([bounds.get(field, (-np.inf, np.inf))[0] for field in self.fields], dtype=np.float64)
+        self.maximum = np.array([bounds.get(field, (-np.inf, np.inf))[1] for field in self.fields], dtype=np.float64)
+        self.integer = np.array([field in integer_features for field in self.fields])
+        self._messages = [
+            ['', 'missing', 'not a number', 'not a finite number',
+             f'below the minimum of {low:g}', f'above the maximum of {high:g}', 'not a whole number']
+            for low, high in zip(self.minimum, self.maximum)
+        ]
+
+    def message(self, code, column):
+        return self._messages[column][code]
+
+    def validate(self, readings, coerce=True):
+        """
+        Check a batch of readings.
+
+        Args:
+            readings: A list of reading dicts, or a columnar dict mapping
+                field names to equal-length sequences or arrays
+            coerce (bool): Write numbers parsed from numeric strings back
+                into ``readings``
+
+        Returns:
+            ValidationResult: Coerced values and per-row, per-field errors
+        """
+        columnar = isinstance(readings, dict)
+        if columnar:
+            n_rows = len(next(iter(readings.values()))) if readings else 0
+        else:
+            n_rows = len(readings)
+        codes = np.zeros((n_rows, len(self.fields)), dtype=np.int8)
+
+        matrix = None if columnar else self._numeric_rows(readings)
+        if matrix is None:
+            matrix = np.empty((n_rows, len(self.fields)), dtype=np.float64)
+            for j, field in enumerate(self.fields):
+                if columnar:
+                    values = readings.get(field)
+                    if values is None:
+                        matrix[:, j] = np.nan
+                        codes[:, j] = MISSING
+                        continue
+                else:
+                    values = [reading.get(field) for reading in readings]
+                parsed = self._column(values, matrix[:, j], codes[:, j])
+                if parsed is not None and coerce:
+                    self._write_back(readings, field, j, parsed, matrix, columnar)
+
+        # NaN fails both comparisons, so a batch passing this needs no further checks
+        with np.errstate(invalid='ignore'):
+            passed = (matrix >= self.minimum) & (matrix <= self.maximum)
+            if self.integer.any():
+                passed[:, self.integer] &= matrix[:, self.integer] == np.floor(matrix[:, self.integer])
+        if passed.all():
+            return ValidationResult(self, matrix, codes)
+
+        # Value checks only apply where a number was found; the precedence
+        # of codes follows the order of these assignments (last one wins)
+        numeric = codes == OK
+        with np.errstate(invalid='ignore'):
+            codes[numeric & self.integer & (matrix != np.floor(matrix))] = NOT_WHOLE
+            codes[numeric & (matrix > self.maximum)] = ABOVE_MAXIMUM
+            codes[numeric & (matrix < self.minimum)] = BELOW_MINIMUM
+        codes[numeric & ~np.isfinite(matrix)] = NOT_FINITE
+        return ValidationResult(self, matrix, codes)
+
+    def _numeric_rows(self, readings):
+        """The value matrix in one conversion when every value is a plain number, else None."""
+        values = [reading.get(field) for reading in readings for field in self.fields]
+        if not all(t in (int, float) for t in set(map(type, values))):
+            return None
+        return np.array(values, dtype=np.float64).reshape(len(readings), len(self.fields))
+
+    def _column(self, values, out, codes):
+        """
+        Convert one column into ``out``, setting ``codes`` for missing and
+        non-numeric values. Returns the rows parsed from strings, if any.
+        """
+        if isinstance(values, np.ndarray) and values.dtype.kind in 'iuf':
+            if values.shape != out.shape:
+                raise ValueError("All columns must have the same length")
+            out[:] = values
+            return None
+        if len(values) != len(out):
+            raise ValueError("All columns must have the same length")
+
+        types = set(map(type, values))
+        if all(issubclass(t, _NUMERIC_TYPES) and not issubclass(t, (bool, np.bool_)) for t in types):
+            out[:] = values  # the common case: plain numbers
+            return None
+
+        # Mixed column: convert value by value
+        parsed = []
+        for i, value in enumerate(values):
+            if value is None:
+                out[i], codes[i] = np.nan, MISSING
+            elif isinstance(value, (bool, np.bool_)):
+                out[i], codes[i] = np.nan, NOT_A_NUMBER
+            elif isinstance(value, _NUMERIC_TYPES):
+                out[i] = value
+            elif isinstance(value, str):
+                try:
+                    out[i] = float(value)
+                    parsed.append(i)
+                except ValueError:
+                    out[i], codes[i] = np.nan, NOT_A_NUMBER
+            else:
+                out[i], codes[i] = np.nan, NOT_A_NUMBER
+        return parsed or None
+
+    def _write_back(self, readings, field, j, parsed, matrix, columnar):
+        to_number = int if self.integer[j] else float
+        if columnar:
+            column = readings[field] = list(readings[field])
+        for i in parsed:
+            value = matrix[i, j]
+            if np.isfinite(value) and (not self.integer[j] or value == int(value)):
+                value = to_number(value)
+            if columnar:
+                column[i] = value
+            else:
+                readings[i][field] = value
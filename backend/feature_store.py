@@ -0,0 +1,331 @@
+"""
+Rolling Feature Store
+Per-sensor windowed aggregates (rainfall over 24 h and 7 d, rockfall events
+over 30 d, days since maintenance) maintained incrementally from raw events
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from timeseries_store import parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+EVENT_TYPES = ('rainfall', 'rockfall', 'maintenance')
+
+# Model features derived from events rather than reported by sensors
+WINDOWED_FEATURES = ['rainfall_24h', 'rainfall_7d', 'previous_rockfall_30d', 'maintenance_days_since']
+
+RETENTION = 30 * DAY       # longest window; older events no longer matter
+MAX_CLOCK_SKEW = 60.0      # events further in the future are rejected
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    sensor_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    ts REAL NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_ts ON events (ts);
+"""
+
+
+class RollingWindowSum:
+    """
+    Sums of a quantity over several trailing windows, using one ring of buckets.
+
+    ``windows`` are lengths in buckets; a window of ``w`` covers the newest
+    bucket and the ``w - 1`` before it, so a 24-bucket hourly window spans
+    between 23 and 24 hours. Each window keeps a running total: adding a
+    value touches one bucket, and moving time forward subtracts each bucket
+    once as it leaves each window, so updates are O(1) amortized and reads
+    are O(1).
+    """
+
+    __slots__ = ('bucket_seconds', 'windows', 'buckets', 'totals', 'head')
+
+    def __init__(self, bucket_seconds, windows):
+        self.bucket_seconds = bucket_seconds
+        self.windows = tuple(windows)
+        self.buckets = [0.0] * max(self.windows)
+        self.totals = [0.0] * len(self.windows)
+        self.head = None  # absolute index of the newest bucket
+
+    def _advance(self, bucket):
+        if self.head is None:
+            self.head = bucket
+            return
+        if bucket <= self.head:
+            return
+        size = len(self.buckets)
+        if bucket - self.head >= size:
+            # Everything has expired
+            self.buckets = [0.0] * size
+            self.totals = [0.0] * len(self.totals)
+            self.head = bucket
+            return
+        while self.head < bucket:
+            self.head += 1
+            for k, window in enumerate(self.windows):
+                self.totals[k] -= self.buckets[(self.head - window) % size]
+            # The slot being reused held the bucket that just left the longest window
+            self.buckets[self.head % size] = 0.0
+
+    def add(self, timestamp, amount):
+        """Add ``amount`` at ``timestamp``; returns False if it is older than every window."""
+        bucket = int(timestamp // self.bucket_seconds)
+        self._advance(bucket)
+        age = self.head - bucket
+        if age >= len(self.buckets):
+            return False
+        self.buckets[bucket % len(self.buckets)] += amount
+        for k, window in enumerate(self.windows):
+            if age < window:
+                self.totals[k] += amount
+        return True
+
+    def sums(self, now):
+        """Window totals as of ``now`` (unix seconds)."""
+        self._advance(int(now // self.bucket_seconds))
+        # Running totals can drift a hair below zero through float cancellation
+        return [max(total, 0.0) for total in self.totals]
+
+
+class _SensorWindows:
+    __slots__ = ('rainfall', 'rockfall', 'last_maintenance')
+
+    def __init__(self):
+        self.rainfall = None
+        self.rockfall = None
+        self.last_maintenance = None
+
+
+class RollingFeatureStore:
+    """
+    Windowed features for every sensor, updated as raw events arrive.
+
+    Events are rain gauge ticks (``value`` in mm), rockfall events
+    (``value`` events, default 1) and maintenance records. Each sensor keeps
+    an hourly ring for rainfall (24 h and 7 d totals), a daily ring for
+    rockfall (30 d) and its last maintenance time, so recording an event is
+    O(1) amortized and ``features()`` is a constant-time lookup.
+
+    With ``path`` set, events passed to ``record()`` are appended to a SQLite
+    log that every process replays incrementally (new rows since the last
+    id it applied, at most every ``sync_interval`` seconds), so all gunicorn
+    workers see the same aggregates and a restart rebuilds them. Events older
+    than the longest window are pruned from the log. ``add_*`` apply an
+    event to this process only (used by the simulators).
+    """
+
+    def __init__(self, path=None, sync_interval=1.0):
+        self.path = path or None
+        self.sync_interval = float(sync_interval)
+
+        self._sensors = {}
+        self._lock = threading.RLock()
+        self._conn = None
+        self._pid = None
+        self._last_id = 0
+        self._last_sync = 0.0
+        self._last_prune = 0.0
+
+        self.recorded = 0
+        self.applied = 0
+        self.expired = 0
+
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with self._connect() as conn:
+                conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _connection(self):
+        # Caller holds the lock. A forked child keeps the parent's windows and
+        # position in the log, but not its connection
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = self._connect()
+            self._pid = os.getpid()
+        return self._conn
+
+    def _sensor(self, sensor_id):
+        windows = self._sensors.get(sensor_id)
+        if windows is None:
+            windows = self._sensors[sensor_id] = _SensorWindows()
+        return windows
+
+    # -- applying events -----------------------------------------------------
+
+    def _apply(self, sensor_id, event_type, ts, value):
+        windows = self._sensor(sensor_id)
+        if event_type == 'rainfall':
+            if windows.rainfall is None:
+                windows.rainfall = RollingWindowSum(HOUR, (24, 7 * 24))
+            kept = windows.rainfall.add(ts, value)
+        elif event_type == 'rockfall':
+            if windows.rockfall is None:
+                windows.rockfall = RollingWindowSum(DAY, (30,))
+            kept = windows.rockfall.add(ts, value)
+        else:
+            kept = True
+            if windows.last_maintenance is None or ts > windows.last_maintenance:
+                windows.last_maintenance = ts
+        self.applied += 1
+        if not kept:
+            self.expired += 1
+
+    def add_rainfall(self, sensor_id, timestamp, mm):
+        with self._lock:
+            self._apply(sensor_id, 'rainfall', timestamp, float(mm))
+
+    def add_rockfall(self, sensor_id, timestamp, count=1):
+        with self._lock:
+            self._apply(sensor_id, 'rockfall', timestamp, float(count))
+
+    def add_maintenance(self, sensor_id, timestamp):
+        with self._lock:
+            self._apply(sensor_id, 'maintenance', timestamp, 0.0)
+
+    @staticmethod
+    def parse_event(event, now=None):
+        """
+        Validate one raw event.
+
+        Returns:
+            tuple: (sensor_id, type, unix timestamp, value)
+
+        Raises:
+            ValueError: If the event is malformed
+        """
+        if not isinstance(event, dict):
+            raise ValueError("Event must be an object")
+        sensor_id = event.get('sensor_id')
+        if not isinstance(sensor_id, str) or not sensor_id:
+            raise ValueError("Missing sensor_id")
+        event_type = event.get('type')
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f"type must be one of {', '.join(EVENT_TYPES)}")
+
+        now = time.time() if now is None else now
+        ts = parse_timestamp(event.get('timestamp'), default=now)
+        if ts > now + MAX_CLOCK_SKEW:
+            raise ValueError("Event timestamp is in the future")
+
+        default = {'rainfall': None, 'rockfall': 1, 'maintenance': 0}[event_type]
+        value = event.get('value', default)
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            raise ValueError("value must be a non-negative number")
+        return sensor_id, event_type, ts, float(value)
+
+    def record(self, events):
+        """
+        Validate and record raw events (shared with every process when a log is configured).
+
+        Returns:
+            tuple: (number recorded, list of (index, error) for rejected events)
+        """
+        now = time.time()
+        parsed, errors = [], []
+        for i, event in enumerate(events):
+            try:
+                parsed.append(self.parse_event(event, now))
+            except ValueError as e:
+                errors.append((i, str(e)))
+
+        with self._lock:
+            if self.path is None:
+                for event in parsed:
+                    self._apply(*event)
+            elif parsed:
+                conn = self._connection()
+                with conn:
+                    conn.executemany('INSERT INTO events (sensor_id, type, ts, value) VALUES (?, ?, ?, ?)',
+                                     parsed)
+                    if now - self._last_prune > HOUR:
+                        conn.execute('DELETE FROM events WHERE ts < ?', (now - RETENTION,))
+                        self._last_prune = now
+                self._sync(force=True)
+            self.recorded += len(parsed)
+        return len(parsed), errors
+
+    def _sync(self, force=False):
+        # Caller holds the lock
+        if self.path is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_sync < self.sync_interval:
+            return
+        self._last_sync = now
+        try:
+            rows = self._connection().execute(
+                'SELECT id, sensor_id, type, ts, value FROM events WHERE id > ? ORDER BY id',
+                (self._last_id,)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Feature event sync failed: {e}")
+            return
+        for row_id, sensor_id, event_type, ts, value in rows:
+            self._apply(sensor_id, event_type, ts, value)
+            self._last_id = row_id
+
+    # -- lookups -----------------------------------------------------------
+
+    def features(self, sensor_id, now=None):
+        """
+        Windowed features of one sensor as of ``now``.
+
+        Returns:
+            dict: The features this sensor has events for (empty for an
+            unknown sensor); rockfall counts are 0 for known sensors without
+            rockfall events
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._sync()
+            windows = self._sensors.get(sensor_id)
+            if windows is None:
+                return {}
+            features = {}
+            if windows.rainfall is not None:
+                rain_24h, rain_7d = windows.rainfall.sums(now)
+                features['rainfall_24h'] = round(rain_24h, 1)
+                features['rainfall_7d'] = round(rain_7d, 1)
+            # No rockfall events recorded for a known sensor means none happened
+            features['previous_rockfall_30d'] = (int(round(windows.rockfall.sums(now)[0]))
+                                                 if windows.rockfall is not None else 0)
+            if windows.last_maintenance is not None:
+                features['maintenance_days_since'] = round(max(now - windows.last_maintenance, 0.0) / DAY, 1)
+            return features
+
+    def enrich(self, reading):
+        """Fill windowed features missing from ``reading`` (in place) from its sensor's events."""
+        sensor_id = reading.get('sensor_id')
+        if sensor_id is None or all(feature in reading for feature in WINDOWED_FEATURES):
+            return reading
+        for feature, value in self.features(str(sensor_id)).items():
+            reading.setdefault(feature, value)
+        return reading
+
+    def stats(self):
+        """Sensor and event counters for /health."""
+        with self._lock:
+            return {
+                'sensors': len(self._sensors),
+                'events_recorded': self.recorded,
+                'events_applied': self.applied,
+                'events_expired': self.expired,
+                'shared_log': self.path is not None,
+                'last_event_id': self._last_id
+            }
@@ -0,0 +1,14 @@
+"""
+Sensor Features
+The features every sensor reading carries, in model column order. Shared by
+the simulator, the time-series store and the risk grid; the model's own
+list comes with its artifacts (``model_info['feature_columns']``)
+"""
+
+FEATURE_COLUMNS = [
+    'slope_angle', 'joint_spacing', 'joint_orientation', 'rock_strength',
+    'weathering_index', 'rainfall_24h', 'rainfall_7d', 'temperature_variation',
+    'freeze_thaw_cycles', 'wind_speed', 'vibration_intensity', 'blast_distance',
+    'excavation_height', 'support_density', 'previous_rockfall_30d',
+    'maintenance_days_since'
+]
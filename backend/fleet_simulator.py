@@ -0,0 +1,225 @@
+"""
+Fleet Sensor Simulator
+Vectorized mock sensor data for many sensors at once: per-sensor base values
+and trends live in NumPy arrays and every sensor advances in one step
+"""
+
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from feature_store import DAY, HOUR, WINDOWED_FEATURES
+from features import FEATURE_COLUMNS
+
+# Fleet-wide typical value and per-sensor spread of each sensor's base value
+BASE_VALUES = {
+    'slope_angle': (45.0, 5.0),
+    'joint_spacing': (1.2, 0.2),
+    'rock_strength': (55.0, 5.0),
+    'weathering_index': (5.5, 0.5),
+    'rainfall_24h': (2.0, 1.0),
+    'temperature_variation': (15.0, 2.0),
+    'vibration_intensity': (2.0, 0.5),
+    'blast_distance': (200.0, 20.0),
+    'excavation_height': (25.0, 3.0),
+}
+
+# How strongly each drifting parameter follows its trend
+TREND_SCALE = {
+    'slope_angle': 100,
+    'joint_spacing': 5,
+    'rock_strength': 50,
+    'weathering_index': 10,
+    'rainfall_24h': 20,
+    'vibration_intensity': 5,
+}
+
+LOCATIONS = np.array(['Sector-North', 'Sector-East', 'Sector-South'])
+LOCATION_WEIGHTS = [0.5, 0.25, 0.25]  # Mostly North
+
+
+class FleetSimulator:
+    """
+    Stable, slowly drifting mock readings for ``n_sensors`` sensors.
+
+    Follows the same rules as the single-sensor demo generator (bounds,
+    rounding, trend drift every ``trend_interval`` seconds and a daily
+    temperature cycle peaking at 2 PM) but keeps its own base values and
+    trends for every sensor, so each one tells a consistent story over time.
+    ``step()`` returns a columnar batch (one array per field) that can be
+    passed straight to ``RockfallPredictor.predict_batch`` or posted as the
+    ``columns`` object of ``/predict/batch``.
+
+    With a ``feature_store`` the windowed features are not synthesized:
+    each step emits raw rain gauge ticks, rockfall events and maintenance
+    records into the store (locally, after backfilling 30 days of history)
+    and reads ``rainfall_24h``, ``rainfall_7d``, ``previous_rockfall_30d``
+    and ``maintenance_days_since`` back from it. That costs a few Python
+    calls per sensor, so it is meant for small demo fleets.
+
+    A simulator may be shared by request threads and the live stream:
+    ``step()``, ``frame()`` and ``current_reading()`` hold a lock, and
+    ``frame()``/``current_reading()`` reuse the latest step while it is
+    younger than ``max_age`` seconds.
+    """
+
+    def __init__(self, n_sensors, seed=None, trend_interval=10.0, first_sensor_id=1001,
+                 feature_store=None):
+        if n_sensors < 1:
+            raise ValueError("n_sensors must be positive")
+
+        self.n_sensors = int(n_sensors)
+        self.trend_interval = float(trend_interval)
+        self.rng = np.random.default_rng(seed)
+
+        self.base = {}
+        for field, (value, spread) in BASE_VALUES.items():
+            self.base[field] = value + self.rng.uniform(-spread, spread, self.n_sensors)
+        self.base['rainfall_24h'] = np.maximum(self.base['rainfall_24h'], 0.0)
+
+        self.trends = {field: np.zeros(self.n_sensors) for field in TREND_SCALE}
+        self.sensor_ids = np.array([f"RS_{first_sensor_id + i}" for i in range(self.n_sensors)])
+        self.locations = self.rng.choice(LOCATIONS, size=self.n_sensors, p=LOCATION_WEIGHTS)
+        self.last_update = datetime.now()
+        self.last_step = None
+        self._frame = None
+        self._lock = threading.Lock()
+
+        self.feature_store = feature_store
+        if feature_store is not None:
+            self._backfill_events(self.last_update.timestamp())
+
+    def _backfill_events(self, now):
+        """Seed the feature store with a plausible recent history for every sensor."""
+        store = self.feature_store
+        hourly_rain = np.maximum(self.base['rainfall_24h'], 0.0) / 24
+        for i, sensor_id in enumerate(self.sensor_ids.tolist()):
+            for hours_ago in range(7 * 24, 0, -1):
+                store.add_rainfall(sensor_id, now - hours_ago * HOUR, hourly_rain[i] * self.rng.uniform(0.5, 1.5))
+            if self.rng.random() < 0.25:
+                store.add_rockfall(sensor_id, now - self.rng.uniform(0, 30 * DAY))
+            store.add_maintenance(sensor_id, now - self.rng.uniform(5, 11) * DAY)
+
+    def _emit_events(self, now, seconds):
+        """Raw events for the ``seconds`` since the previous step."""
+        store = self.feature_store
+        n = self.n_sensors
+        rain = np.maximum(self.base['rainfall_24h'] + self.trends['rainfall_24h'] * TREND_SCALE['rainfall_24h'],
+                          0.0) / DAY * seconds
+        rockfalls = self.rng.random(n) < 0.3 * seconds / (30 * DAY)
+        maintenance = self.rng.random(n) < seconds / (7 * DAY)
+        for i, sensor_id in enumerate(self.sensor_ids.tolist()):
+            store.add_rainfall(sensor_id, now, rain[i])
+            if rockfalls[i]:
+                store.add_rockfall(sensor_id, now)
+            if maintenance[i]:
+                store.add_maintenance(sensor_id, now)
+
+    def step(self, now=None):
+        """
+        Advance every sensor and return the new readings.
+
+        Args:
+            now (datetime): Time of the readings (default: current time)
+
+        Returns:
+            dict: Field name -> array of length ``n_sensors`` for every model
+            feature plus ``sensor_id`` and ``location``
+        """
+        with self._lock:
+            return self._step(now or datetime.now())
+
+    def frame(self, max_age=0.0, now=None):
+        """
+        The latest readings, stepping only if they are ``max_age`` seconds old.
+
+        Returns:
+            tuple: (time of the step, columns as returned by ``step()``)
+        """
+        now = now or datetime.now()
+        with self._lock:
+            if self._frame is None or (now - self.last_step).total_seconds() >= max_age:
+                self._step(now)
+            return self.last_step, self._frame
+
+    def current_reading(self, index, max_age=0.0, now=None):
+        """One sensor's reading from ``frame(max_age)`` as a plain dict."""
+        now = now or datetime.now()
+        with self._lock:
+            if self._frame is None or (now - self.last_step).total_seconds() >= max_age:
+                self._step(now)
+            return self.reading(self._frame, index)
+
+    def _step(self, now):
+        # Caller holds the lock
+        n = self.n_sensors
+        uniform = self.rng.uniform
+
+        # Update trends very gradually for smooth changes
+        if (now - self.last_update).total_seconds() > self.trend_interval:
+            for field, trend in self.trends.items():
+                trend += uniform(-0.005, 0.005, n)
+                np.clip(trend, -0.02, 0.02, out=trend)
+            self.last_update = now
+
+        def drifted(field, noise):
+            return self.base[field] + self.trends[field] * TREND_SCALE[field] + uniform(-noise, noise, n)
+
+        columns = {
+            'slope_angle': np.clip(np.round(drifted('slope_angle', 0.3), 1), 25.0, 75.0),
+            'joint_spacing': np.clip(np.round(drifted('joint_spacing', 0.02), 2), 0.1, 3.0),
+            'rock_strength': np.clip(np.round(drifted('rock_strength', 0.8), 1), 20.0, 90.0),
+            'weathering_index': np.clip(np.round(drifted('weathering_index', 0.05), 1), 1.0, 10.0),
+            'rainfall_24h': np.round(np.maximum(drifted('rainfall_24h', 0.1), 0.0), 1),
+        }
+        if self.feature_store is None:
+            columns['rainfall_7d'] = np.maximum(np.round(columns['rainfall_24h'] * 7 + uniform(-1, 1, n), 1), 0.0)
+
+        # Temperature with realistic daily variation patterns
+        daily_temp_cycle = 3 * np.sin((now.hour + now.minute / 60.0 - 6) * np.pi / 12)  # Peak at 2 PM
+        columns['temperature_variation'] = np.clip(
+            np.round(self.base['temperature_variation'] + daily_temp_cycle + uniform(-0.2, 0.2, n), 1),
+            5.0, 35.0
+        )
+        columns['vibration_intensity'] = np.clip(
+            np.round(np.maximum(drifted('vibration_intensity', 0.05), 0.1), 2), 0.1, 8.0
+        )
+
+        # Other parameters with minimal variation
+        columns['joint_orientation'] = np.round(180 + uniform(-15, 15, n), 1)
+        columns['freeze_thaw_cycles'] = (self.rng.random(n) < 0.25).astype(np.int64)  # Mostly 0
+        columns['wind_speed'] = np.round(np.maximum(8 + uniform(-1.5, 1.5, n), 0.0), 1)
+        columns['blast_distance'] = np.round(self.base['blast_distance'] + uniform(-5, 5, n), 1)
+        columns['excavation_height'] = np.round(self.base['excavation_height'] + uniform(-0.5, 0.5, n), 1)
+        columns['support_density'] = np.round(0.6 + uniform(-0.05, 0.05, n), 2)
+        if self.feature_store is None:
+            columns['previous_rockfall_30d'] = (self.rng.random(n) < 0.25).astype(np.int64)
+            columns['maintenance_days_since'] = self.rng.integers(5, 11, n)
+        else:
+            seconds = (now - self.last_step).total_seconds() if self.last_step is not None else 0.0
+            if seconds > 0:
+                self._emit_events(now.timestamp(), seconds)
+            windowed = [self.feature_store.features(sensor_id, now.timestamp())
+                        for sensor_id in self.sensor_ids.tolist()]
+            for feature in WINDOWED_FEATURES:
+                columns[feature] = np.array([features[feature] for features in windowed])
+
+        columns['sensor_id'] = self.sensor_ids
+        columns['location'] = self.locations
+        self.last_step = now
+        self._frame = columns
+        return columns
+
+    def reading(self, columns, index):
+        """One sensor's reading from a ``step()`` batch as a plain dict."""
+        reading = {field: columns[field][index].item() for field in FEATURE_COLUMNS}
+        reading['sensor_id'] = str(columns['sensor_id'][index])
+        reading['location'] = str(columns['location'][index])
+        reading['timestamp'] = (self.last_step or datetime.now()).isoformat()
+        return reading
+
+
+def to_json_columns(columns, limit=None):
+    """Columnar batch as JSON-serializable lists (optionally the first ``limit`` sensors)."""
+    return {field: values[:limit].tolist() for field, values in columns.items()}
@@ -0,0 +1,55 @@
+"""
+Gunicorn configuration for the Rockfall Prediction API
+Preloads the app so the model is loaded once in the master and shared
+copy-on-write by all workers, and logs per-worker memory after fork.
+Threaded workers let idle /stream/live clients wait on a cheap thread
+instead of occupying a whole worker process; each stream still holds one of
+the worker's threads, so streams beyond LIVE_STREAM_MAX_CLIENTS are refused
+(serve asgi:app with uvicorn for more dashboards). Each worker hot-swaps the
+model on SIGHUP (send it to the workers; SIGHUP to the master restarts
+them from the preloaded model, which the watcher then updates). Metrics
+are merged across workers through METRICS_MULTIPROC_DIR.
+"""
+
+import glob
+import os
+import sys
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+timeout = 120
+preload_app = True
+
+# Workers share their /metrics through snapshot files in this directory (set
+# before the app is preloaded, which reads it)
+os.environ.setdefault('METRICS_MULTIPROC_DIR',
+                      os.path.join(tempfile.gettempdir(), f"rockfall-metrics-{os.environ.get('PORT', 5000)}"))
+
+
+def on_starting(server):
+    """Drop metric snapshots left by a previous run, so counters start from zero."""
+    for path in glob.glob(os.path.join(os.environ['METRICS_MULTIPROC_DIR'], '*.json')):
+        os.remove(path)
+
+
+def post_fork(server, worker):
+    """Log the memory of each freshly forked worker."""
+    from memory_stats import process_memory, format_memory
+
+    server.log.info(f"Worker {worker.pid} forked, {format_memory(process_memory())}")
+
+
+def post_worker_init(worker):
+    """Log worker memory again once the worker has imported and initialized the app."""
+    from memory_stats import process_memory, format_memory
+
+    worker.log.info(f"Worker {worker.pid} ready, {format_memory(process_memory())}")
+
+    # Gunicorn resets worker signal handlers, so install the reload handler here
+    app_module = sys.modules.get('app')
+    if app_module is not None and app_module.prediction_mode == 'model':
+        app_module.model_manager.install_signal_handler()
+        app_module.model_manager.ensure_watching()
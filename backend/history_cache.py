@@ -0,0 +1,149 @@
+"""
+Materialized History Views
+Keeps hourly /historical-data responses materialized per hour bucket, with
+strong ETags and summaries maintained incrementally as new points arrive
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+HOUR = 3600
+
+
+def make_etag(*parts):
+    """Strong (unquoted) ETag from the parts that fully determine a response body."""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+
+
+class _HourlyView:
+    """Materialized points and running summary for one (sensor, location, window length) view."""
+
+    def __init__(self):
+        self.points = {}          # hour_ts -> (reading count, point)
+        self.sum_risk_tenths = 0  # risk probabilities are rounded to 0.1
+        self.high_risk_alerts = 0
+        self.etag = None
+        self.bodies = {}          # variant -> encoded body for self.etag
+
+    def remove(self, hour, high_risk_threshold):
+        _, point = self.points.pop(hour)
+        self.sum_risk_tenths -= round(point['risk_probability'] * 10)
+        self.high_risk_alerts -= point['risk_probability'] > high_risk_threshold
+
+    def add(self, hour, count, point, high_risk_threshold):
+        self.points[hour] = (count, point)
+        self.sum_risk_tenths += round(point['risk_probability'] * 10)
+        self.high_risk_alerts += point['risk_probability'] > high_risk_threshold
+
+    def payload(self):
+        return {
+            'data': [self.points[hour][1] for hour in sorted(self.points)],
+            'summary': self.summary(),
+            'source': 'store'
+        }
+
+    def summary(self):
+        if not self.points:
+            return {'total_points': 0, 'avg_risk': 0.0, 'high_risk_alerts': 0, 'trend': 'stable'}
+        first = self.points[min(self.points)][1]['risk_probability']
+        last = self.points[max(self.points)][1]['risk_probability']
+        return {
+            'total_points': len(self.points),
+            'avg_risk': round(self.sum_risk_tenths / 10 / len(self.points), 1),
+            'high_risk_alerts': self.high_risk_alerts,
+            'trend': 'stable' if abs(last - first) < 10 else 'increasing'
+        }
+
+
+class HourlyHistoryCache:
+    """
+    Hour-bucketed history responses served from materialized state.
+
+    Each request first reads the per-hour reading counts for its window (a
+    handful of rollup rows). Those counts act as the version of the window:
+    if they are unchanged the cached body and ETag are returned without
+    touching any point, and a matching ``If-None-Match`` can be answered
+    with 304 straight away. Otherwise only hours whose count changed are
+    re-read, hours that slid out of the window are dropped, and the
+    summary is adjusted by the difference instead of being recomputed.
+    """
+
+    def __init__(self, store, encode, high_risk_threshold=60.0, max_views=256):
+        self.store = store
+        self.encode = encode  # (payload, variant) -> body
+        self.high_risk_threshold = high_risk_threshold
+        self.max_views = int(max_views)
+        self._views = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.unchanged = 0
+        self.hours_refreshed = 0
+
+    def etag(self, start_hour, end_hour, sensor_id=None, location=None):
+        """Return ``(etag, counts)`` for a window without materializing it."""
+        counts = self.store.hourly_counts(start_hour, end_hour, sensor_id, location)
+        return make_etag('hourly', sensor_id, location, start_hour, end_hour,
+                         sorted(counts.items())), counts
+
+    def response(self, start_hour, end_hour, sensor_id=None, location=None, counts=None, etag=None,
+                 variant='json'):
+        """
+        Serialized body and ETag for hourly points in ``[start_hour, end_hour)``.
+
+        Every variant (JSON, MessagePack, columnar) of the current window is
+        encoded once and kept until the window changes.
+
+        Returns:
+            tuple: ``(etag, body)`` where body is the response encoded as ``variant``
+        """
+        if counts is None or etag is None:
+            etag, counts = self.etag(start_hour, end_hour, sensor_id, location)
+
+        # Windows of the same length slide hour by hour, so keying on the
+        # length keeps them incremental while a 24h and a 7d request on the
+        # same filter no longer evict each other's points on every call
+        key = (sensor_id, location, end_hour - start_hour)
+        with self._lock:
+            self.requests += 1
+            view = self._views.get(key)
+            if view is None:
+                view = self._views[key] = _HourlyView()
+            self._views.move_to_end(key)
+            while len(self._views) > self.max_views:
+                self._views.popitem(last=False)
+
+            if view.etag == etag:
+                self.unchanged += 1
+                if variant not in view.bodies:
+                    view.bodies[variant] = self.encode(view.payload(), variant)
+                return etag, view.bodies[variant]
+
+            for hour in [h for h in view.points
+                         if h < start_hour or h >= end_hour or h not in counts]:
+                view.remove(hour, self.high_risk_threshold)
+
+            dirty = [hour for hour, count in counts.items()
+                     if hour not in view.points or view.points[hour][0] != count]
+            if dirty:
+                fresh = self.store.hourly_points(dirty, sensor_id, location)
+                for hour in dirty:
+                    if hour in view.points:
+                        view.remove(hour, self.high_risk_threshold)
+                    if hour in fresh:
+                        view.add(hour, counts[hour], fresh[hour], self.high_risk_threshold)
+                self.hours_refreshed += len(dirty)
+
+            view.etag = etag
+            view.bodies = {variant: self.encode(view.payload(), variant)}
+            return etag, view.bodies[variant]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'views': len(self._views),
+                'requests': self.requests,
+                'unchanged': self.unchanged,
+                'hours_refreshed': self.hours_refreshed
+            }
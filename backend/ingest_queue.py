@@ -0,0 +1,190 @@
+"""
+Ingestion Queue
+Bounded in-process queue for pushed sensor readings, drained by a background
+worker that scores them in micro-batches and hands the results to a sink
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+RATE_WINDOW = 10.0  # seconds of history used for the ingest rate
+
+
+class MicroBatcher:
+    """
+    Collects readings and scores them in micro-batches.
+
+    The worker takes the first waiting reading, then keeps gathering until
+    it has ``max_batch`` readings or ``max_delay`` seconds have passed, and
+    scores the batch with one ``score(readings) -> predictions`` call before
+    passing both lists to ``sink(readings, predictions)``. Under load the
+    batches fill up and the per-reading cost approaches that of a large
+    batch; when traffic is light a reading waits at most ``max_delay``.
+
+    ``submit`` never blocks: once ``max_queue`` readings are waiting the
+    rest are refused, so a fast gateway gets backpressure instead of the
+    process growing without bound. Like the time-series writer, the queue
+    and worker thread are created lazily per process.
+    """
+
+    def __init__(self, score, sink, max_batch=500, max_delay=0.05, max_queue=50000, on_batch=None):
+        self.score = score
+        self.sink = sink
+        self.max_batch = int(max_batch)
+        self.max_delay = float(max_delay)
+        self.max_queue = int(max_queue)
+        self.on_batch = on_batch
+
+        self._pid = None
+        self._queue = None
+        self._worker = None
+        self._init_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._recent = deque()  # (monotonic time, readings scored)
+
+        self.received = 0
+        self.rejected = 0
+        self.scored = 0
+        self.failed = 0
+        self.batches = 0
+        self.max_batch_seen = 0
+        self.last_batch_ms = 0.0
+
+    def _ensure_worker(self):
+        if self._pid == os.getpid() and self._worker is not None and self._worker.is_alive():
+            return
+        with self._init_lock:
+            if self._pid != os.getpid() or self._worker is None or not self._worker.is_alive():
+                self._pid = os.getpid()
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._worker = threading.Thread(target=self._run, name='ingest-worker', daemon=True)
+                self._worker.start()
+
+    def submit(self, readings):
+        """
+        Queue readings for scoring.
+
+        Returns:
+            int: Number of readings accepted; the remainder (from that index
+            on) was refused because the queue is full
+        """
+        self._ensure_worker()
+        accepted = 0
+        for reading in readings:
+            try:
+                self._queue.put_nowait(reading)
+            except queue.Full:
+                break
+            accepted += 1
+
+        with self._stats_lock:
+            self.received += accepted
+            self.rejected += len(readings) - accepted
+        return accepted
+
+    @property
+    def depth(self):
+        """Readings waiting to be scored in this process."""
+        return self._queue.qsize() if self._queue is not None and self._pid == os.getpid() else 0
+
+    def drain(self, timeout=5.0):
+        """Block until every queued reading has been scored (best effort)."""
+        if self._queue is None or self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    # Take whatever is already waiting without sleeping
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    pass
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            start = time.perf_counter()
+            try:
+                self._process(batch)
+            except Exception as e:
+                logger.error(f"Ingest batch of {len(batch)} readings failed: {e}")
+                with self._stats_lock:
+                    self.failed += len(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+            seconds = time.perf_counter() - start
+            self.last_batch_ms = seconds * 1000
+            if self.on_batch is not None:
+                self.on_batch(len(batch), seconds)
+
+    def _process(self, batch):
+        try:
+            predictions = self.score(batch)
+        except ValueError:
+            # One bad reading fails the whole batch call; score individually
+            # so that only the bad readings are lost
+            scored, predictions = [], []
+            for reading in batch:
+                try:
+                    predictions.append(self.score([reading])[0])
+                    scored.append(reading)
+                except ValueError:
+                    with self._stats_lock:
+                        self.failed += 1
+            batch = scored
+
+        if batch:
+            self.sink(batch, predictions)
+
+        now = time.monotonic()
+        with self._stats_lock:
+            self.scored += len(batch)
+            self.batches += 1
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            self._recent.append((now, len(batch)))
+            while self._recent and now - self._recent[0][0] > RATE_WINDOW:
+                self._recent.popleft()
+
+    def rate(self):
+        """Readings scored per second over the last ``RATE_WINDOW`` seconds."""
+        now = time.monotonic()
+        with self._stats_lock:
+            recent = sum(n for t, n in self._recent if now - t <= RATE_WINDOW)
+        return recent / RATE_WINDOW
+
+    def stats(self):
+        """Queue and throughput counters for monitoring."""
+        rate = self.rate()
+        with self._stats_lock:
+            return {
+                'queue_depth': self.depth,
+                'max_queue': self.max_queue,
+                'received': self.received,
+                'rejected': self.rejected,
+                'scored': self.scored,
+                'failed': self.failed,
+                'batches': self.batches,
+                'avg_batch_size': round(self.scored / self.batches, 1) if self.batches else 0.0,
+                'max_batch_size': self.max_batch_seen,
+                'last_batch_ms': round(self.last_batch_ms, 3),
+                'readings_per_sec': round(rate, 1)
+            }
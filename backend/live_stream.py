@@ -0,0 +1,287 @@
+"""
+Live Data Broadcaster
+A single producer thread generates each live reading and prediction once and
+fans the serialized event out to every connected Server-Sent Events client
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+KEEPALIVE_FRAME = b': keep-alive\n\n'
+
+
+class LiveBroadcaster:
+    """
+    Produce-once, fan-out-to-all publisher for Server-Sent Events.
+
+    Only the most recent event is kept. A client that is slower than the
+    producer skips straight to the newest event when it is ready again, so a
+    stalled connection never queues data on the server (per-client
+    backpressure with constant memory), and per-tick work is one call to
+    ``produce`` plus one serialization regardless of how many clients listen.
+    The producer thread starts with the first subscriber and stops once
+    nobody has been listening for ``idle_timeout`` seconds.
+
+    Under a threaded server every open stream holds a worker thread, so at
+    most ``max_subscribers`` streams (None for no limit) are served at once;
+    ``subscribe()`` refuses the rest, which should be told to retry later.
+    On an asyncio server ``subscribe_async()`` serves a stream as a
+    coroutine waiting on an ``asyncio.Event`` that the producer sets through
+    the loop, so an idle client costs a socket and a few objects rather
+    than a thread; those streams have their own, much larger limit,
+    ``max_async_subscribers``.
+    """
+
+    def __init__(self, produce, interval=3.0, keepalive=15.0, idle_timeout=30.0, max_subscribers=None,
+                 max_async_subscribers=None):
+        self.produce = produce
+        self.interval = float(interval)
+        self.keepalive = float(keepalive)
+        self.idle_timeout = float(idle_timeout)
+        self.max_subscribers = max_subscribers
+        self.max_async_subscribers = max_async_subscribers
+
+        self._condition = threading.Condition()
+        self._frame = None
+        self._seq = 0
+        self._subscribers = 0        # every open stream (keeps the producer running)
+        self._async_subscribers = 0  # of which served by subscribe_async()
+        self._wakeups = {}           # event loop -> asyncio.Event set on the next tick
+        self._closing = False
+        self._producer = None
+
+        self.ticks = 0
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self.last_tick_seconds = 0.0
+        self.rejected = 0
+
+    def subscribe(self):
+        """
+        Reserve a stream for one client.
+
+        Returns:
+            Iterable of SSE frames (bytes) whose ``close()`` frees the slot,
+            or None when ``max_subscribers`` streams are already open
+        """
+        with self._condition:
+            if (self.max_subscribers is not None
+                    and self._subscribers - self._async_subscribers >= self.max_subscribers):
+                self.rejected += 1
+                return None
+            self._subscribers += 1
+            self._ensure_producer()
+        return _Subscription(self)
+
+    def subscribe_async(self):
+        """
+        Reserve a stream for one client of an asyncio server (call on its event loop).
+
+        Returns:
+            Async iterable of SSE frames (bytes) whose ``aclose()`` frees the
+            slot, or None when ``max_async_subscribers`` such streams are
+            already open or the server is shutting down
+        """
+        with self._condition:
+            if self._closing or (self.max_async_subscribers is not None
+                                 and self._async_subscribers >= self.max_async_subscribers):
+                self.rejected += 1
+                return None
+            self._subscribers += 1
+            self._async_subscribers += 1
+            self._ensure_producer()
+        return _AsyncSubscription(self, asyncio.get_running_loop())
+
+    def close_async_streams(self):
+        """End every asyncio stream after its current frame, so a server can shut down."""
+        with self._condition:
+            self._closing = True
+            self._wake_loops()
+
+    def _take(self, seen):
+        # Caller holds the condition lock; returns (sequence, newest frame or None)
+        if self._seq <= seen:
+            return seen, None
+        if seen:
+            self.frames_skipped += self._seq - seen - 1
+        self.frames_sent += 1
+        return self._seq, self._frame
+
+    def _events(self):
+        """
+        Generator of SSE frames (bytes) for one subscribed client.
+
+        Blocks on a condition variable between ticks, so an idle client costs
+        a sleeping thread and no CPU. The subscriber is released when the
+        generator is closed.
+        """
+        with self._condition:
+            seen = self._seq
+
+        try:
+            yield f"retry: {int(self.interval * 1000)}\n\n".encode()
+            if self._frame is not None:
+                yield self._frame
+
+            while True:
+                with self._condition:
+                    self._condition.wait_for(lambda: self._seq > seen, timeout=self.keepalive)
+                    seen, frame = self._take(seen)
+                yield frame or KEEPALIVE_FRAME
+        finally:
+            self._release()
+
+    async def _async_events(self, loop):
+        """Async generator of SSE frames for one client of ``loop``; like ``_events``."""
+        with self._condition:
+            seen = self._seq
+
+        try:
+            yield f"retry: {int(self.interval * 1000)}\n\n".encode()
+            if self._frame is not None:
+                yield self._frame
+
+            while True:
+                with self._condition:
+                    if self._closing:
+                        return
+                    seen, frame = self._take(seen)
+                    if frame is None:
+                        wakeup = self._wakeups.get(loop)
+                        if wakeup is None:
+                            wakeup = self._wakeups[loop] = asyncio.Event()
+                if frame is None:
+                    try:
+                        await asyncio.wait_for(wakeup.wait(), self.keepalive)
+                        continue
+                    except asyncio.TimeoutError:
+                        frame = KEEPALIVE_FRAME
+                yield frame
+        finally:
+            self._release(async_stream=True)
+
+    def _wake_loops(self):
+        # Caller holds the condition lock; runs _wake on every loop with waiting streams
+        for loop in list(self._wakeups):
+            try:
+                loop.call_soon_threadsafe(self._wake, loop)
+            except RuntimeError:
+                del self._wakeups[loop]  # the loop is closed
+
+    def _wake(self, loop):
+        # On ``loop``: streams waiting on the current event wake, later ones get a fresh one
+        with self._condition:
+            wakeup = self._wakeups.pop(loop, None)
+        if wakeup is not None:
+            wakeup.set()
+
+    def _release(self, async_stream=False):
+        with self._condition:
+            self._subscribers -= 1
+            if async_stream:
+                self._async_subscribers -= 1
+
+    def _ensure_producer(self):
+        # Caller holds the condition lock
+        if self._producer is None or not self._producer.is_alive():
+            self._producer = threading.Thread(target=self._run, name='live-producer', daemon=True)
+            self._producer.start()
+
+    def _run(self):
+        idle_since = None
+        while True:
+            with self._condition:
+                if self._subscribers == 0:
+                    idle_since = idle_since or time.monotonic()
+                    if time.monotonic() - idle_since >= self.idle_timeout:
+                        self._producer = None
+                        return
+                else:
+                    idle_since = None
+
+            start = time.perf_counter()
+            try:
+                payload = self.produce()
+                with self._condition:
+                    self._seq += 1
+                    data = json.dumps(payload, separators=(',', ':'))
+                    self._frame = f"id: {self._seq}\ndata: {data}\n\n".encode()
+                    self.ticks += 1
+                    self._condition.notify_all()
+                    self._wake_loops()
+            except Exception as e:
+                logger.error(f"Live stream producer error: {e}")
+            self.last_tick_seconds = time.perf_counter() - start
+
+            time.sleep(max(0.0, self.interval - self.last_tick_seconds))
+
+    def stats(self):
+        """Subscriber and throughput counters."""
+        with self._condition:
+            return {
+                'subscribers': self._subscribers,
+                'max_subscribers': self.max_subscribers,
+                'async_subscribers': self._async_subscribers,
+                'max_async_subscribers': self.max_async_subscribers,
+                'rejected': self.rejected,
+                'producer_running': self._producer is not None and self._producer.is_alive(),
+                'interval_seconds': self.interval,
+                'ticks': self.ticks,
+                'frames_sent': self.frames_sent,
+                'frames_skipped': self.frames_skipped,
+                'last_tick_ms': round(self.last_tick_seconds * 1000, 3)
+            }
+
+
+class _Subscription:
+    """One reserved stream; the slot is freed once, even if it never started."""
+
+    def __init__(self, broadcaster):
+        self._broadcaster = broadcaster
+        self._frames = None
+        self._closed = False
+
+    def __iter__(self):
+        if self._frames is None:
+            self._frames = self._broadcaster._events()
+        return self._frames
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._frames is None or inspect.getgeneratorstate(self._frames) == inspect.GEN_CREATED:
+            self._broadcaster._release()  # the generator's own cleanup never ran
+        if self._frames is not None:
+            self._frames.close()
+
+
+class _AsyncSubscription:
+    """One reserved asyncio stream; the slot is freed once, even if it never started."""
+
+    def __init__(self, broadcaster, loop):
+        self._broadcaster = broadcaster
+        self._frames = broadcaster._async_events(loop)
+        self._started = False
+        self._closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        self._started = True
+        return await self._frames.__anext__()
+
+    async def aclose(self):
+        if self._closed:
+            return
+        self._closed = True
+        if not self._started:
+            self._broadcaster._release(async_stream=True)  # the generator's own cleanup never ran
+        await self._frames.aclose()
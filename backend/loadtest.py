@@ -0,0 +1,414 @@
+"""
+Load Generator
+Replays reproducible traffic scenarios (dashboard viewers, /predict bursts,
+batch ingestion) against the API, optionally starting a local gunicorn or
+Flask server first, and reports throughput, error rate and p50/p95/p99
+latency per endpoint
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from fleet_simulator import FleetSimulator, to_json_columns
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class Recorder:
+    """Thread-safe log of (endpoint, seconds since start, latency, status, error) samples."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, started, latency, status, error=None):
+        with self._lock:
+            self.samples.append((endpoint, started - self.start, latency, status, error))
+
+
+class Client:
+    """
+    One virtual user's keep-alive HTTP connection; every request is timed
+    into ``recorder``.
+
+    Like a browser, a request whose reused connection turns out to have been
+    closed by the server's keep-alive timeout is retried once on a new
+    connection (the reconnect counts towards its latency).
+    """
+
+    def __init__(self, base_url, recorder, timeout=30.0):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.https = parts.scheme == 'https'
+        self.recorder = recorder
+        self.timeout = timeout
+        self.conn = None
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        self.conn = cls(self.host, self.port, timeout=self.timeout)
+
+    def request(self, endpoint, method, path, body=None, headers=None):
+        """
+        Send one request and read the whole response.
+
+        Returns:
+            tuple: (status, headers, body), status 0 if the request failed
+        """
+        headers = dict(headers or {})
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode()
+            headers.setdefault('Content-Type', 'application/json')
+        started = time.perf_counter()
+        retry = self.conn is not None
+        while True:
+            if self.conn is None:
+                self._connect()
+            try:
+                self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                data = response.read()
+                break
+            except (OSError, http.client.HTTPException) as e:
+                self.conn.close()
+                self.conn = None
+                if retry and isinstance(e, (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)):
+                    retry = False
+                    continue
+                self.recorder.record(endpoint, started, time.perf_counter() - started, 0, type(e).__name__)
+                return 0, {}, b''
+        self.recorder.record(endpoint, started, time.perf_counter() - started, response.status)
+        return response.status, dict(response.getheaders()), data
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+
+# -- scenarios ---------------------------------------------------------------
+#
+# A user function runs one virtual user until ``stop`` is set. ``rng`` and
+# ``fleet`` are seeded per user, so a scenario sends the same requests in the
+# same order for a given seed.
+
+def _sleep(stop, seconds):
+    return stop.wait(seconds)
+
+
+def dashboard_user(client, rng, fleet, stop, options):
+    """A dashboard tab: history and health on load, then /mock-data every ``poll_interval`` s."""
+    _, headers, _ = client.request('GET /historical-data', 'GET', '/historical-data')
+    client.request('GET /health', 'GET', '/health')
+    etag = headers.get('ETag')
+    # Tabs were opened at different times, so polls are spread over the interval
+    if _sleep(stop, rng.uniform(0, options['poll_interval'])):
+        return
+    polls = 0
+    while not stop.is_set():
+        client.request('GET /mock-data', 'GET', '/mock-data')
+        polls += 1
+        if polls % options['history_every'] == 0:
+            # The chart revalidates its cached history
+            status, headers, _ = client.request(
+                'GET /historical-data', 'GET', '/historical-data',
+                headers={'If-None-Match': etag} if etag else None)
+            if status == 200:
+                etag = headers.get('ETag')
+        if _sleep(stop, options['poll_interval']):
+            return
+
+
+def predict_user(client, rng, fleet, stop, options):
+    """Bursts of back-to-back POST /predict calls separated by idle pauses."""
+    while not stop.is_set():
+        columns = fleet.step()
+        for index in range(options['burst_size']):
+            if stop.is_set():
+                return
+            client.request('POST /predict', 'POST', '/predict',
+                           body=fleet.reading(columns, index % fleet.n_sensors))
+        _sleep(stop, rng.expovariate(1.0 / options['burst_pause']))
+
+
+def ingest_user(client, rng, fleet, stop, options):
+    """A field gateway alternating columnar /predict/batch calls and NDJSON /ingest uploads."""
+    while not stop.is_set():
+        columns = fleet.step()
+        client.request('POST /predict/batch', 'POST', '/predict/batch',
+                       body={'columns': to_json_columns(columns)})
+        lines = []
+        for _ in range(options['ingest_batches']):
+            columns = fleet.step()
+            lines.extend(json.dumps(fleet.reading(columns, i)) for i in range(fleet.n_sensors))
+        client.request('POST /ingest', 'POST', '/ingest', body=('\n'.join(lines) + '\n').encode(),
+                       headers={'Content-Type': 'application/x-ndjson'})
+        _sleep(stop, options['ingest_interval'])
+
+
+USER_TYPES = {'dashboard': dashboard_user, 'predict': predict_user, 'ingest': ingest_user}
+
+# Scenario name -> user type weights and defaults for the user options
+SCENARIOS = {
+    'dashboard': {'users': {'dashboard': 1.0}},
+    'predict-burst': {'users': {'predict': 1.0}},
+    'ingest': {'users': {'ingest': 1.0}},
+    'mixed': {'users': {'dashboard': 0.7, 'predict': 0.2, 'ingest': 0.1}},
+    # Only routes the ASGI entry point serves too, for comparing deployments
+    'interactive': {'users': {'dashboard': 0.8, 'predict': 0.2}},
+}
+DEFAULT_OPTIONS = {
+    'poll_interval': 3.0,      # the frontend polls /mock-data every 3 s
+    'history_every': 10,       # polls between history revalidations
+    'burst_size': 20,
+    'burst_pause': 1.0,        # mean seconds between bursts
+    'batch_size': 100,         # sensors per /predict/batch call and per ingest block
+    'ingest_batches': 10,      # blocks per /ingest upload
+    'ingest_interval': 1.0
+}
+
+
+def assign_users(scenario, users, seed):
+    """Deterministic user types for ``users`` virtual users, in proportion to the scenario weights."""
+    weights = SCENARIOS[scenario]['users']
+    counts = {user_type: int(users * weight) for user_type, weight in weights.items()}
+    # Largest remainders get the users left over after rounding down
+    by_remainder = sorted(weights, key=lambda t: users * weights[t] - counts[t], reverse=True)
+    for user_type in by_remainder[:users - sum(counts.values())]:
+        counts[user_type] += 1
+    types = [user_type for user_type, count in counts.items() for _ in range(count)]
+    random.Random(seed).shuffle(types)
+    return types
+
+
+# -- running -----------------------------------------------------------------
+
+def start_server(kind, port, env=None, timeout=60.0):
+    """
+    Start a local API server in ``backend/`` and wait until /health answers.
+
+    ``kind`` is ``gunicorn`` (the Dockerfile command with gunicorn.conf.py),
+    ``flask`` (the development server) or ``uvicorn`` (the ASGI entry point
+    in asgi.py).
+
+    Returns:
+        subprocess.Popen: The server process
+    """
+    env = {**os.environ, 'PORT': str(port), 'FLASK_DEBUG': 'False', **(env or {})}
+    if kind == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py',
+                   '--bind', f'127.0.0.1:{port}', 'app:app']
+    elif kind == 'flask':
+        command = [sys.executable, 'app.py']
+    elif kind == 'uvicorn':
+        command = [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', str(port),
+                   '--log-level', 'warning']
+    else:
+        raise ValueError(f"Unknown server kind: {kind}")
+
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{kind} server exited with code {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return process
+        except OSError:
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError(f"{kind} server did not become healthy within {timeout:.0f}s")
+
+
+def run_load(base_url, scenario='mixed', users=10, ramp=5.0, duration=30.0, seed=0, options=None):
+    """
+    Drive ``users`` virtual users against ``base_url`` and return the report.
+
+    Users start evenly over ``ramp`` seconds and all stop ``duration``
+    seconds after the first one started. Each user gets its own seeded RNG
+    and simulated sensor fleet, so runs with the same seed replay the same
+    requests.
+    """
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    recorder = Recorder()
+    stop = threading.Event()
+    threads = []
+
+    def run_user(index, user_type):
+        rng = random.Random(seed * 100_003 + index)
+        fleet = FleetSimulator(options['batch_size'], seed=seed * 100_003 + index,
+                               first_sensor_id=1001 + index * options['batch_size'])
+        client = Client(base_url, recorder)
+        try:
+            USER_TYPES[user_type](client, rng, fleet, stop, options)
+        finally:
+            client.close()
+
+    types = assign_users(scenario, users, seed)
+    for index, user_type in enumerate(types):
+        delay = ramp * index / users - (time.perf_counter() - recorder.start)
+        if delay > 0 and stop.wait(delay):
+            break
+        thread = threading.Thread(target=run_user, args=(index, user_type), name=f'user-{index}', daemon=True)
+        thread.start()
+        threads.append(thread)
+
+    stop.wait(max(duration - (time.perf_counter() - recorder.start), 0))
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=30)
+    elapsed = time.perf_counter() - recorder.start
+
+    return build_report(recorder.samples, elapsed, ramp, {
+        'created': datetime.now().isoformat(),
+        'target': base_url,
+        'scenario': scenario,
+        'users': users,
+        'user_types': {t: types.count(t) for t in sorted(set(types))},
+        'ramp_seconds': ramp,
+        'duration_seconds': duration,
+        'seed': seed,
+        'options': options
+    })
+
+
+def summarize(samples, seconds):
+    """Throughput, error rate and latency percentiles (ms) of ``samples``."""
+    if not samples:
+        return {'requests': 0, 'throughput_rps': 0.0, 'errors': 0, 'error_rate': 0.0}
+    latencies = np.array([s[2] for s in samples]) * 1000
+    errors = sum(1 for s in samples if s[3] == 0 or s[3] >= 400)
+    statuses = {}
+    for s in samples:
+        key = str(s[3]) if s[3] else s[4]
+        statuses[key] = statuses.get(key, 0) + 1
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        'requests': len(samples),
+        'throughput_rps': round(len(samples) / seconds, 2) if seconds > 0 else 0.0,
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4),
+        'mean_ms': round(float(latencies.mean()), 2),
+        'p50_ms': round(float(p50), 2),
+        'p95_ms': round(float(p95), 2),
+        'p99_ms': round(float(p99), 2),
+        'max_ms': round(float(latencies.max()), 2),
+        'statuses': dict(sorted(statuses.items()))
+    }
+
+
+def build_report(samples, elapsed, ramp, meta):
+    """Overall and per-endpoint summaries, for the whole run and for the steady state after the ramp."""
+    steady = [s for s in samples if s[1] >= ramp]
+    steady_seconds = max(elapsed - ramp, 0.0)
+    endpoints = sorted({s[0] for s in samples})
+    return {
+        **meta,
+        'elapsed_seconds': round(elapsed, 2),
+        'overall': summarize(samples, elapsed),
+        'steady_state': summarize(steady, steady_seconds),
+        'endpoints': {endpoint: summarize([s for s in steady if s[0] == endpoint], steady_seconds)
+                      for endpoint in endpoints}
+    }
+
+
+def print_report(report):
+    overall, steady = report['overall'], report['steady_state']
+    print(f"Scenario {report['scenario']}: {report['users']} users "
+          f"({', '.join(f'{n} {t}' for t, n in report['user_types'].items())}), "
+          f"ramp {report['ramp_seconds']:.0f}s, {report['elapsed_seconds']:.0f}s against {report['target']}")
+    print(f"Overall: {overall['requests']} requests, {overall['throughput_rps']} req/s, "
+          f"error rate {overall['error_rate']:.2%}\n")
+    print(f"Steady state (after the ramp)")
+    print(f"{'endpoint':<24} {'requests':>9} {'req/s':>8} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'max ms':>8}")
+    rows = list(report['endpoints'].items()) + [('all', steady)]
+    for endpoint, row in rows:
+        if not row['requests']:
+            continue
+        print(f"{endpoint:<24} {row['requests']:>9} {row['throughput_rps']:>8.1f} {row['error_rate']:>7.1%} "
+              f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}")
+
+
+def print_comparison(reports):
+    """Steady-state results of the same scenario against several servers, side by side."""
+    print(f"\nComparison (steady state)")
+    print(f"{'server':<10} {'endpoint':<24} {'req/s':>8} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for report in reports:
+        rows = list(report['endpoints'].items()) + [('all', report['steady_state'])]
+        for endpoint, row in rows:
+            if row['requests']:
+                print(f"{report['server']:<10} {endpoint:<24} {row['throughput_rps']:>8.1f} "
+                      f"{row['error_rate']:>7.1%} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Drive the Rockfall API with a reproducible traffic scenario')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='mixed')
+    parser.add_argument('--users', type=int, default=10, help='Concurrent virtual users')
+    parser.add_argument('--ramp', type=float, default=5.0, help='Seconds over which users are started')
+    parser.add_argument('--duration', type=float, default=30.0, help='Total run time in seconds')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='API to drive (ignored with --start)')
+    parser.add_argument('--start', nargs='+', choices=['gunicorn', 'flask', 'uvicorn'],
+                        help='Start a local server in backend/ for the run and stop it afterwards; '
+                             'with several, the scenario is replayed against each and compared')
+    parser.add_argument('--port', type=int, default=5055, help='Port for the server started with --start')
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_OPTIONS['poll_interval'])
+    parser.add_argument('--burst-size', type=int, default=DEFAULT_OPTIONS['burst_size'])
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_OPTIONS['batch_size'])
+    parser.add_argument('--output', help='Save the report as JSON')
+    args = parser.parse_args()
+
+    print("📈 Rockfall API Load Generator")
+    print("=" * 78)
+
+    options = {
+        'poll_interval': args.poll_interval,
+        'burst_size': args.burst_size,
+        'batch_size': args.batch_size
+    }
+    reports = []
+    for kind in args.start or [None]:
+        server = None
+        url = args.url
+        if kind is not None:
+            print(f"🚀 Starting {kind} on port {args.port}...")
+            server = start_server(kind, args.port)
+            url = f'http://127.0.0.1:{args.port}'
+        try:
+            report = run_load(url, args.scenario, args.users, args.ramp, args.duration, args.seed, options)
+            if server is not None:
+                report['server'] = kind
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=30)
+        print_report(report)
+        print()
+        reports.append(report)
+
+    if len(reports) > 1:
+        print_comparison(reports)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(reports[0] if len(reports) == 1 else {'runs': reports}, f, indent=2)
+        print(f"\n💾 Report saved to {args.output}")
+    if any(report['overall']['error_rate'] > 0 for report in reports):
+        sys.exit(1)
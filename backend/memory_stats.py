@@ -0,0 +1,51 @@
+"""
+Process Memory Statistics
+Reports resident and proportional set size so container memory can be sized
+for gunicorn workers that share a preloaded model copy-on-write
+"""
+
+import os
+import resource
+import sys
+
+
+def process_memory():
+    """
+    Memory usage of the current process in megabytes.
+
+    ``rss_mb`` counts every resident page, including pages shared with the
+    gunicorn master and sibling workers. ``pss_mb`` divides shared pages by
+    the number of processes mapping them, so summing ``pss_mb`` over all
+    workers gives the real footprint. PSS and the shared/private split are
+    only available on Linux; elsewhere only the peak RSS is reported.
+    """
+    stats = {'pid': os.getpid()}
+
+    try:
+        with open('/proc/self/smaps_rollup', 'r') as f:
+            fields = {}
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                    fields[parts[0][:-1]] = int(parts[1])  # kB
+        stats.update({
+            'rss_mb': round(fields.get('Rss', 0) / 1024, 1),
+            'pss_mb': round(fields.get('Pss', 0) / 1024, 1),
+            'shared_mb': round((fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)) / 1024, 1),
+            'private_mb': round((fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)) / 1024, 1)
+        })
+    except (OSError, ValueError):
+        # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+        stats['max_rss_mb'] = round(max_rss / divisor, 1)
+
+    return stats
+
+
+def format_memory(stats):
+    """One-line summary for log messages."""
+    if 'rss_mb' in stats:
+        return (f"pid {stats['pid']}: RSS {stats['rss_mb']} MB, PSS {stats['pss_mb']} MB "
+                f"(shared {stats['shared_mb']} MB, private {stats['private_mb']} MB)")
+    return f"pid {stats['pid']}: peak RSS {stats['max_rss_mb']} MB"
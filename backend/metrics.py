@@ -0,0 +1,313 @@
+"""
+Metrics
+Minimal counters, gauges and histograms rendered in the Prometheus text
+exposition format for the /metrics endpoint, aggregated across the worker
+processes of one server
+"""
+
+import atexit
+import bisect
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from 50 µs (a cached prediction stage) to 10 s
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _updated(self):
+        """Called on every update; the registry replaces it to start its flusher."""
+
+    def _reset(self):
+        """Forget this process's values (a forked child starts from zero)."""
+        self._lock = threading.Lock()
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count per label combination."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        self._updated()
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _reset(self):
+        super()._reset()
+        self._values = {}
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+    def render(self, snapshots=None):
+        """
+        Render this process's values, or the sum of ``snapshots`` (one per
+        process, from ``snapshot()``) when given.
+        """
+        if snapshots is None:
+            snapshots = [self.snapshot()]
+        totals = {}
+        for snapshot in snapshots:
+            for labels, value in snapshot or ():
+                key = tuple(str(v) for v in labels)
+                totals[key] = totals.get(key, 0) + value
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+                                for labels, value in sorted(totals.items())]
+
+
+class Gauge(_Metric):
+    """
+    Value read from a callback at scrape time, so it never goes stale.
+
+    A gauge describes one process (its cache, its queue), so across
+    processes each live worker's value is reported with a ``worker`` label
+    instead of being summed.
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, callback):
+        super().__init__(name, documentation)
+        self.callback = callback
+
+    def snapshot(self):
+        return self.callback()
+
+    def render(self, snapshots=None, workers=None):
+        """
+        Render the callback's value, or one series per worker from
+        ``snapshots`` and the matching ``workers`` when given.
+        """
+        if snapshots is None:
+            value = self.callback()
+            return [] if value is None else self.header() + [f"{self.name} {_format_value(value)}"]
+        lines = [f"{self.name}{_format_labels(('worker',), (worker,))} {_format_value(value)}"
+                 for worker, value in sorted(zip(workers, snapshots)) if value is not None]
+        return self.header() + lines if lines else []
+
+
+class Histogram(_Metric):
+    """
+    Cumulative-bucket latency histogram per label combination.
+
+    ``observe`` is a binary search plus a few integer increments under a
+    lock, cheap enough to run on every request and prediction stage.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, *labels):
+        self._updated()
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        """Context manager observing the duration of its block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def _reset(self):
+        super()._reset()
+        self._series = {}
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(labels), list(series)] for labels, series in self._series.items()]
+
+    def render(self, snapshots=None):
+        """
+        Render this process's series, or the sum of ``snapshots`` (one per
+        process, from ``snapshot()``) when given.
+        """
+        if snapshots is None:
+            snapshots = [self.snapshot()]
+        totals = {}
+        for snapshot in snapshots:
+            for labels, series in snapshot or ():
+                key = tuple(str(v) for v in labels)
+                if key not in totals:
+                    totals[key] = list(series)
+                elif len(series) == len(totals[key]):  # same buckets
+                    totals[key] = [a + b for a, b in zip(totals[key], series)]
+        items = sorted(totals.items())
+
+        lines = self.header()
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                le = ('le', _format_value(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class Registry:
+    """
+    Collection of metrics rendered together.
+
+    Metrics live in process memory, so under gunicorn (or uvicorn with
+    several workers) a scrape reaches one worker only. With
+    ``multiprocess_dir`` set, every process writes a snapshot of its
+    metrics to ``<pid>.json`` in that directory every ``flush_interval``
+    seconds (and when scraped), and ``render`` merges them: counters and
+    histograms are summed over every process that ever wrote a snapshot,
+    so totals never go backwards when a scrape lands on another worker or
+    a worker is replaced, and gauges are reported per live worker. Other
+    workers' values lag by up to ``flush_interval`` seconds. The
+    directory must be emptied when the server starts (gunicorn.conf.py
+    does this).
+    """
+
+    def __init__(self, multiprocess_dir=None, flush_interval=1.0):
+        self._metrics = []
+        self.multiprocess_dir = multiprocess_dir or None
+        self.flush_interval = float(flush_interval)
+        self._flusher = None
+        self._flusher_lock = threading.Lock()
+        if self.multiprocess_dir:
+            os.makedirs(self.multiprocess_dir, exist_ok=True)
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def register(self, metric):
+        if self.multiprocess_dir:
+            metric._updated = self._ensure_flusher
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, callback):
+        return self.register(Gauge(name, documentation, callback))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    # -- multiprocess ------------------------------------------------------
+
+    def _after_fork(self):
+        # Values counted before the fork belong to the parent (and its
+        # snapshot); the child counts from zero under its own pid
+        self._flusher = None
+        self._flusher_lock = threading.Lock()
+        for metric in self._metrics:
+            metric._reset()
+
+    def _ensure_flusher(self):
+        if self._flusher is not None:
+            return
+        with self._flusher_lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name='metrics-flusher', daemon=True)
+                self._flusher.start()
+                atexit.register(self.flush)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def _snapshot(self):
+        return {metric.name: metric.snapshot() for metric in self._metrics}
+
+    def flush(self):
+        """Write this process's snapshot to the multiprocess directory."""
+        path = os.path.join(self.multiprocess_dir, f"{os.getpid()}.json")
+        try:
+            with open(f"{path}.tmp", 'w') as f:
+                json.dump(self._snapshot(), f)
+            os.replace(f"{path}.tmp", path)
+        except Exception as e:
+            logger.error(f"Failed to write metrics snapshot: {e}")
+
+    def _read_snapshots(self):
+        """``(pid, snapshot, live)`` for this and every other process that wrote one."""
+        self.flush()
+        live_after = time.time() - max(5.0, 3 * self.flush_interval)
+        snapshots = []
+        for path in glob.glob(os.path.join(self.multiprocess_dir, '*.json')):
+            try:
+                live = os.path.getmtime(path) >= live_after
+                with open(path, 'r') as f:
+                    snapshots.append((os.path.basename(path)[:-len('.json')], json.load(f), live))
+            except (OSError, ValueError):
+                continue  # replaced or removed while reading
+        return snapshots
+
+    def render(self):
+        """All metrics in the Prometheus text format (version 0.0.4)."""
+        lines = []
+        if not self.multiprocess_dir:
+            for metric in self._metrics:
+                lines.extend(metric.render())
+            return '\n'.join(lines) + '\n'
+
+        snapshots = self._read_snapshots()
+        for metric in self._metrics:
+            if isinstance(metric, Gauge):
+                live = [(pid, snapshot.get(metric.name)) for pid, snapshot, is_live in snapshots if is_live]
+                lines.extend(metric.render([value for _, value in live], [pid for pid, _ in live]))
+            else:
+                lines.extend(metric.render([snapshot.get(metric.name) for _, snapshot, _ in snapshots]))
+        return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
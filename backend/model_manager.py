@@ -0,0 +1,244 @@
+"""
+Model Manager
+Loads, validates and atomically swaps the prediction model so that new
+artifacts can be deployed into a running server without a restart
+"""
+
+import gc
+import hashlib
+import json
+import logging
+import math
+import os
+import signal
+import threading
+import time
+import weakref
+from collections import namedtuple
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Everything a request needs from one model generation, swapped as a unit
+ActiveModel = namedtuple('ActiveModel', ['predictor', 'version', 'info', 'loaded_at', 'load_seconds'])
+
+
+def artifact_fingerprint(paths):
+    """Short identifier that changes whenever any model artifact file changes."""
+    digest = hashlib.sha1()
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:12]
+
+
+def validate_predictor(predictor, samples, min_agreement=0.5):
+    """
+    Check a freshly loaded predictor against stored sample readings.
+
+    Every sample must be scored into a known risk category with finite
+    probabilities. Samples carrying a ``risk_category`` label must agree
+    with the prediction at least ``min_agreement`` of the time, which
+    catches a model paired with the wrong scaler or feature list.
+
+    Returns:
+        dict: Validation summary
+
+    Raises:
+        ValueError: If the predictor fails validation
+    """
+    if not samples:
+        raise ValueError("No sample readings to validate against")
+
+    results = predictor.predict_batch(samples)
+    if len(results) != len(samples):
+        raise ValueError(f"Expected {len(samples)} predictions, got {len(results)}")
+
+    categories = set(predictor.risk_categories)
+    for result in results:
+        if result['risk_category'] not in categories:
+            raise ValueError(f"Unknown risk category: {result['risk_category']}")
+        values = [result['risk_probability'], result['confidence']] + list(result['category_probabilities'].values())
+        if not all(isinstance(v, float) and math.isfinite(v) and 0 <= v <= 100 for v in values):
+            raise ValueError(f"Invalid probabilities in prediction: {result}")
+
+    labelled = [(s['risk_category'], r['risk_category']) for s, r in zip(samples, results) if 'risk_category' in s]
+    agreement = sum(a == b for a, b in labelled) / len(labelled) if labelled else None
+    if agreement is not None and agreement < min_agreement:
+        raise ValueError(f"Sample agreement {agreement:.1%} is below {min_agreement:.0%}")
+
+    return {'samples': len(samples), 'agreement': round(agreement, 4) if agreement is not None else None}
+
+
+class ModelManager:
+    """
+    Owns the active prediction model and replaces it while serving.
+
+    Readers take ``manager.active`` once per request and use that snapshot
+    throughout, so in-flight requests finish on the model they started with
+    while new requests see the new one; the swap itself is a single
+    attribute assignment. A reload loads the candidate on a background
+    thread, validates it against ``sample_data.json`` and only then swaps;
+    a candidate that fails to load or validate is discarded and the current
+    model keeps serving.
+
+    At most two models are held: only one candidate loads at a time, and a
+    new load waits until the model retired by the previous swap has been
+    released by the requests still using it.
+
+    Reloads are triggered by ``reload()``, by SIGHUP (see
+    ``install_signal_handler``) or by the artifact watcher, which reloads
+    once changed artifacts have stopped changing for one poll interval.
+    Deploy artifacts by writing them elsewhere and renaming them into
+    place: the serving model's arrays are memory-mapped from its files, so
+    overwriting those files in place would corrupt it.
+    """
+
+    def __init__(self, load_model, artifact_paths, sample_path=None, poll_interval=10.0,
+                 min_agreement=0.5, release_timeout=30.0, on_swap=None):
+        self.load_model = load_model
+        self.artifact_paths = list(artifact_paths)
+        self.sample_path = sample_path
+        self.poll_interval = float(poll_interval)
+        self.min_agreement = float(min_agreement)
+        self.release_timeout = float(release_timeout)
+        self.on_swap = on_swap
+
+        self.active = None
+        self._retired = None
+        self._load_lock = threading.Lock()
+        self._watcher = None
+        self._watcher_pid = None
+        self._watch_lock = threading.Lock()
+
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.last_error = None
+        self.last_validation = None
+        self.rejected_version = None
+
+    def load(self):
+        """
+        Load, validate and activate the current artifacts, blocking.
+
+        Returns:
+            ActiveModel: The newly active model
+
+        Raises:
+            Exception: If loading or validation fails (the old model stays active)
+        """
+        with self._load_lock:
+            self._wait_for_release()
+            version = artifact_fingerprint(self.artifact_paths)
+
+            try:
+                start = time.perf_counter()
+                predictor = self.load_model(self.artifact_paths)
+                load_seconds = time.perf_counter() - start
+
+                if self.sample_path and os.path.exists(self.sample_path):
+                    with open(self.sample_path, 'r') as f:
+                        samples = json.load(f)
+                    self.last_validation = validate_predictor(predictor, samples, self.min_agreement)
+            except Exception:
+                # Not retried by the watcher until the artifacts change again
+                self.rejected_version = version
+                raise
+
+            candidate = ActiveModel(predictor, version, predictor.model_info,
+                                    datetime.now().isoformat(), load_seconds)
+            previous, self.active = self.active, candidate
+            if previous is not None:
+                self._retired = weakref.ref(previous.predictor)
+                self.reloads += 1
+            del previous
+            if self.on_swap is not None:
+                self.on_swap(candidate)
+            return candidate
+
+    def _wait_for_release(self):
+        # Caller holds the load lock
+        if self._retired is None:
+            return
+        deadline = time.monotonic() + self.release_timeout
+        while self._retired() is not None:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Previous model is still in use; not loading a third")
+            gc.collect()
+            time.sleep(0.1)
+        self._retired = None
+
+    def reload(self):
+        """
+        Reload the artifacts on a background thread.
+
+        Returns:
+            bool: False if a reload is already in progress
+        """
+        if self._load_lock.locked():
+            return False
+        threading.Thread(target=self._reload, name='model-reload', daemon=True).start()
+        return True
+
+    def _reload(self):
+        current = self.active.version if self.active is not None else None
+        logger.info(f"🔄 Reloading model (active version {current})")
+        try:
+            model = self.load()
+            self.last_error = None
+            logger.info(f"✅ Model {model.version} active (trained {model.info.get('trained_date', 'unknown')}, "
+                        f"loaded in {model.load_seconds:.2f}s)")
+        except Exception as e:
+            self.failed_reloads += 1
+            self.last_error = f"{datetime.now().isoformat()}: {e}"
+            logger.error(f"❌ Model reload failed, keeping version {current}: {e}")
+
+    def install_signal_handler(self, signum=signal.SIGHUP):
+        """Reload on ``signum``. Must be called from the main thread of the serving process."""
+        signal.signal(signum, lambda *_: self.reload())
+
+    def ensure_watching(self):
+        """Start the artifact watcher in this process if it is not running (cheap to call often)."""
+        if self.poll_interval <= 0:
+            return
+        if self._watcher_pid == os.getpid() and self._watcher is not None and self._watcher.is_alive():
+            return
+        with self._watch_lock:
+            if self._watcher_pid != os.getpid() or self._watcher is None or not self._watcher.is_alive():
+                self._watcher_pid = os.getpid()
+                self._watcher = threading.Thread(target=self._watch, name='model-watcher', daemon=True)
+                self._watcher.start()
+
+    def _watch(self):
+        seen = None
+        while True:
+            try:
+                fingerprint = artifact_fingerprint(self.artifact_paths)
+            except OSError:
+                fingerprint = None  # an artifact is being replaced
+            active = self.active.version if self.active is not None else None
+
+            if fingerprint not in (None, active, self.rejected_version):
+                # Reload only once the artifacts have stopped changing
+                if fingerprint == seen:
+                    self.reload()
+                seen = fingerprint
+            else:
+                seen = None
+            time.sleep(self.poll_interval)
+
+    def stats(self):
+        """Active model and reload counters for /health."""
+        active = self.active
+        return {
+            'version': active.version if active else None,
+            'trained_date': active.info.get('trained_date') if active else None,
+            'loaded_at': active.loaded_at if active else None,
+            'load_seconds': round(active.load_seconds, 3) if active else None,
+            'reloads': self.reloads,
+            'failed_reloads': self.failed_reloads,
+            'reload_in_progress': self._load_lock.locked(),
+            'watching': self._watcher is not None and self._watcher.is_alive() and self._watcher_pid == os.getpid(),
+            'last_validation': self.last_validation,
+            'last_error': self.last_error
+        }
@@ -0,0 +1,239 @@
+"""
+Model Registry
+Per-site prediction models (one artifact directory per pit sector), loaded
+lazily on first use and kept in a memory-bounded LRU
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from model_manager import ActiveModel, artifact_fingerprint, validate_predictor
+
+logger = logging.getLogger(__name__)
+
+
+class SiteModelError(RuntimeError):
+    """A site's model could not be loaded (the request cannot be scored by it)."""
+
+
+class _PendingLoad:
+    """A load in progress that concurrent requests for the same site wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.model = None
+        self.error = None
+
+
+class ModelRegistry:
+    """
+    Site-specific models keyed by the reading's ``location``.
+
+    ``root`` holds one directory per site (``sites/Sector-North/``, ...)
+    with the same artifacts as the global model directory;
+    ``resolve_artifacts(directory)`` maps a site directory to the
+    RockfallPredictor arguments and ``load_model(artifacts)`` builds the
+    predictor. A site's model is loaded on its first request, validated
+    against the site's ``sample_data.json`` when present, and returned as
+    an ``ActiveModel`` snapshot like ``ModelManager.active``.
+
+    Concurrent first requests for a site wait on a single load. Loaded
+    models are kept most-recently-used first and evicted once more than
+    ``max_models`` are resident or their estimated size (artifact files;
+    explainers are built on demand) exceeds ``max_bytes``; an evicted model is freed
+    when the requests still using it finish. Every ``check_interval``
+    seconds the site list is rescanned and a site's artifacts are
+    re-fingerprinted on access; a changed site is reloaded.
+    """
+
+    def __init__(self, root, resolve_artifacts, load_model, max_models=8, max_bytes=512 * 2**20,
+                 check_interval=10.0, min_agreement=0.5, on_load=None):
+        self.root = root
+        self.resolve_artifacts = resolve_artifacts
+        self.load_model = load_model
+        self.max_models = int(max_models)
+        self.max_bytes = int(max_bytes)
+        self.check_interval = float(check_interval)
+        self.min_agreement = float(min_agreement)
+        self.on_load = on_load
+
+        self._models = OrderedDict()   # site -> (ActiveModel, artifacts, nbytes, checked_at)
+        self._loading = {}             # site -> _PendingLoad
+        self._failed = {}              # site -> (SiteModelError, monotonic time)
+        self._lock = threading.Lock()
+        self._sites = frozenset()
+        self._sites_checked = None
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.loads = 0
+        self.failed_loads = 0
+        self.evictions = 0
+        self.load_seconds_total = 0.0
+        self.last_load_seconds = None
+        self.max_load_seconds = 0.0
+        self.last_error = None
+
+    def sites(self):
+        """Site names with a model directory (rescanned every ``check_interval`` seconds)."""
+        now = time.monotonic()
+        if self._sites_checked is None or now - self._sites_checked >= self.check_interval:
+            try:
+                names = [name for name in os.listdir(self.root)
+                         if not name.startswith('.') and os.path.isdir(os.path.join(self.root, name))]
+            except OSError:
+                names = []
+            self._sites = frozenset(names)
+            self._sites_checked = now
+        return self._sites
+
+    def get(self, site):
+        """
+        The model for ``site``, loading it if needed.
+
+        Returns:
+            ActiveModel: The site's model, or None if ``site`` has no model directory
+
+        Raises:
+            SiteModelError: If the site's artifacts fail to load or validate
+                (repeated without retrying for ``check_interval`` seconds)
+        """
+        # Only names listed from the root are used as paths
+        if not isinstance(site, str) or site not in self.sites():
+            return None
+
+        with self._lock:
+            entry = self._models.get(site)
+            if entry is not None and not self._stale(site, entry):
+                self._models.move_to_end(site)
+                self.hits += 1
+                return entry[0]
+            failed = self._failed.get(site)
+            if failed is not None and time.monotonic() - failed[1] < self.check_interval:
+                raise failed[0]
+            pending = self._loading.get(site)
+            if pending is None:
+                pending = self._loading[site] = _PendingLoad()
+                owner = True
+                self.misses += 1
+            else:
+                owner = False
+                self.coalesced += 1
+
+        if not owner:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.model
+
+        try:
+            pending.model = self._load(site)
+            return pending.model
+        except Exception as e:
+            pending.error = SiteModelError(f"Model for site {site} failed to load: {e}")
+            with self._lock:
+                self._failed[site] = (pending.error, time.monotonic())
+                self.failed_loads += 1
+                self.last_error = f"{datetime.now().isoformat()} {site}: {e}"
+            logger.error(f"❌ Failed to load model for site {site}: {e}")
+            raise pending.error from e
+        finally:
+            with self._lock:
+                del self._loading[site]
+            pending.done.set()
+
+    def _stale(self, site, entry):
+        # Caller holds the lock
+        model, artifacts, nbytes, checked_at = entry
+        now = time.monotonic()
+        if now - checked_at < self.check_interval:
+            return False
+        try:
+            changed = artifact_fingerprint(artifacts.values()) != model.version
+        except OSError:
+            changed = False  # an artifact is being replaced; keep serving
+        self._models[site] = (model, artifacts, nbytes, now)
+        return changed
+
+    def _load(self, site):
+        directory = os.path.join(self.root, site)
+        artifacts = self.resolve_artifacts(directory)
+        version = artifact_fingerprint(artifacts.values())
+
+        start = time.perf_counter()
+        predictor = self.load_model(artifacts)
+        load_seconds = time.perf_counter() - start
+
+        sample_path = os.path.join(directory, 'sample_data.json')
+        if os.path.exists(sample_path):
+            with open(sample_path, 'r') as f:
+                validate_predictor(predictor, json.load(f), self.min_agreement)
+
+        model = ActiveModel(predictor, version, predictor.model_info, datetime.now().isoformat(), load_seconds)
+        nbytes = sum(os.path.getsize(path) for path in artifacts.values())
+
+        with self._lock:
+            self._failed.pop(site, None)
+            self._models.pop(site, None)
+            self._models[site] = (model, artifacts, nbytes, time.monotonic())
+            self.loads += 1
+            self.load_seconds_total += load_seconds
+            self.last_load_seconds = load_seconds
+            self.max_load_seconds = max(self.max_load_seconds, load_seconds)
+            self._evict()
+
+        logger.info(f"✅ Site model {site} {version} loaded in {load_seconds:.2f}s")
+        if self.on_load is not None:
+            self.on_load(site, load_seconds)
+        return model
+
+    def _evict(self):
+        # Caller holds the lock; the newest model always stays
+        while len(self._models) > 1 and (len(self._models) > self.max_models
+                                         or self.resident_bytes > self.max_bytes):
+            site, _ = self._models.popitem(last=False)
+            self.evictions += 1
+            logger.info(f"♻️ Evicted site model {site}")
+
+    def __len__(self):
+        return len(self._models)
+
+    @property
+    def resident_bytes(self):
+        return sum(entry[2] for entry in self._models.values())
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        """Resident models, hit rate and load latency for /health."""
+        with self._lock:
+            return {
+                'sites': sorted(self.sites()),
+                'resident': [{'site': site, 'version': model.version,
+                              'load_seconds': round(model.load_seconds, 3),
+                              'mb': round(nbytes / 2**20, 1)}
+                             for site, (model, _, nbytes, _) in self._models.items()],
+                'resident_mb': round(self.resident_bytes / 2**20, 1),
+                'max_models': self.max_models,
+                'max_mb': round(self.max_bytes / 2**20, 1),
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced_waits': self.coalesced,
+                'hit_rate': round(self.hit_rate, 4),
+                'loads': self.loads,
+                'failed_loads': self.failed_loads,
+                'evictions': self.evictions,
+                'mean_load_seconds': round(self.load_seconds_total / self.loads, 3) if self.loads else None,
+                'last_load_seconds': round(self.last_load_seconds, 3) if self.last_load_seconds is not None else None,
+                'max_load_seconds': round(self.max_load_seconds, 3),
+                'last_error': self.last_error
+            }
@@ -0,0 +1,174 @@
+"""
+Prediction Cache
+Bounded LRU + TTL cache for predictions, keyed on a quantized copy of the
+feature vector so that readings differing only by sensor jitter share a result
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# Quantization step per feature. Readings whose features fall in the same
+# steps share a cached prediction; a step of 0 means "match exactly".
+DEFAULT_RESOLUTION = {
+    'slope_angle': 1.0,              # degrees
+    'joint_spacing': 0.1,            # meters
+    'joint_orientation': 30.0,       # degrees
+    'rock_strength': 2.0,            # MPa
+    'weathering_index': 0.25,        # 0-10 scale
+    'rainfall_24h': 0.5,             # mm
+    'rainfall_7d': 2.5,              # mm
+    'temperature_variation': 1.0,    # °C
+    'freeze_thaw_cycles': 1,         # count
+    'wind_speed': 2.5,               # m/s
+    'vibration_intensity': 0.1,      # mm/s
+    'blast_distance': 25.0,          # meters
+    'excavation_height': 2.5,        # meters
+    'support_density': 0.1,          # ratio
+    'previous_rockfall_30d': 1,      # count
+    'maintenance_days_since': 7,     # days
+}
+
+
+class PredictionCache:
+    """
+    Thread-safe prediction cache with LRU eviction and a time-to-live.
+
+    Entries are tagged with the version of the model that produced them;
+    looking up or storing with a different version drops the cached
+    predictions of the previous one, so a new model artifact never serves
+    them. Each ``scope`` (e.g. a per-site model) has its own entries and
+    version, so alternating between models does not invalidate either.
+    """
+
+    def __init__(self, max_entries=4096, ttl_seconds=30.0, resolution=None):
+        self.max_entries = int(max_entries)
+        self.ttl_seconds = float(ttl_seconds)
+        self.resolution = dict(DEFAULT_RESOLUTION)
+        if resolution:
+            self.resolution.update(resolution)
+        self._fields = sorted(self.resolution)
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._versions = {}   # scope -> model version of its entries
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def key(self, reading):
+        """
+        Quantized cache key for a reading, or None if it cannot be cached.
+
+        Readings with a missing or non-numeric feature are not cached so
+        that they always reach the model and its validation.
+        """
+        parts = []
+        for field in self._fields:
+            value = reading.get(field)
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return None
+            if not math.isfinite(value):
+                return None
+            step = self.resolution[field]
+            parts.append(round(value / step) if step else value)
+        return tuple(parts)
+
+    def matrix_keys(self, matrix, fields):
+        """
+        ``key()`` for every row of a finite feature matrix whose columns are ``fields``.
+
+        The quantization is vectorized; NumPy and ``round()`` both round
+        halves to even, so these keys equal those of the row dicts.
+        """
+        if not set(self._fields) <= set(fields):
+            return [None] * len(matrix)
+        columns = [fields.index(field) for field in self._fields]
+        steps = np.array([self.resolution[field] for field in self._fields], dtype=np.float64)
+        values = matrix[:, columns]
+        quantized = np.where(steps > 0, np.rint(values / np.where(steps > 0, steps, 1)), values)
+        return [tuple(row) for row in quantized.tolist()]
+
+    def get(self, key, version, scope=None):
+        """Return the cached prediction for ``key`` in ``scope`` or None."""
+        if key is None or not self.enabled:
+            return None
+
+        key = (scope, key)
+        with self._lock:
+            self._check_version(version, scope)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, version, scope=None):
+        """Store a prediction, evicting the least recently used entries if full."""
+        if key is None or not self.enabled:
+            return
+
+        key = (scope, key)
+        with self._lock:
+            self._check_version(version, scope)
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _check_version(self, version, scope):
+        # Caller holds the lock; only this scope's entries are dropped
+        if scope not in self._versions:
+            self._versions[scope] = version
+        elif version != self._versions[scope]:
+            stale = [key for key in self._entries if key[0] == scope]
+            for key in stale:
+                del self._entries[key]
+            if stale:
+                self.invalidations += 1
+            self._versions[scope] = version
+
+    def stats(self):
+        """Counters and occupancy for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'model_version': self._versions.get(None),
+                'scope_versions': {str(scope): version for scope, version in self._versions.items()
+                                   if scope is not None}
+            }
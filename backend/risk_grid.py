@@ -0,0 +1,520 @@
+"""
+Spatial Risk Grid
+Scores every cell of a pit raster (per-cell slope, joint and strength
+attributes) together with the current environmental readings of its zone,
+recomputing only cells whose inputs changed, and serves the result as PNG
+tiles or a compact binary grid
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+# Optional: serializes read-merge-write of the shared readings file across
+# worker processes (POSIX only; elsewhere only threads are serialized)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from features import FEATURE_COLUMNS
+from fleet_simulator import BASE_VALUES, LOCATIONS
+
+NODATA = 255  # risk / category value of cells outside the pit
+
+# Values used for features that neither the raster nor a zone reading provides
+FEATURE_DEFAULTS = {
+    **{field: value for field, (value, _) in BASE_VALUES.items()},
+    'joint_orientation': 180.0,
+    'rainfall_7d': 14.0,
+    'freeze_thaw_cycles': 0.0,
+    'wind_speed': 8.0,
+    'support_density': 0.6,
+    'previous_rockfall_30d': 0.0,
+    'maintenance_days_since': 7.0,
+}
+
+# Tile colours by risk category (RGBA), matching the dashboard's palette
+CATEGORY_COLORS = {
+    'Low': (34, 197, 94, 170),
+    'Medium': (234, 179, 8, 190),
+    'High': (249, 115, 22, 210),
+    'Critical': (239, 68, 68, 230),
+}
+
+
+def synthetic_raster(size=500, cell_size=2.0, seed=7):
+    """
+    A DEM-derived raster of a round open pit for demos and benchmarks.
+
+    Slope angle and dip direction (joint orientation) come from the gradient
+    of a synthetic elevation model; the other attributes are smooth random
+    fields. Cells beyond the pit rim are outside every zone. Zones are the
+    fleet simulator's sectors (north half, south-east and south-west).
+
+    Returns:
+        dict: Raster in the layout read by ``load_raster``
+    """
+    rng = np.random.default_rng(seed)
+    half = size * cell_size / 2
+    coords = (np.arange(size) + 0.5) * cell_size - half
+    east, north = np.meshgrid(coords, -coords)  # row 0 is the northern edge
+    r = np.hypot(east, north) / (0.9 * half)  # 1 at the rim
+
+    def field(wavelength, n_waves=6):
+        # Sum of random plane waves, roughly unit variance
+        out = np.zeros_like(east)
+        for _ in range(n_waves):
+            k = rng.normal(size=2) * 2 * np.pi / wavelength
+            out += np.cos(k[0] * east + k[1] * north + rng.uniform(0, 2 * np.pi))
+        return out / np.sqrt(n_waves / 2)
+
+    # Cubic bowl: walls steepen towards the rim (about 50 degrees)
+    elevation = 0.4 * half * np.minimum(r, 1.0) ** 3 + 2.0 * field(60)
+    d_row, d_col = np.gradient(elevation, cell_size)
+    slope = np.degrees(np.arctan(np.hypot(d_row, d_col)))
+    dip_direction = np.degrees(np.arctan2(-d_col, d_row)) % 360
+
+    zone = np.where(north >= 0, 0, np.where(east >= 0, 1, 2)).astype(np.int16)
+    zone[r > 1.0] = -1
+
+    return {
+        'features': {
+            'slope_angle': slope,
+            'joint_orientation': dip_direction,
+            'joint_spacing': np.clip(0.6 + 0.35 * field(120), 0.1, 5.0),
+            'rock_strength': np.clip(55 + 15 * field(200) - 10 * r, 10, 100),
+            'weathering_index': np.clip(5 + 1.5 * field(150) + 2 * (r - 0.5), 0, 10),
+            'excavation_height': np.clip(25 + 8 * field(90), 5, 100),
+            'support_density': np.clip(0.6 + 0.2 * field(250), 0, 1),
+        },
+        'zone': zone,
+        'zone_names': [str(name) for name in LOCATIONS],
+        'cell_size': cell_size,
+        'origin': [-half, half],
+    }
+
+
+def save_raster(path, raster):
+    """Write a raster as ``.npz`` (one 2-D array per feature plus zones and geometry)."""
+    np.savez_compressed(
+        path,
+        zone=raster['zone'],
+        zone_names=np.array(raster['zone_names']),
+        cell_size=np.float64(raster['cell_size']),
+        origin=np.array(raster['origin'], dtype=np.float64),
+        **raster['features']
+    )
+
+
+def load_raster(path):
+    """
+    Read a raster written by ``save_raster`` (or any ``.npz`` in that layout).
+
+    Arrays named after model features are per-cell attributes; ``zone``
+    (int, -1 outside the pit) and ``zone_names`` assign cells to the zones
+    whose readings they use. Without them the whole raster is one zone.
+    """
+    with np.load(path) as data:
+        features = {name: np.asarray(data[name], dtype=np.float64)
+                    for name in data.files if name in FEATURE_COLUMNS}
+        if not features:
+            raise ValueError(f"{path} has no feature layers")
+        shape = next(iter(features.values())).shape
+        if len(shape) != 2 or any(layer.shape != shape for layer in features.values()):
+            raise ValueError(f"{path}: feature layers must be 2-D arrays of the same shape")
+
+        zone = np.asarray(data['zone'], dtype=np.int16) if 'zone' in data.files else np.zeros(shape, np.int16)
+        zone_names = [str(n) for n in data['zone_names']] if 'zone_names' in data.files else ['pit']
+        if zone.shape != shape or zone.max() >= len(zone_names):
+            raise ValueError(f"{path}: zone layer does not match the feature layers")
+
+        return {
+            'features': features,
+            'zone': zone,
+            'zone_names': zone_names,
+            'cell_size': float(data['cell_size']) if 'cell_size' in data.files else 1.0,
+            'origin': data['origin'].tolist() if 'origin' in data.files else [0.0, 0.0],
+        }
+
+
+def encode_png(rgba):
+    """Encode an (h, w, 4) uint8 array as a PNG."""
+    height, width = rgba.shape[:2]
+
+    def chunk(kind, payload):
+        return (struct.pack('>I', len(payload)) + kind + payload
+                + struct.pack('>I', zlib.crc32(kind + payload) & 0xffffffff))
+
+    # Filter type 0 (none) in front of every row
+    rows = np.empty((height, width * 4 + 1), dtype=np.uint8)
+    rows[:, 0] = 0
+    rows[:, 1:] = rgba.reshape(height, width * 4)
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows.tobytes(), 6))
+            + chunk(b'IEND', b''))
+
+
+def _file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class RiskGrid:
+    """
+    Risk score and category for every cell of a pit raster.
+
+    A cell's model input is its raster attributes plus the latest
+    environmental reading of its zone (features missing from both use
+    ``FEATURE_DEFAULTS``). ``refresh()`` brings the grid up to date and
+    rescores only the cells whose input changed: cells that differ in a
+    reloaded raster file, every cell of a zone whose reading changed, or
+    all cells when the model version changes. Rescoring builds feature
+    matrices for ``chunk_size`` cells at a time and scores each with one
+    model call.
+
+    Zone readings are kept in ``readings_path`` (when set) and each process
+    checks that file and the raster file on refresh, so readings posted to
+    one worker reach the others on their next request. Posted readings are
+    merged into the file's current content under an exclusive lock, so
+    concurrent posts to different workers all survive. Each process holds
+    its own scores, like the prediction cache.
+
+    Tiles are ``tile_size`` x ``tile_size`` cells; rendered PNGs are kept
+    in an LRU of ``max_tiles`` entries and re-rendered only after one of
+    their cells has changed.
+    """
+
+    def __init__(self, raster_path=None, readings_path=None, synthetic_size=500, tile_size=256,
+                 max_tiles=256, chunk_size=65536, tier='full'):
+        self.raster_path = raster_path or None
+        self.readings_path = readings_path or None
+        self.synthetic_size = int(synthetic_size)
+        self.tile_size = int(tile_size)
+        self.max_tiles = int(max_tiles)
+        self.chunk_size = int(chunk_size)
+        self.tier = tier
+
+        self._lock = threading.Lock()
+        self._raster_stamp = None
+        self._readings_stamp = None
+        self.shape = None
+        self.model_version = None
+        self.readings = {}
+        self._pending_readings = None  # posted but not yet applied (no readings file)
+        self.version = 0
+        self._tiles = OrderedDict()
+        self._data_etag = None
+
+        self.refreshes = 0
+        self.cells_scored = 0
+        self.tile_hits = 0
+        self.tile_misses = 0
+        self.last_refresh = None
+
+    # -- inputs ------------------------------------------------------------
+
+    def _apply_raster(self, raster):
+        """Install a (re)loaded raster; returns the mask of cells whose inputs changed."""
+        features = {name: layer.ravel() for name, layer in raster['features'].items()}
+        zone = raster['zone'].ravel()
+        shape = raster['zone'].shape
+        same_layout = (shape == self.shape and set(features) == set(self.static)
+                       and raster['zone_names'] == self.zone_names)
+
+        if same_layout:
+            changed = zone != self.zone
+            for name, layer in features.items():
+                old = self.static[name]
+                changed |= ~((layer == old) | (np.isnan(layer) & np.isnan(old)))
+        else:
+            changed = np.ones(zone.shape, dtype=bool)
+            self.shape = shape
+            self.zone_names = list(raster['zone_names'])
+            self.env_features = [f for f in FEATURE_COLUMNS if f not in features]
+            defaults = np.array([FEATURE_DEFAULTS[f] for f in self.env_features], dtype=np.float64)
+            self.env = np.tile(defaults, (len(self.zone_names), 1))
+            self.risk = np.full(zone.shape, NODATA, dtype=np.uint8)
+            self.category = np.full(zone.shape, NODATA, dtype=np.uint8)
+            self.tile_grid = (-(-shape[0] // self.tile_size), -(-shape[1] // self.tile_size))
+            self.tile_versions = np.zeros(self.tile_grid, dtype=np.int64)
+            self._tiles.clear()
+
+        self.static = features
+        self.zone = zone
+        if not same_layout:
+            self._apply_readings(self.readings)
+        self.valid = zone >= 0
+        for layer in features.values():
+            self.valid &= np.isfinite(layer)
+        self.cell_size = raster['cell_size']
+        self.origin = raster['origin']
+        return changed
+
+    def _apply_readings(self, readings):
+        """Update zone readings; returns the mask of cells in zones whose readings changed."""
+        self.readings = {zone: reading for zone, reading in readings.items() if zone in self.zone_names}
+        env = self.env.copy()
+        for i, name in enumerate(self.zone_names):
+            reading = self.readings.get(name, {})
+            env[i] = [float(reading.get(f, FEATURE_DEFAULTS[f])) for f in self.env_features]
+        # Extra False at the end: zone -1 (outside the pit) never changes
+        zone_changed = np.append((env != self.env).any(axis=1), False)
+        self.env = env
+        return zone_changed[self.zone]
+
+    def _read_readings(self):
+        with open(self.readings_path, 'r') as f:
+            return json.load(f)
+
+    def set_readings(self, readings):
+        """
+        Merge new environmental readings (zone name -> feature dict) into the grid.
+
+        Raises:
+            ValueError: For an unknown zone or a non-numeric value
+        """
+        with self._lock:
+            self._ensure_raster()
+            for zone, reading in readings.items():
+                if zone not in self.zone_names:
+                    raise ValueError(f"Unknown zone: {zone} (expected one of {', '.join(self.zone_names)})")
+                if not isinstance(reading, dict):
+                    raise ValueError(f"Reading for {zone} must be an object")
+                for field, value in reading.items():
+                    if field in self.env_features and (isinstance(value, bool) or
+                                                       not isinstance(value, (int, float))):
+                        raise ValueError(f"{zone}.{field} must be a number")
+
+            if not self.readings_path:
+                base = self._pending_readings if self._pending_readings is not None else self.readings
+                self._pending_readings = self._merge(base, readings)
+                return
+
+            # Shared with the other workers through the file: merge into what
+            # is on disk now, not into this process's possibly stale copy
+            os.makedirs(os.path.dirname(os.path.abspath(self.readings_path)), exist_ok=True)
+            with open(f"{self.readings_path}.lock", 'w') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                current = self._read_readings() if os.path.exists(self.readings_path) else {}
+                tmp_path = f"{self.readings_path}.tmp-{os.getpid()}"
+                with open(tmp_path, 'w') as f:
+                    json.dump(self._merge(current, readings), f)
+                os.replace(tmp_path, self.readings_path)
+
+    def _merge(self, base, readings):
+        merged = {zone: dict(reading) for zone, reading in base.items()}
+        for zone, reading in readings.items():
+            merged.setdefault(zone, {}).update({f: v for f, v in reading.items() if f in self.env_features})
+        return merged
+
+    def _ensure_raster(self):
+        # Caller holds the lock
+        if self.shape is None:
+            self._apply_raster(load_raster(self.raster_path) if self.raster_path
+                               else synthetic_raster(self.synthetic_size))
+            self._raster_stamp = _file_stamp(self.raster_path) if self.raster_path else 'synthetic'
+
+    # -- scoring -----------------------------------------------------------
+
+    def refresh(self, model, model_version):
+        """
+        Bring the grid up to date with the raster file, zone readings and model.
+
+        Args:
+            model: Loaded RockfallPredictor
+            model_version (str): Identifier of ``model``; a new one rescores every cell
+
+        Returns:
+            dict: What this refresh did (cells rescored, reasons, seconds)
+        """
+        with self._lock:
+            start = time.perf_counter()
+            reasons = []
+            if self.shape is None:
+                self._ensure_raster()
+                reasons.append('initial')
+            changed = np.zeros(self.zone.shape, dtype=bool)
+
+            if self.raster_path and 'initial' not in reasons:
+                stamp = _file_stamp(self.raster_path)
+                if stamp is not None and stamp != self._raster_stamp:
+                    changed |= self._apply_raster(load_raster(self.raster_path))
+                    self._raster_stamp = stamp
+                    reasons.append('raster')
+
+            if self.readings_path:
+                stamp = _file_stamp(self.readings_path)
+                if stamp is not None and stamp != self._readings_stamp:
+                    changed |= self._apply_readings(self._read_readings())
+                    self._readings_stamp = stamp
+                    reasons.append('readings')
+            elif self._pending_readings is not None:
+                changed |= self._apply_readings(self._pending_readings)
+                self._pending_readings = None
+                reasons.append('readings')
+
+            if model_version != self.model_version:
+                changed[:] = True
+                self.model_version = model_version
+                reasons.append('model')
+
+            cells = np.flatnonzero(changed)
+            if len(cells):
+                self._rescore(model, cells)
+            seconds = time.perf_counter() - start
+
+            result = {'reasons': reasons, 'cells_changed': int(len(cells)),
+                      'cells_scored': int(np.count_nonzero(self.valid[cells])),
+                      'seconds': round(seconds, 4), 'version': self.version}
+            if len(cells):
+                self.refreshes += 1
+                self.last_refresh = result
+            return result
+
+    def _rescore(self, model, cells):
+        """Score ``cells`` (flat indices) and mark their tiles stale."""
+        scored = cells[self.valid[cells]]
+        env_index = {f: i for i, f in enumerate(self.env_features)}
+        # risk_categories index of each model class
+        class_to_category = np.array([model.risk_categories.index(c) for c in model.classes_], dtype=np.uint8)
+
+        self.risk[cells] = NODATA
+        self.category[cells] = NODATA
+        for start in range(0, len(scored), self.chunk_size):
+            chunk = scored[start:start + self.chunk_size]
+            zones = self.zone[chunk]
+            X = np.empty((len(chunk), len(model.feature_columns)), dtype=np.float64)
+            for j, feature in enumerate(model.feature_columns):
+                if feature in self.static:
+                    np.take(self.static[feature], chunk, out=X[:, j])
+                else:
+                    X[:, j] = self.env[zones, env_index[feature]]
+
+            winners, _, scores = model.risk_scores(model.predict_proba_matrix(X, self.tier))
+            self.risk[chunk] = np.rint(scores).astype(np.uint8)
+            self.category[chunk] = class_to_category[winners]
+        self.cells_scored += len(scored)
+
+        self.version += 1
+        self._data_etag = None
+        rows, cols = np.divmod(cells, self.shape[1])
+        tiles = np.unique((rows // self.tile_size) * self.tile_grid[1] + cols // self.tile_size)
+        self.tile_versions.ravel()[tiles] = self.version
+
+    # -- output ------------------------------------------------------------
+
+    def layer(self, name):
+        """
+        Row-major uint8 grid of ``'risk'`` (0-100) or ``'category'`` (index into
+        the model's risk categories), NODATA outside the pit, and its ETag.
+        """
+        with self._lock:
+            values = {'risk': self.risk, 'category': self.category}[name]
+            if self._data_etag is None:
+                digest = hashlib.sha1(self.risk.tobytes() + self.category.tobytes()).hexdigest()[:20]
+                self._data_etag = digest
+            return values.tobytes(), f"{self._data_etag}-{name}"
+
+    def tile(self, tile_row, tile_col, categories):
+        """
+        PNG of one tile coloured by risk category, and its ETag.
+
+        Returns:
+            tuple: (etag, png bytes), or None if the tile is outside the grid
+        """
+        with self._lock:
+            if not (0 <= tile_row < self.tile_grid[0] and 0 <= tile_col < self.tile_grid[1]):
+                return None
+            key = (tile_row, tile_col)
+            version = self.tile_versions[key]
+            cached = self._tiles.get(key)
+            if cached is not None and cached[0] == version:
+                self._tiles.move_to_end(key)
+                self.tile_hits += 1
+                return cached[1], cached[2]
+
+            self.tile_misses += 1
+            rows = slice(tile_row * self.tile_size, (tile_row + 1) * self.tile_size)
+            cols = slice(tile_col * self.tile_size, (tile_col + 1) * self.tile_size)
+            category = self.category.reshape(self.shape)[rows, cols]
+
+            palette = np.zeros((256, 4), dtype=np.uint8)
+            for i, name in enumerate(categories):
+                palette[i] = CATEGORY_COLORS.get(name, (128, 128, 128, 200))
+            png = encode_png(palette[category])
+            etag = hashlib.sha1(png).hexdigest()[:20]
+
+            self._tiles[key] = (version, etag, png)
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+            return etag, png
+
+    def metadata(self, categories):
+        """Geometry, zones, category counts and refresh state for the API."""
+        with self._lock:
+            counts = np.bincount(self.category[self.category != NODATA], minlength=len(categories))
+            valid_risk = self.risk[self.valid]
+            return {
+                'rows': self.shape[0],
+                'cols': self.shape[1],
+                'cell_size': self.cell_size,
+                'origin': self.origin,
+                'tile_size': self.tile_size,
+                'tiles': list(self.tile_grid),
+                'nodata': NODATA,
+                'categories': list(categories),
+                'zones': self.zone_names,
+                'zone_readings': {name: dict(zip(self.env_features, self.env[i].tolist()))
+                                  for i, name in enumerate(self.zone_names)},
+                'raster_features': sorted(self.static),
+                'cells': int(self.valid.sum()),
+                'category_counts': {name: int(n) for name, n in zip(categories, counts)},
+                'mean_risk': round(float(valid_risk.mean()), 2) if len(valid_risk) else None,
+                'version': self.version,
+                'model_version': self.model_version,
+                'tier': self.tier,
+                'last_refresh': self.last_refresh
+            }
+
+    def stats(self):
+        """Refresh and tile cache counters for /health."""
+        return {
+            'loaded': self.shape is not None,
+            'shape': list(self.shape) if self.shape is not None else None,
+            'version': self.version,
+            'refreshes': self.refreshes,
+            'cells_scored': self.cells_scored,
+            'tiles_cached': len(self._tiles),
+            'tile_hits': self.tile_hits,
+            'tile_misses': self.tile_misses,
+            'last_refresh': self.last_refresh
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Write a synthetic pit raster for the risk grid')
+    parser.add_argument('output', help='Path of the .npz raster to write')
+    parser.add_argument('--size', type=int, default=1000, help='Cells per side')
+    parser.add_argument('--cell-size', type=float, default=2.0, help='Metres per cell')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    raster = synthetic_raster(args.size, args.cell_size, args.seed)
+    save_raster(args.output, raster)
+    print(f"🗺️ Wrote {args.size}x{args.size} raster ({int((raster['zone'] >= 0).sum()):,} pit cells) "
+          f"to {args.output}")
@@ -0,0 +1,218 @@
+"""
+Response Serialization
+Content negotiation for dashboard payloads (JSON, MessagePack and a columnar
+history layout) and gzip/brotli compression of large response bodies
+"""
+
+import gzip
+import threading
+from collections import OrderedDict
+
+# Installed from requirements.txt; without them responses fall back to the
+# standard library JSON encoder and gzip, and MessagePack is not offered
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+MSGPACK_TYPES = (MSGPACK, 'application/x-msgpack', 'application/vnd.msgpack')
+
+# Mimetypes worth compressing; images and event streams are left alone
+COMPRESSIBLE_TYPES = {JSON, MSGPACK, 'application/octet-stream', 'text/plain', 'text/csv'}
+
+LAYOUTS = ('rows', 'columns')
+
+
+def missing_accelerators():
+    """Names of the encoding packages from requirements.txt that are not installed."""
+    return [name for name, module in (('orjson', orjson), ('msgpack', msgpack), ('brotli', brotli))
+            if module is None]
+
+
+def to_columns(rows):
+    """
+    A list of dicts as one list per field, in first-seen field order.
+
+    Fields missing from a row are None in that row's position.
+    """
+    fields = {}
+    for row in rows:
+        for field in row:
+            fields.setdefault(field, None)
+    return {field: [row.get(field) for row in rows] for field in fields}
+
+
+class PayloadEncoder:
+    """
+    Encodes response payloads in the representation a client asked for.
+
+    Variants are ``'json'`` or ``'msgpack'``, optionally suffixed with
+    ``'+columns'``: the columnar layout replaces a payload's ``data`` list
+    of points by ``columns`` (one array per field, like ``/mock-data/fleet``)
+    and ``count``, which is about a third of the size on the wire (and
+    still smaller compressed) but costs the reshaping on top of encoding.
+    JSON goes through orjson, several times faster than ``json_dumps``,
+    which is only the fallback when orjson is not installed. MessagePack is
+    offered only when msgpack is installed.
+    """
+
+    def __init__(self, json_dumps, json_default=None):
+        self.json_dumps = json_dumps
+        self.json_default = json_default
+        self.formats = ('json', 'msgpack') if msgpack is not None else ('json',)
+
+    def negotiate(self, accept_mimetypes, layout=None):
+        """
+        Pick the variant for a request.
+
+        Args:
+            accept_mimetypes: The request's parsed Accept header
+            layout (str): ``rows`` (default) or ``columns``
+
+        Returns:
+            str: The variant, ``'json'`` unless the client prefers MessagePack
+
+        Raises:
+            ValueError: If ``layout`` is not a known layout
+        """
+        if layout not in (None, '') and layout not in LAYOUTS:
+            raise ValueError(f"layout must be one of {', '.join(LAYOUTS)}")
+        offered = [JSON] + (list(MSGPACK_TYPES) if msgpack is not None else [])
+        # Clients without an Accept header (or */*) get JSON, as before
+        best = accept_mimetypes.best_match(offered, default=JSON)
+        variant = 'msgpack' if best in MSGPACK_TYPES else 'json'
+        return variant + '+columns' if layout == 'columns' else variant
+
+    @staticmethod
+    def mimetype(variant):
+        return MSGPACK if variant.startswith('msgpack') else JSON
+
+    def encode(self, payload, variant='json'):
+        """
+        Serialize ``payload`` as ``variant``.
+
+        Returns:
+            bytes: The response body
+        """
+        fmt, _, layout = variant.partition('+')
+        if layout == 'columns' and isinstance(payload.get('data'), list):
+            payload = dict(payload)
+            rows = payload.pop('data')
+            payload['count'] = len(rows)
+            payload['columns'] = to_columns(rows)
+
+        if fmt == 'msgpack':
+            return msgpack.packb(payload, default=self.json_default)
+        if orjson is not None:
+            try:
+                # Dates are handed to json_default so they encode as before
+                return orjson.dumps(payload, default=self.json_default,
+                                    option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY
+                                    | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME)
+            except TypeError:
+                pass  # e.g. integers beyond 64 bits; the standard encoder copes
+        body = self.json_dumps(payload)
+        return body.encode() if isinstance(body, str) else body
+
+
+class ResponseCompressor:
+    """
+    Compresses response bodies of at least ``min_bytes`` with the best
+    encoding the client accepts: brotli (when installed) or gzip.
+
+    A compressed response keeps its ETag as a weak validator, since the
+    bytes differ from the identity encoding but the content does not;
+    compressed bodies of responses with an ETag are kept in a small LRU so
+    repeated requests for an unchanged resource are not recompressed.
+    ``level`` 0 disables compression.
+    """
+
+    def __init__(self, min_bytes=1024, level=6, max_entries=128):
+        self.min_bytes = int(min_bytes)
+        self.level = int(level)
+        self.max_entries = int(max_entries)
+        self.encodings = ('br', 'gzip') if brotli is not None else ('gzip',)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.compressed = 0
+        self.cache_hits = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def choose_encoding(self, accept_encodings):
+        """The accepted encoding with the highest quality (ties go to brotli), or None."""
+        best, best_quality = None, 0
+        for encoding in self.encodings:
+            quality = accept_encodings[encoding]
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def compress(self, body, encoding):
+        if encoding == 'br':
+            # Quality 11 is far too slow per request; 0-11 maps from gzip's 1-9
+            return brotli.compress(body, quality=min(11, max(1, round(self.level * 11 / 9))))
+        # mtime=0 keeps the output deterministic for identical bodies
+        return gzip.compress(body, compresslevel=self.level, mtime=0)
+
+    def __call__(self, response, accept_encodings):
+        """Compress ``response`` in place when it is eligible; returns it."""
+        if (self.level <= 0 or response.mimetype not in COMPRESSIBLE_TYPES
+                or response.direct_passthrough or response.is_streamed):
+            return response
+        response.vary.add('Accept-Encoding')
+        if response.status_code != 200 or 'Content-Encoding' in response.headers:
+            return response
+        encoding = self.choose_encoding(accept_encodings)
+        if encoding is None:
+            return response
+        body = response.get_data()
+        if len(body) < self.min_bytes:
+            return response
+
+        etag, weak = response.get_etag()
+        key = (etag, encoding) if etag and not weak else None
+        with self._lock:
+            compressed = self._cache.get(key) if key else None
+            if compressed is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+        if compressed is None:
+            compressed = self.compress(body, encoding)
+            if key:
+                with self._lock:
+                    self._cache[key] = compressed
+                    while len(self._cache) > self.max_entries:
+                        self._cache.popitem(last=False)
+
+        with self._lock:
+            self.compressed += 1
+            self.bytes_in += len(body)
+            self.bytes_out += len(compressed)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        if etag:
+            response.set_etag(etag, weak=True)
+        return response
+
+    def stats(self):
+        """Compression counters for /health."""
+        with self._lock:
+            return {
+                'encodings': list(self.encodings) if self.level > 0 else [],
+                'min_bytes': self.min_bytes,
+                'responses_compressed': self.compressed,
+                'cache_hits': self.cache_hits,
+                'ratio': round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else None
+            }
@@ -0,0 +1,97 @@
+"""
+ASGI Server Tests
+Runs asgi:app under uvicorn with a forked inference pool and checks that the
+server survives a dead worker, serves live streams and still shuts down on
+SIGTERM
+"""
+
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import pytest
+
+from conftest import BACKEND_DIR
+
+pytest.importorskip('uvicorn')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def request(port, path, body=None, timeout=10):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(f'http://127.0.0.1:{port}{path}', data=data,
+                                 headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=timeout) as response:
+        return response.status, json.loads(response.read())
+
+
+@pytest.fixture
+def uvicorn_server(server_env):
+    port = free_port()
+    env = dict(server_env, ASGI_INFERENCE_WORKERS='2')
+    process = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'asgi:app', '--port', str(port),
+                                '--log-level', 'warning'],
+                               cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                request(port, '/health', timeout=1)
+                break
+            except OSError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("uvicorn did not start")
+                time.sleep(0.2)
+        yield process, port
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+
+def test_killed_inference_worker_is_replaced(uvicorn_server, model_dir):
+    process, port = uvicorn_server
+    with open(os.path.join(model_dir, 'sample_data.json')) as f:
+        reading = json.load(f)[0]
+
+    assert request(port, '/predict', reading)[0] == 200
+    pool = request(port, '/health')[1]['inference_pool']
+    assert len(pool['pids']) == 2
+    os.kill(pool['pids'][0], signal.SIGKILL)
+    time.sleep(0.5)
+
+    for _ in range(3):
+        status, body = request(port, '/predict', reading)
+        assert status == 200 and body['risk_category']
+    pool = request(port, '/health')[1]['inference_pool']
+    assert pool['restarts'] == 1 and len(pool['pids']) == 2
+
+    # Shuts down instead of hanging on the old pool (uvicorn may re-raise the signal on exit)
+    process.send_signal(signal.SIGTERM)
+    assert process.wait(timeout=15) in (0, -signal.SIGTERM)
+
+
+def test_live_stream_does_not_block_shutdown(uvicorn_server):
+    process, port = uvicorn_server
+    streams = [urllib.request.urlopen(f'http://127.0.0.1:{port}/stream/live', timeout=10) for _ in range(3)]
+    for stream in streams:
+        assert stream.headers['Content-Type'].startswith('text/event-stream')
+        assert stream.readline().startswith(b'retry:')
+        while not stream.readline().startswith(b'data:'):
+            pass
+    assert request(port, '/health')[0] == 200  # streams don't tie up the server
+
+    process.send_signal(signal.SIGTERM)
+    assert process.wait(timeout=15) in (0, -signal.SIGTERM)
+    for stream in streams:
+        stream.close()
@@ -0,0 +1,87 @@
+"""
+Backfill Scorer Tests
+Offline runs of model/backfill.py on a small CSV: tier selection and the
+manifest that lets an interrupted run resume
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backfill import MANIFEST, read_output, run_backfill
+from features import FEATURE_COLUMNS
+
+
+def quiet(*args, **kwargs):
+    pass
+
+
+@pytest.fixture
+def readings_csv(model_dir, tmp_path):
+    with open(os.path.join(model_dir, 'sample_data.json')) as f:
+        samples = pd.DataFrame(json.load(f))[FEATURE_COLUMNS]
+    rng = np.random.default_rng(0)
+    frame = samples.iloc[rng.integers(len(samples), size=300)].reset_index(drop=True)
+    frame = frame * rng.uniform(0.7, 1.3, size=frame.shape)
+    frame.insert(0, 'sensor_id', np.arange(len(frame)) % 7 + 1001)
+    path = tmp_path / 'readings.csv'
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+def backfill(readings_csv, output_dir, model_dir, **kwargs):
+    return run_backfill(readings_csv, str(output_dir), model_dir=model_dir, chunk_rows=64, workers=0,
+                        output_format='npz', log=quiet, **kwargs)
+
+
+def test_fast_tier_scores_with_the_fast_model(readings_csv, model_dir, tmp_path):
+    backfill(readings_csv, tmp_path / 'full', model_dir, tier='full')
+    backfill(readings_csv, tmp_path / 'fast', model_dir, tier='fast')
+    full, fast = read_output(tmp_path / 'full'), read_output(tmp_path / 'fast')
+    assert len(full) == len(fast) == 300
+    assert not np.array_equal(full['prob_high'].to_numpy(), fast['prob_high'].to_numpy())
+    with open(tmp_path / 'fast' / MANIFEST) as f:
+        assert json.load(f)['tier'] == 'fast'
+
+
+def test_fast_tier_without_a_fast_model_is_an_error(readings_csv, model_dir, tmp_path):
+    full_only = tmp_path / 'model'
+    shutil.copytree(model_dir, full_only)
+    for name in os.listdir(full_only):
+        if '_fast' in name:
+            os.remove(full_only / name)
+    with pytest.raises(ValueError, match='fast-tier'):
+        backfill(readings_csv, tmp_path / 'out', str(full_only), tier='fast')
+
+
+class Interrupted(Exception):
+    pass
+
+
+def test_interrupted_run_resumes_after_the_last_part(readings_csv, model_dir, tmp_path):
+    backfill(readings_csv, tmp_path / 'straight', model_dir)
+
+    def crash_after_two_parts(message):
+        if message.strip().startswith('part 00001'):
+            raise Interrupted
+
+    with pytest.raises(Interrupted):
+        run_backfill(readings_csv, str(tmp_path / 'resumed'), model_dir=model_dir, chunk_rows=64, workers=0,
+                     output_format='npz', log=crash_after_two_parts)
+    summary = backfill(readings_csv, tmp_path / 'resumed', model_dir)
+
+    assert summary['resumed_rows'] == 128 and summary['rows'] == 300 - 128
+    pd.testing.assert_frame_equal(read_output(tmp_path / 'resumed'), read_output(tmp_path / 'straight'))
+    # A finished run is not scored again
+    assert backfill(readings_csv, tmp_path / 'resumed', model_dir)['rows'] == 0
+
+
+def test_resume_with_another_chunk_size_is_refused(readings_csv, model_dir, tmp_path):
+    backfill(readings_csv, tmp_path / 'out', model_dir)
+    with pytest.raises(ValueError, match='chunk_rows'):
+        run_backfill(readings_csv, str(tmp_path / 'out'), model_dir=model_dir, chunk_rows=32, workers=0,
+                     output_format='npz', log=quiet)
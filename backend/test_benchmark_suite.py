@@ -0,0 +1,28 @@
+"""
+Benchmark Suite Tests
+The suite never touches the backend's own data files and compares against
+the committed baseline by default
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from conftest import BACKEND_DIR
+
+
+def test_stores_are_isolated_and_baseline_is_committed(server_env):
+    env = {name: value for name, value in server_env.items()
+           if name not in ('TIMESERIES_DB_PATH', 'FEATURE_EVENTS_DB_PATH', 'RISK_GRID_READINGS')}
+    script = ("import json, os, benchmark_suite as b; print(json.dumps([b.BENCH_DIR, b.BASELINE_PATH, "
+              "[os.environ[v] for v in ('TIMESERIES_DB_PATH', 'FEATURE_EVENTS_DB_PATH', 'RISK_GRID_READINGS')], "
+              "[b.api.TIMESERIES_DB_PATH, b.api.feature_store.path]]))")
+    output = subprocess.run([sys.executable, '-c', script], cwd=BACKEND_DIR, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    bench_dir, baseline_path, paths, in_use = json.loads(output.splitlines()[-1])
+
+    assert all(os.path.dirname(path) == bench_dir for path in paths + in_use)
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    assert baseline['prediction_mode'] == 'model' and 'predictor.predict' in baseline['cases']
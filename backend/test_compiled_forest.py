@@ -0,0 +1,40 @@
+"""
+Compiled Forest Tests
+The flat-array engine against sklearn's predict_proba, bit for bit, on
+random rows and on rows sitting exactly on the folded split thresholds
+"""
+
+import numpy as np
+import pytest
+
+from compiled_forest import SMALL_BATCH
+
+
+def split_boundary_rows(engine, X):
+    """Rows whose value for a split's feature is exactly its folded threshold, or the next float above."""
+    rng = np.random.default_rng(1)
+    internal = np.flatnonzero(np.isfinite(engine.threshold))
+    nodes = rng.choice(internal, size=400)
+    rows = X[rng.integers(len(X), size=len(nodes))].copy()
+    thresholds = engine.threshold[nodes]
+    above = rng.random(len(nodes)) < 0.5
+    rows[np.arange(len(nodes)), engine.feature[nodes]] = np.where(
+        above, np.nextafter(thresholds, np.inf), thresholds)
+    return rows
+
+
+@pytest.mark.parametrize('n_rows', [1, SMALL_BATCH, 700])
+def test_compiled_forest_matches_sklearn(forest, n_rows):
+    model, scaler, engine, X = forest
+    rows = np.random.default_rng(n_rows).normal(size=(n_rows, X.shape[1])) * X.std(axis=0) + X.mean(axis=0)
+    np.testing.assert_array_equal(engine.predict_proba(rows), model.predict_proba(scaler.transform(rows)))
+
+
+def test_compiled_forest_matches_sklearn_at_split_boundaries(forest):
+    model, scaler, engine, X = forest
+    rows = split_boundary_rows(engine, X)
+    expected = model.predict_proba(scaler.transform(rows))
+    np.testing.assert_array_equal(engine.predict_proba(rows), expected)
+    for start in range(0, len(rows), SMALL_BATCH):  # the small-batch traversal too
+        chunk = rows[start:start + SMALL_BATCH]
+        np.testing.assert_array_equal(engine.predict_proba(chunk), expected[start:start + SMALL_BATCH])
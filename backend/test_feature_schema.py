@@ -0,0 +1,84 @@
+"""
+Feature Schema Tests
+Error codes, numeric-string coercion and the row and column input forms of
+the compiled feature validation
+"""
+
+import numpy as np
+import pytest
+
+from feature_schema import (ABOVE_MAXIMUM, BELOW_MINIMUM, MISSING, NOT_A_NUMBER, NOT_FINITE, NOT_WHOLE, OK,
+                            FeatureSchema)
+from features import FEATURE_COLUMNS
+
+
+def reading(**overrides):
+    values = dict.fromkeys(FEATURE_COLUMNS, 1.0)
+    values.update(freeze_thaw_cycles=2, previous_rockfall_30d=0)
+    values.update(overrides)
+    return values
+
+
+@pytest.fixture
+def schema():
+    return FeatureSchema(FEATURE_COLUMNS)
+
+
+def test_schema_error_codes(schema):
+    column = FEATURE_COLUMNS.index
+    readings = [
+        reading(),
+        reading(slope_angle=None),
+        reading(slope_angle='steep'),
+        reading(slope_angle=True),
+        reading(slope_angle=float('inf')),
+        reading(slope_angle=-1),
+        reading(slope_angle=91),
+        reading(freeze_thaw_cycles=2.5),
+    ]
+    del readings[0]['rock_strength']
+    codes = schema.validate(readings).codes
+
+    assert codes[0, column('rock_strength')] == MISSING
+    assert codes[0, column('slope_angle')] == OK
+    assert [codes[i, column('slope_angle')] for i in range(1, 7)] == [
+        MISSING, NOT_A_NUMBER, NOT_A_NUMBER, NOT_FINITE, BELOW_MINIMUM, ABOVE_MAXIMUM]
+    assert codes[7, column('freeze_thaw_cycles')] == NOT_WHOLE
+    assert schema.validate(readings).invalid_rows == list(range(8))
+
+
+def test_schema_coerces_numeric_strings(schema):
+    readings = [reading(slope_angle='42.5', freeze_thaw_cycles='3')]
+    result = schema.validate(readings)
+    assert result.ok
+    assert readings[0]['slope_angle'] == 42.5 and readings[0]['freeze_thaw_cycles'] == 3
+
+
+def test_schema_columns_and_rows_agree(schema):
+    readings = [reading(), reading(slope_angle=95), reading(wind_speed='calm')]
+    columns = {field: [r[field] for r in readings] for field in FEATURE_COLUMNS}
+    by_rows = schema.validate(readings)
+    by_columns = schema.validate(columns)
+    np.testing.assert_array_equal(by_rows.codes, by_columns.codes)
+    assert by_columns.errors() == [
+        {'row': 1, 'field': 'slope_angle', 'error': 'above the maximum of 90'},
+        {'row': 2, 'field': 'wind_speed', 'error': 'not a number'},
+    ]
+
+
+def test_schema_without_coercion_leaves_readings_alone(schema):
+    readings = [reading(slope_angle='42.5')]
+    result = schema.validate(readings, coerce=False)
+    assert result.ok and result.matrix[0, FEATURE_COLUMNS.index('slope_angle')] == 42.5
+    assert readings[0]['slope_angle'] == '42.5'
+
+
+def test_schema_numeric_fast_path_matches_mixed_input(schema):
+    rng = np.random.default_rng(3)
+    readings = [reading(slope_angle=float(angle)) for angle in rng.uniform(-10, 100, size=50)]
+    mixed = [dict(r) for r in readings]
+    mixed[0]['wind_speed'] = '1.0'  # one string sends the batch down the per-column path
+    fast, slow = schema.validate(readings), schema.validate(mixed)
+    np.testing.assert_array_equal(fast.matrix, slow.matrix)
+    np.testing.assert_array_equal(fast.codes, slow.codes)
+    assert fast.invalid_rows == [i for i, r in enumerate(readings) if not 0 <= r['slope_angle'] <= 90]
@@ -0,0 +1,65 @@
+"""
+Feature Store Tests
+Trailing-window sums checked against a brute-force recount, the windowed
+features of a sensor, and events shared between processes through the log
+"""
+
+import numpy as np
+
+from feature_store import DAY, HOUR, RollingFeatureStore, RollingWindowSum
+
+START = 1_700_000_000 // DAY * DAY
+
+
+def test_window_sums_match_a_recount():
+    windows = (24, 168)
+    ring = RollingWindowSum(HOUR, windows)
+    rng = np.random.default_rng(0)
+    events, now = [], START
+    for _ in range(2000):
+        now += rng.exponential(900)
+        ts = now - rng.uniform(0, 10 * DAY) if rng.random() < 0.1 else now  # some late arrivals
+        amount = round(rng.uniform(0, 5), 1)
+        if ring.add(ts, amount):
+            events.append((ts, amount))
+
+        head = int(now // HOUR)
+        expected = [sum(a for t, a in events if head - int(t // HOUR) < w) for w in windows]
+        np.testing.assert_allclose(ring.sums(now), expected, atol=1e-6)
+
+
+def test_sensor_features_follow_their_windows():
+    store = RollingFeatureStore()
+    store.add_rainfall('S1', START - 2 * HOUR, 4.0)
+    store.add_rainfall('S1', START - 3 * DAY, 10.0)
+    store.add_rainfall('S1', START - 8 * DAY, 50.0)  # outside both windows
+    store.add_rockfall('S1', START - 5 * DAY)
+    store.add_rockfall('S1', START - 40 * DAY)
+    store.add_maintenance('S1', START - 12 * DAY)
+
+    assert store.features('S1', now=START) == {
+        'rainfall_24h': 4.0, 'rainfall_7d': 14.0, 'previous_rockfall_30d': 1, 'maintenance_days_since': 12.0}
+    # A day later the 2-hour-old rain has left the 24 h window
+    assert store.features('S1', now=START + DAY)['rainfall_24h'] == 0.0
+    assert store.features('unknown', now=START) == {}
+
+    reading = {'sensor_id': 'S1', 'rainfall_24h': 99.0}
+    store.enrich(reading)
+    assert reading['rainfall_24h'] == 99.0 and reading['previous_rockfall_30d'] >= 0
+
+
+def test_recorded_events_reach_every_process(tmp_path):
+    path = str(tmp_path / 'events.db')
+    writer, reader = RollingFeatureStore(path, sync_interval=0), RollingFeatureStore(path, sync_interval=0)
+    recorded, errors = writer.record([
+        {'sensor_id': 'S1', 'type': 'rainfall', 'value': 3.5},
+        {'sensor_id': 'S1', 'type': 'rockfall'},
+        {'sensor_id': 'S1', 'type': 'rainfall'},                    # no amount
+        {'sensor_id': 'S1', 'type': 'rainfall', 'value': 1, 'timestamp': 4_000_000_000},
+    ])
+    assert recorded == 2 and [i for i, _ in errors] == [2, 3]
+
+    features = reader.features('S1')
+    assert features['rainfall_24h'] == 3.5 and features['previous_rockfall_30d'] == 1
+    # A restarted process rebuilds the same windows from the log
+    assert RollingFeatureStore(path).features('S1') == features
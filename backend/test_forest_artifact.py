@@ -0,0 +1,60 @@
+"""
+Forest Artifact Tests
+Round trip of a compiled forest through the .forest file and the checks that
+reject damaged or inconsistent files before they are served
+"""
+
+import copy
+
+import numpy as np
+import pytest
+
+from features import FEATURE_COLUMNS
+from forest_artifact import ArtifactError, load_forest, save_forest
+
+
+def test_forest_artifact_round_trip(forest, tmp_path):
+    _, _, engine, X = forest
+    path = str(tmp_path / 'model.forest')
+    save_forest(path, engine, {'feature_columns': FEATURE_COLUMNS})
+    loaded, info = load_forest(path)
+    assert info == {'feature_columns': FEATURE_COLUMNS}
+    np.testing.assert_array_equal(loaded.predict_proba(X[:50]), engine.predict_proba(X[:50]))
+
+
+def test_forest_artifact_rejects_truncated_file(forest, tmp_path):
+    _, _, engine, _ = forest
+    path = tmp_path / 'model.forest'
+    save_forest(str(path), engine, {})
+    path.write_bytes(path.read_bytes()[:-1000])
+    with pytest.raises(ArtifactError):
+        load_forest(str(path))
+
+
+def test_forest_artifact_rejects_another_format(tmp_path):
+    path = tmp_path / 'model.forest'
+    path.write_bytes(b'PK\x03\x04' + b'\0' * 100)
+    with pytest.raises(ArtifactError, match='not a compiled forest artifact'):
+        load_forest(str(path))
+
+
+def test_forest_artifact_checksum_catches_a_flipped_byte(forest, tmp_path):
+    _, _, engine, _ = forest
+    path = tmp_path / 'model.forest'
+    save_forest(str(path), engine, {})
+    data = bytearray(path.read_bytes())
+    data[-8] ^= 0xff
+    path.write_bytes(bytes(data))
+    with pytest.raises(ArtifactError, match='checksum'):
+        load_forest(str(path))
+
+
+def test_forest_artifact_rejects_out_of_range_children(forest, tmp_path):
+    _, _, engine, _ = forest
+    broken = copy.copy(engine)
+    broken.children = engine.children.copy()
+    broken.children[0] = len(engine.feature) + 5
+    path = str(tmp_path / 'model.forest')
+    save_forest(path, broken, {})  # the checksum matches, the structure does not
+    with pytest.raises(ArtifactError, match='inconsistent'):
+        load_forest(path)
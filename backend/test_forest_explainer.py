@@ -0,0 +1,57 @@
+"""
+Forest Explainer Tests
+Decision-path contributions add up to the forest's probabilities, whatever
+the batch size and whether all classes or one per row are attributed
+"""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from compiled_forest import BLOCK_ROWS
+from forest_explainer import ForestExplainer
+from predictor import RockfallPredictor
+
+
+@pytest.fixture(scope='module')
+def explainer(forest):
+    return ForestExplainer(forest[2])
+
+
+@pytest.mark.parametrize('n_rows', [1, BLOCK_ROWS + 7])
+def test_bias_plus_contributions_is_predict_proba(forest, explainer, n_rows):
+    _, _, engine, X = forest
+    rows = np.random.default_rng(n_rows).normal(size=(n_rows, X.shape[1])) * X.std(axis=0) + X.mean(axis=0)
+    contributions = explainer.contributions(rows)
+    assert contributions.shape == (n_rows, len(engine.feature_columns), len(engine.classes_))
+    np.testing.assert_allclose(explainer.bias + contributions.sum(axis=1), engine.predict_proba(rows),
+                               rtol=0, atol=1e-12)
+
+
+def test_single_class_attribution_matches_all_classes(forest, explainer):
+    _, _, engine, X = forest
+    rows = X[:100]
+    class_indices = engine.predict_proba(rows).argmax(axis=1)
+    every_class = explainer.contributions(rows)
+    np.testing.assert_allclose(explainer.contributions(rows, class_indices),
+                               every_class[np.arange(len(rows)), :, class_indices], rtol=0, atol=1e-12)
+
+
+def test_unused_features_get_no_credit(forest, explainer):
+    _, _, engine, X = forest
+    unused = np.setdiff1d(np.arange(X.shape[1]), engine.feature[np.isfinite(engine.threshold)])
+    assert np.all(explainer.contributions(X[:50])[:, unused] == 0)
+
+
+def test_predictor_explanation_adds_up(model_dir):
+    predictor = RockfallPredictor(model_path=os.path.join(model_dir, 'rockfall_model.forest'))
+    with open(os.path.join(model_dir, 'sample_data.json')) as f:
+        reading = json.load(f)[0]
+    result = predictor.predict(reading, explain=True)
+    explanation = result['explanation']
+    total = explanation['baseline'] + sum(c['contribution'] for c in explanation['contributions'])
+    # Percentage points rounded to 0.01 per feature
+    assert explanation['category'] == result['risk_category']
+    assert total == pytest.approx(result['category_probabilities'][result['risk_category']], abs=0.2)
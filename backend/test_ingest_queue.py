@@ -0,0 +1,95 @@
+"""
+Ingestion Queue Tests
+Micro-batching of pushed readings: batch sizes under load, backpressure from
+a full queue, and a bad reading that must not take its batch down with it
+"""
+
+import threading
+import time
+
+from ingest_queue import MicroBatcher
+
+
+class Sink:
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, readings, predictions):
+        assert len(readings) == len(predictions)
+        self.batches.append(list(zip(readings, predictions)))
+
+    @property
+    def readings(self):
+        return [reading for batch in self.batches for reading, _ in batch]
+
+
+def double(readings):
+    if any(reading < 0 for reading in readings):
+        raise ValueError('negative reading')
+    return [reading * 2 for reading in readings]
+
+
+def gated(score):
+    """``score`` that holds its first call until released, so readings pile up behind it."""
+    started, release = threading.Event(), threading.Event()
+
+    def wrapper(readings):
+        started.set()
+        release.wait(10)
+        return score(readings)
+    return wrapper, started, release
+
+
+def test_backlog_is_scored_in_full_batches_in_order():
+    score, started, release = gated(double)
+    sink = Sink()
+    batcher = MicroBatcher(score, sink, max_batch=100, max_delay=0.5)
+    batcher.submit([0])
+    assert started.wait(10)
+    assert batcher.submit(list(range(1, 1001))) == 1000
+    release.set()
+    batcher.drain()
+
+    assert sink.readings == list(range(1001))
+    assert all(prediction == reading * 2 for batch in sink.batches for reading, prediction in batch)
+    # The first reading went alone; the backlog behind it fills whole batches
+    assert [len(batch) for batch in sink.batches] == [1] + [100] * 10
+    assert batcher.stats()['max_batch_size'] == 100
+
+
+def test_light_traffic_waits_at_most_max_delay():
+    sink = Sink()
+    batcher = MicroBatcher(double, sink, max_batch=100, max_delay=0.05)
+    start = time.monotonic()
+    batcher.submit([7])
+    batcher.drain()
+    assert sink.readings == [7] and time.monotonic() - start < 1.0
+
+
+def test_full_queue_refuses_the_rest():
+    score, started, release = gated(double)
+    sink = Sink()
+    batcher = MicroBatcher(score, sink, max_batch=100, max_delay=0.01, max_queue=10)
+    batcher.submit([0])
+    assert started.wait(10)
+    assert batcher.submit(list(range(1, 31))) == 10
+    release.set()
+    batcher.drain()
+
+    assert sink.readings == list(range(11))
+    stats = batcher.stats()
+    assert stats['received'] == 11 and stats['rejected'] == 20
+
+
+def test_bad_reading_only_loses_itself():
+    score, started, release = gated(double)
+    sink = Sink()
+    batcher = MicroBatcher(score, sink, max_batch=100, max_delay=0.01)
+    batcher.submit([0])
+    assert started.wait(10)
+    batcher.submit([1, 2, -3, 4])
+    release.set()
+    batcher.drain()
+
+    assert sink.readings == [0, 1, 2, 4]
+    assert batcher.stats()['failed'] == 1 and batcher.stats()['scored'] == 4
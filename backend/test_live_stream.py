@@ -0,0 +1,78 @@
+"""
+Live Stream Tests
+One producer feeding threaded and asyncio subscribers, each kind under its
+own limit, and asyncio streams ended by close_async_streams()
+"""
+
+import asyncio
+import itertools
+
+from live_stream import LiveBroadcaster
+
+
+def broadcaster(**kwargs):
+    counter = itertools.count()
+    return LiveBroadcaster(lambda: {'tick': next(counter)}, interval=0.02, keepalive=5, **kwargs)
+
+
+def test_async_streams_receive_ticks_without_a_thread_each():
+    live = broadcaster(max_subscribers=1, max_async_subscribers=50)
+
+    async def listen(count):
+        frames = live.subscribe_async()
+        try:
+            received = [frame async for frame in take(frames, count + 1)]
+        finally:
+            await frames.aclose()
+        return received[1:]  # after the retry line
+
+    async def main():
+        return await asyncio.gather(*(listen(3) for _ in range(50)))
+
+    for frames in asyncio.run(main()):
+        assert len(frames) == 3 and all(b'data: {"tick"' in frame for frame in frames)
+    stats = live.stats()
+    assert stats['subscribers'] == 0 and stats['async_subscribers'] == 0
+
+
+def test_caps_are_counted_separately():
+    live = broadcaster(max_subscribers=1, max_async_subscribers=2)
+
+    async def main():
+        streams = [live.subscribe_async() for _ in range(3)]
+        assert streams[2] is None
+        thread_stream = live.subscribe()
+        assert thread_stream is not None and live.subscribe() is None
+        thread_stream.close()
+        for frames in streams[:2]:
+            await frames.aclose()
+
+    asyncio.run(main())
+    assert live.stats()['subscribers'] == 0 and live.rejected == 2
+
+
+def test_close_async_streams_ends_open_streams():
+    live = broadcaster(max_async_subscribers=10)
+
+    async def listen():
+        frames = live.subscribe_async()
+        received = 0
+        async for _ in frames:
+            received += 1
+            if received == 3:
+                asyncio.get_running_loop().call_soon(live.close_async_streams)
+        return received
+
+    async def main():
+        return await asyncio.wait_for(asyncio.gather(*(listen() for _ in range(5))), 10)
+
+    assert all(received >= 3 for received in asyncio.run(main()))
+    assert live.stats()['async_subscribers'] == 0
+
+
+async def take(frames, count):
+    async for frame in frames:
+        yield frame
+        count -= 1
+        if not count:
+            return
@@ -0,0 +1,85 @@
+"""
+Metrics Tests
+Prometheus rendering in one process and the merge of worker snapshots
+through a multiprocess directory
+"""
+
+import multiprocessing
+import os
+import time
+
+import pytest
+
+import metrics as prom
+
+
+def sample(text, name):
+    """Value of the one sample line starting with ``name``."""
+    values = [line.rsplit(' ', 1)[1] for line in text.splitlines() if line.startswith(name + ' ')]
+    assert len(values) == 1, text
+    return float(values[0])
+
+
+def test_single_process_render():
+    registry = prom.Registry()
+    requests = registry.counter('requests_total', 'Requests', ['status'])
+    latency = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+    registry.gauge('queue_depth', 'Queue depth', lambda: 3)
+    requests.inc(200)
+    requests.inc(200)
+    latency.observe(0.5)
+
+    text = registry.render()
+    assert sample(text, 'requests_total{status="200"}') == 2
+    assert sample(text, 'latency_seconds_bucket{le="0.1"}') == 0
+    assert sample(text, 'latency_seconds_bucket{le="1.0"}') == 1
+    assert sample(text, 'queue_depth') == 3
+
+
+def make_registry(directory):
+    registry = prom.Registry(str(directory), flush_interval=60)
+    requests = registry.counter('requests_total', 'Requests', ['status'])
+    latency = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+    registry.gauge('worker_pid', 'Process id', os.getpid)
+    return registry, requests, latency
+
+
+def serve(registry, requests, latency, ready, done):
+    """A forked worker: counts its own requests, publishes them and stays alive until told."""
+    for _ in range(5):
+        requests.inc(200)
+    latency.observe(0.05)
+    registry.flush()
+    ready.set()
+    done.wait(10)
+
+
+@pytest.mark.filterwarnings('ignore:.*fork:DeprecationWarning')  # the flusher thread is running
+def test_workers_are_merged_and_totals_never_go_backwards(tmp_path):
+    registry, requests, latency = make_registry(tmp_path)
+    requests.inc(200, amount=3)  # counted in the parent before the fork
+    latency.observe(0.5)
+
+    context = multiprocessing.get_context('fork')
+    ready, done = context.Event(), context.Event()
+    worker = context.Process(target=serve, args=(registry, requests, latency, ready, done))
+    worker.start()
+    try:
+        assert ready.wait(10)
+        text = registry.render()
+        # The child started from zero, so the parent's 3 are not counted twice
+        assert sample(text, 'requests_total{status="200"}') == 8
+        assert sample(text, 'latency_seconds_bucket{le="0.1"}') == 1
+        assert sample(text, 'latency_seconds_count') == 2
+        assert sample(text, f'worker_pid{{worker="{worker.pid}"}}') == worker.pid
+        assert sample(text, f'worker_pid{{worker="{os.getpid()}"}}') == os.getpid()
+    finally:
+        done.set()
+        worker.join(10)
+
+    # A worker that exited keeps its counts; its gauges go once its snapshot is stale
+    old = time.time() - 600
+    os.utime(tmp_path / f'{worker.pid}.json', (old, old))
+    text = registry.render()
+    assert sample(text, 'requests_total{status="200"}') == 8
+    assert f'worker="{worker.pid}"' not in text
@@ -0,0 +1,99 @@
+"""
+Model Manager Tests
+Hot swaps of the served model: requests in flight during a swap, rejected
+candidates, and the watcher picking up artifacts renamed into place
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+
+import pytest
+
+from model_manager import ModelManager
+from predictor import RockfallPredictor
+
+
+@pytest.fixture
+def deployment(model_dir, tmp_path):
+    """A served copy of the test model, and a different (fast-tier) forest to deploy over it."""
+    shutil.copy(os.path.join(model_dir, 'rockfall_model.forest'), tmp_path / 'rockfall_model.forest')
+    shutil.copy(os.path.join(model_dir, 'sample_data.json'), tmp_path / 'sample_data.json')
+    with open(os.path.join(model_dir, 'sample_data.json')) as f:
+        samples = json.load(f)
+    return str(tmp_path / 'rockfall_model.forest'), os.path.join(model_dir, 'rockfall_model_fast.forest'), samples
+
+
+def deploy(source, path):
+    """Write the new artifact elsewhere and rename it into place, as the manager requires."""
+    shutil.copy(source, f"{path}.new")
+    os.replace(f"{path}.new", path)
+
+
+def manager_for(path, **kwargs):
+    return ModelManager(lambda paths: RockfallPredictor(model_path=paths[0]), [path],
+                        sample_path=os.path.join(os.path.dirname(path), 'sample_data.json'), **kwargs)
+
+
+def test_requests_keep_serving_through_a_swap(deployment):
+    path, new_model, samples = deployment
+    swaps = []
+    manager = manager_for(path, poll_interval=0, on_swap=swaps.append)
+    first = manager.load()
+    in_flight = manager.active  # a request that started before the swap
+
+    errors, served = [], []
+    stop = threading.Event()
+
+    def serve():
+        while not stop.is_set():
+            try:
+                served.append(manager.active.predictor.predict(samples[len(served) % len(samples)])['risk_category'])
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=serve) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    deploy(new_model, path)
+    second = manager.load()
+    time.sleep(0.05)
+    stop.set()
+    for thread in threads:
+        thread.join(10)
+
+    assert not errors and served
+    assert manager.active is second and second.version != first.version
+    assert swaps == [first, second] and manager.reloads == 1
+    # The old snapshot still scores after the swap
+    assert in_flight.predictor.predict(samples[0])['risk_category']
+
+
+def test_broken_candidate_leaves_the_model_serving(deployment, tmp_path):
+    path, _, samples = deployment
+    manager = manager_for(path, poll_interval=0)
+    first = manager.load()
+
+    broken = tmp_path / 'broken.forest'
+    broken.write_bytes(b'not a forest')
+    deploy(str(broken), path)
+    with pytest.raises(ValueError):
+        manager.load()
+    assert manager.active is first and manager.rejected_version is not None
+    assert manager.active.predictor.predict(samples[0])['risk_category']
+
+
+def test_watcher_reloads_changed_artifacts(deployment):
+    path, new_model, _ = deployment
+    manager = manager_for(path, poll_interval=0.05)
+    first = manager.load()
+    manager.ensure_watching()
+
+    deploy(new_model, path)
+    deadline = time.monotonic() + 10
+    while manager.active is first and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert manager.active is not first and manager.failed_reloads == 0
+    assert manager.stats()['watching']
@@ -0,0 +1,95 @@
+"""
+Model Registry Tests
+Per-site models with a stand-in loader: LRU eviction, one load for many
+concurrent first requests, cached failures and reloads of changed sites
+"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from model_registry import ModelRegistry, SiteModelError
+
+
+class FakePredictor:
+    def __init__(self, path):
+        with open(path) as f:
+            self.content = f.read()
+        self.model_info = {}
+
+
+def make_sites(root, *names):
+    for name in names:
+        os.makedirs(root / name, exist_ok=True)
+        (root / name / 'model.bin').write_text(f'{name} v1')
+
+
+def registry(root, load=None, **kwargs):
+    return ModelRegistry(str(root), lambda directory: {'model_path': os.path.join(directory, 'model.bin')},
+                         load or (lambda artifacts: FakePredictor(artifacts['model_path'])), **kwargs)
+
+
+def test_least_recently_used_site_is_evicted(tmp_path):
+    make_sites(tmp_path, 'North', 'East', 'South')
+    sites = registry(tmp_path, max_models=2)
+    north = sites.get('North')
+    sites.get('East')
+    assert sites.get('North') is north  # North is now the most recently used
+    sites.get('South')
+
+    assert [entry['site'] for entry in sites.stats()['resident']] == ['North', 'South']
+    assert sites.evictions == 1 and sites.hits == 1 and sites.loads == 3
+    assert sites.get('Unknown') is None and sites.get('../North') is None
+
+
+def test_concurrent_first_requests_share_one_load(tmp_path):
+    make_sites(tmp_path, 'North')
+    release, loads = threading.Event(), []
+
+    def slow_load(artifacts):
+        loads.append(artifacts)
+        release.wait(10)
+        return FakePredictor(artifacts['model_path'])
+
+    sites = registry(tmp_path, slow_load)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(sites.get('North'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while sites.misses + sites.coalesced < 8:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(10)
+
+    assert len(loads) == 1 and sites.coalesced == 7
+    assert len(results) == 8 and all(model is results[0] for model in results)
+
+
+def test_failed_load_is_not_retried_until_the_check_interval(tmp_path):
+    make_sites(tmp_path, 'North')
+    attempts = []
+
+    def broken_load(artifacts):
+        attempts.append(artifacts)
+        raise ValueError('corrupt artifact')
+
+    sites = registry(tmp_path, broken_load, check_interval=60)
+    for _ in range(3):
+        with pytest.raises(SiteModelError, match='corrupt artifact'):
+            sites.get('North')
+    assert len(attempts) == 1 and sites.failed_loads == 1
+
+
+def test_changed_site_is_reloaded(tmp_path):
+    make_sites(tmp_path, 'North')
+    sites = registry(tmp_path, check_interval=0)
+    first = sites.get('North')
+    assert sites.get('North') is first
+
+    (tmp_path / 'North' / 'model.bin').write_text('North v2, retrained')
+    second = sites.get('North')
+    assert second is not first and second.predictor.content == 'North v2, retrained'
+    assert second.version != first.version and sites.loads == 2
@@ -0,0 +1,77 @@
+"""
+Prediction Cache Tests
+Cache keys built from quantized readings (one at a time and from a feature
+matrix) and the per-scope model versions that invalidate entries
+"""
+
+import numpy as np
+
+from features import FEATURE_COLUMNS
+from prediction_cache import PredictionCache
+
+
+def reading(**overrides):
+    values = dict.fromkeys(FEATURE_COLUMNS, 1.0)
+    values.update(freeze_thaw_cycles=2, previous_rockfall_30d=0)
+    values.update(overrides)
+    return values
+
+
+def test_cache_scopes_keep_their_own_versions():
+    cache = PredictionCache(max_entries=16)
+    key = cache.key(reading())
+    cache.put(key, {'risk': 'global'}, 'v1')
+    cache.put(key, {'risk': 'north'}, 'n1', scope='Sector-North')
+
+    assert cache.get(key, 'v1') == {'risk': 'global'}
+    assert cache.get(key, 'n1', scope='Sector-North') == {'risk': 'north'}
+    assert cache.get(key, 'v1', scope='Sector-East') is None
+
+    # A new version only drops the entries of its own scope
+    assert cache.get(key, 'n2', scope='Sector-North') is None
+    assert cache.get(key, 'v1') == {'risk': 'global'}
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_cache_key_quantizes_and_skips_invalid_readings():
+    cache = PredictionCache(max_entries=16)
+    assert cache.key(reading(slope_angle=40.1)) == cache.key(reading(slope_angle=39.9))
+    assert cache.key(reading(slope_angle=40.1)) != cache.key(reading(slope_angle=41.2))
+    assert cache.key(reading(slope_angle='40')) is None
+    assert cache.key(reading(slope_angle=float('nan'))) is None
+
+
+def test_cache_matrix_keys_match_reading_keys():
+    cache = PredictionCache(max_entries=16)
+    rng = np.random.default_rng(2)
+    readings = [reading(**{field: float(value) for field, value in zip(FEATURE_COLUMNS, row)})
+                for row in rng.uniform(0, 50, size=(40, len(FEATURE_COLUMNS)))]
+    matrix = np.array([[r[field] for field in FEATURE_COLUMNS] for r in readings])
+    assert cache.matrix_keys(matrix, FEATURE_COLUMNS) == [cache.key(r) for r in readings]
+
+
+def test_cache_evicts_least_recently_used():
+    cache = PredictionCache(max_entries=2)
+    first, second, third = (cache.key(reading(slope_angle=angle)) for angle in (10, 20, 30))
+    cache.put(first, 'first', 'v1')
+    cache.put(second, 'second', 'v1')
+    assert cache.get(first, 'v1') == 'first'  # now the most recently used
+    cache.put(third, 'third', 'v1')
+
+    assert cache.get(second, 'v1') is None
+    assert cache.get(first, 'v1') == 'first' and cache.get(third, 'v1') == 'third'
+    assert cache.stats()['evictions'] == 1
+
+
+def test_cache_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('prediction_cache.time.monotonic', lambda: now[0])
+    cache = PredictionCache(max_entries=16, ttl_seconds=30)
+    key = cache.key(reading())
+    cache.put(key, 'cached', 'v1')
+
+    now[0] += 29
+    assert cache.get(key, 'v1') == 'cached'
+    now[0] += 2
+    assert cache.get(key, 'v1') is None
+    assert cache.stats()['expirations'] == 1 and cache.stats()['size'] == 0
@@ -0,0 +1,64 @@
+"""
+Risk Grid Tests
+Zone readings posted to several workers and the incremental rescoring that
+follows them, on a small synthetic pit
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from predictor import RockfallPredictor
+from risk_grid import RiskGrid
+
+
+@pytest.fixture(scope='module')
+def model(model_dir):
+    return RockfallPredictor(model_path=os.path.join(model_dir, 'rockfall_model.forest'))
+
+
+def test_posts_to_different_workers_all_survive(tmp_path):
+    path = str(tmp_path / 'readings.json')
+    first, second = RiskGrid(readings_path=path, synthetic_size=50), RiskGrid(readings_path=path, synthetic_size=50)
+    first.set_readings({'Sector-East': {'rainfall_24h': 80.0}})
+    # ``second`` never saw the first post; it must not overwrite it
+    second.set_readings({'Sector-South': {'wind_speed': 30.0}})
+    first.set_readings({'Sector-East': {'blast_distance': 120.0}})
+
+    reader = RiskGrid(readings_path=path, synthetic_size=50)
+    assert reader._read_readings() == {
+        'Sector-East': {'rainfall_24h': 80.0, 'blast_distance': 120.0},
+        'Sector-South': {'wind_speed': 30.0},
+    }
+
+
+def test_posts_before_a_refresh_are_all_applied(model):
+    grid = RiskGrid(synthetic_size=50)
+    grid.refresh(model, 'v1')
+    grid.set_readings({'Sector-East': {'rainfall_24h': 80.0}})
+    grid.set_readings({'Sector-South': {'wind_speed': 30.0}})
+    grid.refresh(model, 'v1')
+    assert grid.readings == {'Sector-East': {'rainfall_24h': 80.0}, 'Sector-South': {'wind_speed': 30.0}}
+
+
+def test_refresh_rescores_only_the_changed_zone(model, tmp_path):
+    path = str(tmp_path / 'readings.json')
+    grid = RiskGrid(readings_path=path, synthetic_size=50, chunk_size=97)
+    first = grid.refresh(model, 'v1')
+    assert first['cells_changed'] == 50 * 50
+    assert grid.refresh(model, 'v1')['cells_changed'] == 0
+
+    east = grid.zone_names.index('Sector-East')
+    grid.set_readings({'Sector-East': {'rainfall_24h': 150.0, 'vibration_intensity': 9.0}})
+    result = grid.refresh(model, 'v1')
+    assert result['reasons'] == ['readings']
+    assert result['cells_changed'] == np.count_nonzero(grid.zone == east)
+
+    # Same scores as a grid that scored everything from scratch
+    fresh = RiskGrid(readings_path=path, synthetic_size=50)
+    fresh.refresh(model, 'v1')
+    np.testing.assert_array_equal(grid.risk, fresh.risk)
+    np.testing.assert_array_equal(grid.category, fresh.category)
+
+    assert grid.refresh(model, 'v2')['cells_changed'] == 50 * 50
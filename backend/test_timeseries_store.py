@@ -0,0 +1,94 @@
+"""
+Time-Series Store Tests
+Readings written through the background writer, the hourly rollup kept next
+to them, and repeated readings that must be stored only once
+"""
+
+import sqlite3
+
+import pytest
+
+from features import FEATURE_COLUMNS
+from timeseries_store import HOUR, TimeSeriesStore
+
+START = 1_700_000_000 // HOUR * HOUR
+
+
+def reading(sensor_id, ts, **overrides):
+    values = dict.fromkeys(FEATURE_COLUMNS, 10.0)
+    values.update(sensor_id=sensor_id, location='Sector-North', timestamp=ts)
+    values.update(overrides)
+    return values
+
+
+def prediction(risk):
+    return {'risk_category': 'High', 'risk_probability': risk, 'confidence': 90.0}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TimeSeriesStore(str(tmp_path / 'timeseries.db'), flush_interval=0.01)
+
+
+def test_rollup_matches_raw_readings(store):
+    for i in range(120):
+        store.append(reading(f'S{i % 3}', START + i * 60, slope_angle=float(i)), prediction(float(i % 100)))
+    store.flush()
+
+    assert store.hourly_counts(START, START + 3 * HOUR) == {START: 60, START + HOUR: 60}
+    raw = store.query(START, START + 2 * HOUR, max_points=2)
+    rolled = store.query(START, START + 2 * HOUR, max_points=1)
+    assert [p['samples'] for p in raw] == [60, 60] and rolled[0]['samples'] == 120
+    assert rolled[0]['slope_angle'] == pytest.approx((raw[0]['slope_angle'] + raw[1]['slope_angle']) / 2)
+    assert store.hourly_points([START], sensor_id='S1')[START]['samples'] == 20
+
+
+def test_repeated_reading_is_stored_once(store):
+    # A dashboard polling one demo frame eight times, then the next frame
+    for _ in range(8):
+        store.append(reading('S1', START + 5), prediction(80.0))
+    store.append(reading('S1', START + 6), prediction(20.0))
+    store.flush()
+
+    assert store.hourly_counts(START, START + HOUR) == {START: 2}
+    assert store.query(START, START + 60, max_points=1)[0]['samples'] == 2
+    assert store.hourly_points([START])[START]['max_risk_probability'] == 80.0
+    stats = store.stats()
+    assert stats['written'] == 2 and stats['duplicates'] == 7
+
+    # Repeats in a later batch are ignored too
+    store.append(reading('S1', START + 5), prediction(80.0))
+    store.flush()
+    assert store.hourly_counts(START, START + HOUR) == {START: 2}
+
+
+def test_existing_store_is_deduplicated_on_open(store):
+    with sqlite3.connect(store.path) as conn:
+        conn.execute('DROP INDEX idx_readings_sensor_ts')
+        conn.executemany('INSERT INTO readings (ts, sensor_id, location) VALUES (?, ?, ?)',
+                         [(START, 'S1', 'Sector-North')] * 3 + [(START + 1, 'S1', 'Sector-North')])
+
+    reopened = TimeSeriesStore(store.path)
+    with sqlite3.connect(reopened.path) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM readings').fetchone()[0] == 2
+    reopened.append(reading('S1', START), prediction(50.0))
+    reopened.flush()
+    assert reopened.stats()['duplicates'] == 1
+
+
+def test_pruning_keeps_whole_rollup_hours(tmp_path):
+    store = TimeSeriesStore(str(tmp_path / 'timeseries.db'), flush_interval=0.01,
+                            retention_days=1, rollup_retention_days=2, prune_interval=3600)
+    for hour in range(72):
+        store.append(reading('S1', START + hour * HOUR + 60), prediction(10.0))
+    store.flush()
+
+    now = START + 72 * HOUR
+    with sqlite3.connect(store.path) as conn:
+        store._prune(conn, now)
+        oldest_reading = conn.execute('SELECT MIN(ts) FROM readings').fetchone()[0]
+    assert oldest_reading >= now - 24 * HOUR
+    counts = store.hourly_counts(START, now)
+    assert min(counts) == now - 48 * HOUR and len(counts) == 48
+    # Long ranges still come from the remaining rollup hours
+    assert sum(p['samples'] for p in store.query(now - 48 * HOUR, now, max_points=4)) == 48
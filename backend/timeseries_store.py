@@ -0,0 +1,418 @@
+"""
+Time-Series Store
+Embedded SQLite store for sensor readings and their predictions, with an
+hourly rollup table so range queries stay bounded over months of history
+"""
+
+import atexit
+import logging
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from features import FEATURE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Series returned by range queries (averaged per bucket)
+SERIES_COLUMNS = ['risk_probability', 'slope_angle', 'rainfall_24h', 'vibration_intensity']
+
+HIGH_RISK_THRESHOLD = 60.0
+RAW_QUERY_MAX_SECONDS = 48 * 3600  # longer ranges are served from hourly rollups
+HOUR = 3600
+DAY = 24 * HOUR
+PRUNE_BATCH_ROWS = 10000  # rows deleted per transaction when pruning
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS readings (
+    ts REAL NOT NULL,
+    sensor_id TEXT NOT NULL,
+    location TEXT NOT NULL,
+    risk_category TEXT,
+    risk_probability REAL,
+    confidence REAL,
+    {', '.join(f'{c} REAL' for c in FEATURE_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS idx_readings_ts ON readings (ts);
+CREATE INDEX IF NOT EXISTS idx_readings_location_ts ON readings (location, ts);
+
+CREATE TABLE IF NOT EXISTS hourly_rollup (
+    hour_ts INTEGER NOT NULL,
+    sensor_id TEXT NOT NULL,
+    location TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    high_risk INTEGER NOT NULL,
+    max_risk REAL,
+    {', '.join(f'sum_{c} REAL' for c in SERIES_COLUMNS)},
+    PRIMARY KEY (sensor_id, location, hour_ts)
+);
+CREATE INDEX IF NOT EXISTS idx_rollup_hour ON hourly_rollup (hour_ts);
+"""
+
+# One reading per sensor and timestamp: the same reading stored again (a
+# dashboard re-polling one demo frame, an ingest retry) is ignored. Stores
+# written before this index existed are de-duplicated once on open.
+UNIQUE_READINGS = """
+DROP INDEX IF EXISTS idx_readings_sensor_ts;
+DELETE FROM readings WHERE rowid NOT IN (SELECT MIN(rowid) FROM readings GROUP BY sensor_id, ts);
+CREATE UNIQUE INDEX idx_readings_sensor_ts ON readings (sensor_id, ts);
+"""
+
+
+def category_for_probability(risk_probability):
+    """Risk category for a (possibly averaged) risk probability."""
+    if risk_probability < 25:
+        return 'Low'
+    elif risk_probability < 50:
+        return 'Medium'
+    elif risk_probability < 70:
+        return 'High'
+    return 'Critical'
+
+
+def parse_timestamp(value, default=None):
+    """Accept unix seconds or an ISO-8601 string; return unix seconds."""
+    if value is None or value == '':
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid timestamp: {value}")
+
+
+class TimeSeriesStore:
+    """
+    Append-only store of readings plus predictions.
+
+    Appends are queued and written by a background thread in batched
+    transactions; each batch also upserts the hourly rollup. A reading is
+    stored once per ``(sensor_id, timestamp)``: repeats are ignored and
+    not counted in the rollup. The writer and
+    the SQLite connections are created lazily per process, so the store is
+    safe to construct before gunicorn forks its workers.
+
+    With ``retention_days`` the writer deletes raw readings older than that
+    every ``prune_interval`` seconds, and with ``rollup_retention_days``
+    whole hours of the rollup (None keeps them forever). Raw readings are
+    only queried for the last 48 hours, so their retention can be short.
+    """
+
+    def __init__(self, path, flush_interval=0.5, batch_size=500, max_queue=100000,
+                 retention_days=None, rollup_retention_days=None, prune_interval=3600.0):
+        self.path = path
+        self.flush_interval = float(flush_interval)
+        self.batch_size = int(batch_size)
+        self.max_queue = int(max_queue)
+        self.retention_days = retention_days or None
+        self.rollup_retention_days = rollup_retention_days or None
+        self.prune_interval = float(prune_interval)
+
+        self._pid = None
+        self._queue = None
+        self._writer = None
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+
+        self.appended = 0
+        self.written = 0
+        self.duplicates = 0  # rows ignored as already stored
+        self.dropped = 0
+        self.pruned = 0
+        self.pruned_hours = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            unique = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' "
+                                  "AND name = 'idx_readings_sensor_ts' AND sql LIKE 'CREATE UNIQUE%'").fetchone()
+            if unique is None:
+                conn.executescript(UNIQUE_READINGS)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _reader(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _ensure_writer(self):
+        if self._pid == os.getpid() and self._writer is not None and self._writer.is_alive():
+            return
+        with self._init_lock:
+            if self._pid != os.getpid() or self._writer is None or not self._writer.is_alive():
+                self._pid = os.getpid()
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._writer = threading.Thread(target=self._write_loop, name='timeseries-writer',
+                                                daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+
+    def append(self, reading, prediction, timestamp=None):
+        """
+        Queue one reading and its prediction for storage.
+
+        Args:
+            reading (dict): Sensor reading (features, ``sensor_id``, ``location``)
+            prediction (dict): Prediction result for the reading
+            timestamp: Unix seconds or ISO string; defaults to the reading's
+                ``timestamp`` field, then to now
+        """
+        try:
+            ts = parse_timestamp(timestamp if timestamp is not None else reading.get('timestamp'),
+                                 default=time.time())
+        except ValueError:
+            ts = time.time()
+
+        row = [
+            ts,
+            str(reading.get('sensor_id') or 'unknown'),
+            str(reading.get('location') or 'unknown'),
+            prediction.get('risk_category'),
+            prediction.get('risk_probability'),
+            prediction.get('confidence'),
+        ]
+        for column in FEATURE_COLUMNS:
+            value = reading.get(column)
+            row.append(float(value) if isinstance(value, (int, float)) else None)
+
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(row)
+            self.appended += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout=5.0):
+        """Block until queued rows are written (best effort)."""
+        if self._queue is None or self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _write_loop(self):
+        conn = self._connect()
+        last_prune = 0.0
+        while True:
+            if (self.retention_days or self.rollup_retention_days) and \
+                    time.monotonic() - last_prune >= self.prune_interval:
+                last_prune = time.monotonic()
+                try:
+                    self._prune(conn, time.time())
+                except sqlite3.Error as e:
+                    logger.error(f"Time-series pruning failed: {e}")
+            try:
+                rows = [self._queue.get(timeout=self.prune_interval)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.flush_interval
+            while len(rows) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    rows.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                written = self._write(conn, rows)
+                self.written += written
+                self.duplicates += len(rows) - written
+            except sqlite3.Error as e:
+                logger.error(f"Time-series write failed ({len(rows)} rows): {e}")
+            finally:
+                for _ in rows:
+                    self._queue.task_done()
+
+    def _write(self, conn, rows):
+        """Insert a batch and upsert its rollup; returns the number of rows not already stored."""
+        placeholders = ', '.join('?' * (6 + len(FEATURE_COLUMNS)))
+        columns = ', '.join(['ts', 'sensor_id', 'location', 'risk_category',
+                             'risk_probability', 'confidence'] + FEATURE_COLUMNS)
+
+        index = {c: 6 + FEATURE_COLUMNS.index(c) for c in SERIES_COLUMNS if c in FEATURE_COLUMNS}
+        index['risk_probability'] = 4
+        sums = ', '.join(f'sum_{c}' for c in SERIES_COLUMNS)
+        updates = ', '.join(f'sum_{c} = sum_{c} + excluded.sum_{c}' for c in SERIES_COLUMNS)
+        insert = f'INSERT OR IGNORE INTO readings ({columns}) VALUES ({placeholders})'
+        with conn:
+            # Row by row so the rollup only counts the rows actually inserted
+            inserted = [row for row in rows if conn.execute(insert, row).rowcount]
+            rollup = self._rollup(inserted, index)
+            conn.executemany(
+                f"""INSERT INTO hourly_rollup (hour_ts, sensor_id, location, n, high_risk, max_risk, {sums})
+                    VALUES ({', '.join('?' * (6 + len(SERIES_COLUMNS)))})
+                    ON CONFLICT (sensor_id, location, hour_ts) DO UPDATE SET
+                        n = n + excluded.n,
+                        high_risk = high_risk + excluded.high_risk,
+                        max_risk = MAX(max_risk, excluded.max_risk),
+                        {updates}""",
+                [key + tuple(agg) for key, agg in rollup.items()]
+            )
+        return len(inserted)
+
+    @staticmethod
+    def _rollup(rows, index):
+        rollup = {}
+        for row in rows:
+            key = (int(row[0] // HOUR) * HOUR, row[1], row[2])
+            agg = rollup.setdefault(key, [0, 0, None] + [0.0] * len(SERIES_COLUMNS))
+            risk = row[4] or 0.0
+            agg[0] += 1
+            agg[1] += risk > HIGH_RISK_THRESHOLD
+            agg[2] = risk if agg[2] is None else max(agg[2], risk)
+            for i, column in enumerate(SERIES_COLUMNS):
+                agg[3 + i] += row[index[column]] or 0.0
+        return rollup
+
+    def _prune(self, conn, now):
+        """Delete readings and rollup hours older than their retention, in small transactions."""
+        if self.retention_days:
+            cutoff = now - self.retention_days * DAY
+            while True:
+                with conn:
+                    deleted = conn.execute(
+                        'DELETE FROM readings WHERE rowid IN '
+                        '(SELECT rowid FROM readings WHERE ts < ? LIMIT ?)', (cutoff, PRUNE_BATCH_ROWS)
+                    ).rowcount
+                self.pruned += deleted
+                if deleted < PRUNE_BATCH_ROWS:
+                    break
+        if self.rollup_retention_days:
+            # Whole hours only, so a remaining hour's count stays complete
+            cutoff_hour = (now - self.rollup_retention_days * DAY) // HOUR * HOUR
+            with conn:
+                self.pruned_hours += conn.execute('DELETE FROM hourly_rollup WHERE hour_ts < ?',
+                                                  (cutoff_hour,)).rowcount
+
+    def has_data(self):
+        """Whether any reading has been stored."""
+        return self._reader().execute('SELECT 1 FROM readings LIMIT 1').fetchone() is not None
+
+    def query(self, start, end, sensor_id=None, location=None, max_points=500):
+        """
+        Range query aggregated into at most ``max_points`` time buckets.
+
+        Ranges up to 48 hours are aggregated from raw readings through the
+        ``(sensor_id, ts)`` / ``ts`` indexes; longer ranges are aggregated
+        from the hourly rollup, so the rows scanned grow with the number of
+        hours and sensors rather than with the number of readings.
+
+        Returns:
+            list: Points ordered by time, each with the bucket start
+            ``timestamp``, averaged series values, ``risk_category``,
+            ``max_risk_probability`` and ``samples``
+        """
+        max_points = max(1, int(max_points))
+        span = max(end - start, 1.0)
+        bucket = span / max_points
+
+        filters, params = self._filters(sensor_id, location)
+
+        if span <= RAW_QUERY_MAX_SECONDS and bucket < HOUR:
+            where = ' AND '.join(['ts >= ?', 'ts < ?'] + filters)
+            averages = ', '.join(f'AVG({c})' for c in SERIES_COLUMNS)
+            sql = f"""SELECT CAST((ts - ?) / ? AS INTEGER) AS b, COUNT(*), MAX(risk_probability), {averages}
+                      FROM readings WHERE {where} GROUP BY b ORDER BY b"""
+            rows = self._reader().execute(sql, [start, bucket, start, end] + params).fetchall()
+        else:
+            bucket = max(HOUR, math.ceil(bucket / HOUR) * HOUR)
+            where = ' AND '.join(['hour_ts >= ?', 'hour_ts < ?'] + filters)
+            averages = ', '.join(f'SUM(sum_{c}) / SUM(n)' for c in SERIES_COLUMNS)
+            sql = f"""SELECT CAST((hour_ts - ?) / ? AS INTEGER) AS b, SUM(n), MAX(max_risk), {averages}
+                      FROM hourly_rollup WHERE {where} GROUP BY b ORDER BY b"""
+            hour_start = math.floor(start / HOUR) * HOUR
+            rows = self._reader().execute(sql, [hour_start, bucket, hour_start, end] + params).fetchall()
+            start = hour_start
+
+        return [self._point(start + b * bucket, samples, max_risk, series)
+                for b, samples, max_risk, *series in rows]
+
+    def hourly_counts(self, start_hour, end_hour, sensor_id=None, location=None):
+        """
+        Number of stored readings per hour in ``[start_hour, end_hour)``.
+
+        Readings are only ever added to an hour (pruning removes whole
+        hours), so an hour's count changes exactly when readings are added
+        to it; callers use it as a cheap version vector.
+        """
+        filters, params = self._filters(sensor_id, location)
+        where = ' AND '.join(['hour_ts >= ?', 'hour_ts < ?'] + filters)
+        sql = f'SELECT hour_ts, SUM(n) FROM hourly_rollup WHERE {where} GROUP BY hour_ts'
+        return dict(self._reader().execute(sql, [start_hour, end_hour] + params).fetchall())
+
+    def hourly_points(self, hours, sensor_id=None, location=None):
+        """
+        One aggregated point per requested hour (hours without data are omitted).
+
+        The hours are read as one range (a fixed number of bound parameters
+        however many are requested) and the ones not asked for are skipped.
+        """
+        if not hours:
+            return {}
+        wanted = set(hours)
+        filters, params = self._filters(sensor_id, location)
+        where = ' AND '.join(['hour_ts BETWEEN ? AND ?'] + filters)
+        averages = ', '.join(f'SUM(sum_{c}) / SUM(n)' for c in SERIES_COLUMNS)
+        sql = f"""SELECT hour_ts, SUM(n), MAX(max_risk), {averages}
+                  FROM hourly_rollup WHERE {where} GROUP BY hour_ts"""
+        rows = self._reader().execute(sql, [min(wanted), max(wanted)] + params).fetchall()
+        return {hour: self._point(hour, samples, max_risk, series)
+                for hour, samples, max_risk, *series in rows if hour in wanted}
+
+    @staticmethod
+    def _filters(sensor_id, location):
+        filters, params = [], []
+        if sensor_id:
+            filters.append('sensor_id = ?')
+            params.append(sensor_id)
+        if location:
+            filters.append('location = ?')
+            params.append(location)
+        return filters, params
+
+    @staticmethod
+    def _point(bucket_start, samples, max_risk, series):
+        values = dict(zip(SERIES_COLUMNS, series))
+        risk = values['risk_probability'] or 0.0
+        return {
+            'timestamp': datetime.fromtimestamp(bucket_start).isoformat(),
+            'risk_probability': round(risk, 1),
+            'risk_category': category_for_probability(risk),
+            'max_risk_probability': round(max_risk or 0.0, 1),
+            'slope_angle': round(values['slope_angle'] or 0.0, 1),
+            'rainfall_24h': round(values['rainfall_24h'] or 0.0, 1),
+            'vibration_intensity': round(values['vibration_intensity'] or 0.0, 2),
+            'samples': samples
+        }
+
+    def stats(self):
+        """Writer counters."""
+        return {
+            'path': self.path,
+            'appended': self.appended,
+            'written': self.written,
+            'duplicates': self.duplicates,
+            'dropped': self.dropped,
+            'pruned': self.pruned,
+            'pruned_hours': self.pruned_hours,
+            'queued': self._queue.qsize() if self._queue is not None and self._pid == os.getpid() else 0
+        }
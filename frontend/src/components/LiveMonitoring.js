@@ -19,6 +19,11 @@ import {
 } from 'chart.js';
 import { rockfallAPI, formatRiskLevel } from '../services/api';
 
+// Live stream reconnects: exponential backoff from 1s up to 30s, then polling
+const STREAM_RETRY_BASE_MS = 1000;
+const STREAM_RETRY_MAX_MS = 30000;
+const STREAM_MAX_RETRIES = 6;
+
 // Register Chart.js components
 ChartJS.register(
   CategoryScale,
@@ -40,27 +45,33 @@ const LiveMonitoring = () => {
   const [lastUpdate, setLastUpdate] = useState(new Date());
   const intervalRef = useRef(null);
 
+  // Update state with a live data point
+  const handleLiveData = (data) => {
+    setCurrentData(data);
+    setLastUpdate(new Date());
+
+    // Add to historical data (keep last 20 points)
+    setHistoricalData(prev => {
+      const newData = [...prev, {
+        timestamp: new Date().toLocaleTimeString(),
+        risk: data.prediction.risk_probability,
+        category: data.prediction.risk_category,
+        vibration: data.sensor_data.vibration_intensity,
+        rainfall: data.sensor_data.rainfall_24h,
+        slope: data.sensor_data.slope_angle,
+      }];
+      return newData.slice(-20);
+    });
+
+    setError(null);
+    setLoading(false);
+  };
+
   // Fetch live data from API
   const fetchLiveData = async () => {
     try {
       const data = await rockfallAPI.getMockData();
-      setCurrentData(data);
-      setLastUpdate(new Date());
-
-      // Add to historical data (keep last 20 points)
-      setHistoricalData(prev => {
-        const newData = [...prev, {
-          timestamp: new Date().toLocaleTimeString(),
-          risk: data.prediction.risk_probability,
-          category: data.prediction.risk_category,
-          vibration: data.sensor_data.vibration_intensity,
-          rainfall: data.sensor_data.rainfall_24h,
-          slope: data.sensor_data.slope_angle,
-        }];
-        return newData.slice(-20);
-      });
-
-      setError(null);
+      handleLiveData(data);
     } catch (err) {
       console.error('Failed to fetch live data:', err);
       setError(err.message);
@@ -69,16 +80,58 @@ const LiveMonitoring = () => {
     }
   };
 
+  // Fall back to polling (every 3 seconds) if streaming is unavailable
+  const startPolling = () => {
+    if (!intervalRef.current) {
+      fetchLiveData();
+      intervalRef.current = setInterval(fetchLiveData, 3000);
+    }
+  };
+
   useEffect(() => {
-    // Initial fetch
-    fetchLiveData();
+    let closeStream = null;
+    let retryTimer = null;
+    let retries = 0;
 
-    // Set up polling interval (every 3 seconds)
-    intervalRef.current = setInterval(fetchLiveData, 3000);
+    // Server pushes a new reading every few seconds
+    const connect = () => {
+      closeStream = rockfallAPI.subscribeLiveData((data) => {
+        retries = 0;
+        handleLiveData(data);
+      }, () => {
+        // EventSource gives up for good on an error response (e.g. 503 when
+        // the server is at its stream limit), so reconnect with jittered
+        // backoff and only fall back to polling once the retries run out
+        if (closeStream) {
+          closeStream();
+          closeStream = null;
+        }
+        if (retries >= STREAM_MAX_RETRIES) {
+          startPolling();
+          return;
+        }
+        const delay = Math.min(STREAM_RETRY_BASE_MS * 2 ** retries, STREAM_RETRY_MAX_MS);
+        retries += 1;
+        retryTimer = setTimeout(connect, delay * (0.5 + Math.random() / 2));
+      });
+    };
+
+    if (typeof window !== 'undefined' && window.EventSource) {
+      connect();
+    } else {
+      startPolling();
+    }
 
     return () => {
+      if (closeStream) {
+        closeStream();
+      }
+      if (retryTimer) {
+        clearTimeout(retryTimer);
+      }
       if (intervalRef.current) {
         clearInterval(intervalRef.current);
+        intervalRef.current = null;
       }
     };
   }, []);
@@ -66,6 +66,25 @@ export const rockfallAPI = {
     }
   },
 
+  // Subscribe to the live sensor stream (Server-Sent Events).
+  // Returns a function that closes the stream.
+  subscribeLiveData: (onData, onError) => {
+    const source = new EventSource(`${API_BASE_URL}/stream/live`);
+    source.onmessage = (event) => {
+      try {
+        onData(JSON.parse(event.data));
+      } catch (error) {
+        console.error('Invalid live stream event:', error);
+      }
+    };
+    source.onerror = (event) => {
+      if (onError) {
+        onError(event);
+      }
+    };
+    return () => source.close();
+  },
+
   // Get historical data for charts
   getHistoricalData: async () => {
     try {
@@ -0,0 +1,396 @@
+"""
+Bulk Backfill Scorer
+Re-scores large archived sensor logs (CSV, NDJSON or Parquet) with a trained
+model: the input is streamed in fixed-size chunks, scored by a pool of
+worker processes and written in input order as columnar part files, with a
+manifest that lets an interrupted run resume where it stopped
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from train_model import replace_atomically
+
+# Optional: Parquet input and output
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:
+    pyarrow = pq = None
+
+DEFAULT_CHUNK_ROWS = 100_000
+MANIFEST = '_backfill.json'
+# Input columns copied to the output when present, to join results back
+KEY_COLUMNS = ['sensor_id', 'timestamp', 'location']
+READ_BLOCK = 1 << 20
+
+
+def artifact_kwargs(model_dir, tier='full'):
+    """
+    RockfallPredictor arguments for the artifacts in ``model_dir`` (.forest preferred).
+
+    For ``tier='fast'`` the distilled model written next to the full one
+    (``rockfall_model_fast``, same format) is added.
+
+    Raises:
+        ValueError: If ``tier`` is 'fast' and ``model_dir`` has no fast-tier model
+    """
+    forest = os.path.join(model_dir, 'rockfall_model.forest')
+    if os.path.exists(forest):
+        kwargs = {'model_path': forest}
+    else:
+        kwargs = {'model_path': os.path.join(model_dir, 'rockfall_model.pkl'),
+                  'scaler_path': os.path.join(model_dir, 'feature_scaler.pkl'),
+                  'info_path': os.path.join(model_dir, 'model_info.json')}
+    if tier == 'fast':
+        fast_model = '_fast'.join(os.path.splitext(kwargs['model_path']))
+        if not os.path.exists(fast_model):
+            raise ValueError(f"No fast-tier model in {model_dir} (expected {os.path.basename(fast_model)}); "
+                             "train one with train_model.py or use --tier full")
+        kwargs['fast_model_path'] = fast_model
+    return kwargs
+
+
+def fingerprint(paths):
+    """Identifier that changes whenever any of ``paths`` changes."""
+    digest = hashlib.sha1()
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:12]
+
+
+def input_format(path):
+    """'csv', 'ndjson' or 'parquet' from the file extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.csv', '.txt'):
+        return 'csv'
+    if ext in ('.ndjson', '.jsonl', '.json'):
+        return 'ndjson'
+    if ext in ('.parquet', '.pq'):
+        return 'parquet'
+    raise ValueError(f"Unsupported input file type: {path} (expected .csv, .ndjson/.jsonl or .parquet)")
+
+
+# -- reading ---------------------------------------------------------------
+
+def iter_chunks(path, fmt, chunk_rows, offset=0, skip_rows=0):
+    """
+    Yield ``(chunk, rows, end_offset)`` for consecutive chunks of the input.
+
+    Text formats are cut on line boundaries without parsing (parsing happens
+    in the workers), starting at byte ``offset``; ``end_offset`` is where
+    the next chunk starts, so a run resumes by seeking. A chunk is
+    ``('csv', header, data)``, ``('ndjson', data)`` or ``('frame', df)``.
+    Parquet is read batch by batch and resumes by skipping ``skip_rows``.
+    Only one chunk (plus a read block) is held at a time.
+    """
+    if fmt == 'parquet':
+        if pq is None:
+            raise RuntimeError("Reading Parquet needs pyarrow (pip install pyarrow)")
+        position = 0
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            start = max(skip_rows - position, 0)
+            position += batch.num_rows
+            if start >= batch.num_rows:
+                continue
+            frame = batch.slice(start).to_pandas()
+            yield ('frame', frame), len(frame), None
+        return
+
+    with open(path, 'rb') as f:
+        header = f.readline() if fmt == 'csv' else b''
+        if offset:
+            f.seek(offset)
+        position = f.tell()
+        lines = []
+        for line in f:
+            position += len(line)
+            if not line.strip():
+                continue
+            lines.append(line)
+            if len(lines) == chunk_rows:
+                yield _text_chunk(fmt, header, lines), len(lines), position
+                lines = []
+        if lines:
+            yield _text_chunk(fmt, header, lines), len(lines), position
+
+
+def _text_chunk(fmt, header, lines):
+    data = b''.join(lines)
+    return ('csv', header, data) if fmt == 'csv' else ('ndjson', data)
+
+
+def parse_chunk(chunk):
+    """DataFrame from a chunk produced by :func:`iter_chunks`."""
+    kind = chunk[0]
+    if kind == 'csv':
+        return pd.read_csv(io.BytesIO(chunk[1] + chunk[2]))
+    if kind == 'ndjson':
+        return pd.DataFrame([json.loads(line) for line in chunk[1].splitlines() if line.strip()])
+    return chunk[1]
+
+
+# -- scoring (runs in the worker processes) ---------------------------------
+
+_predictor = None
+
+
+def _init_worker(kwargs):
+    global _predictor
+    import contextlib
+    from predictor import RockfallPredictor
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        _predictor = RockfallPredictor(**kwargs, mmap_mode='r')
+
+
+def score_frame(predictor, frame, tier='full'):
+    """
+    Score every row of ``frame`` with one batch call.
+
+    Rows with a missing or non-numeric feature are not scored: their
+    category is empty and their probabilities NaN.
+
+    Returns:
+        dict: Output column name -> NumPy array
+    """
+    n_rows = len(frame)
+    X = np.full((n_rows, len(predictor.feature_columns)), np.nan)
+    for j, feature in enumerate(predictor.feature_columns):
+        if feature in frame:
+            X[:, j] = pd.to_numeric(frame[feature], errors='coerce').to_numpy(dtype=np.float64)
+    valid = np.isfinite(X).all(axis=1)
+
+    n_classes = len(predictor.classes_)
+    probabilities = np.full((n_rows, n_classes), np.nan)
+    if valid.any():
+        probabilities[valid] = predictor.predict_proba_matrix(X[valid], tier)
+
+    columns = {name: frame[name].to_numpy() for name in KEY_COLUMNS if name in frame}
+    category = np.full(n_rows, '', dtype=object)
+    risk = np.full(n_rows, np.nan)
+    confidence = np.full(n_rows, np.nan)
+    if valid.any():
+        winners, max_probs, risk_scores = predictor.risk_scores(probabilities[valid])
+        category[valid] = np.asarray(predictor.classes_, dtype=object)[winners]
+        risk[valid] = np.round(risk_scores, 1)
+        confidence[valid] = np.round(max_probs * 100, 1)
+    columns['risk_category'] = category.astype(str)
+    columns['risk_probability'] = risk
+    columns['confidence'] = confidence
+    class_index = {c: i for i, c in enumerate(predictor.classes_)}
+    for name in predictor.risk_categories:
+        if name in class_index:
+            columns[f'prob_{name.lower()}'] = np.round(probabilities[:, class_index[name]] * 100, 1)
+    columns['scored'] = valid
+    return columns
+
+
+def _score_chunk(index, first_row, chunk, tier):
+    start = time.perf_counter()
+    frame = parse_chunk(chunk)
+    columns = score_frame(_predictor, frame, tier)
+    columns = {'row': np.arange(first_row, first_row + len(frame), dtype=np.int64), **columns}
+    return index, columns, time.perf_counter() - start
+
+
+# -- writing ---------------------------------------------------------------
+
+def write_part(output_dir, index, columns, fmt):
+    """Write one chunk's results as a columnar part file, atomically."""
+    path = os.path.join(output_dir, f'part-{index:05d}.{fmt}')
+    with replace_atomically(path) as tmp_path:
+        if fmt == 'parquet':
+            table = pyarrow.table({name: values.astype(str) if values.dtype == object else values
+                                   for name, values in columns.items()})
+            pq.write_table(table, tmp_path)
+        else:
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, **{name: values.astype(str) if values.dtype == object else values
+                               for name, values in columns.items()})
+    return os.path.basename(path)
+
+
+def read_output(output_dir):
+    """Load a finished (or partial) backfill output as one DataFrame, in input order."""
+    with open(os.path.join(output_dir, MANIFEST), 'r') as f:
+        manifest = json.load(f)
+    frames = []
+    for part in manifest['parts']:
+        path = os.path.join(output_dir, part['file'])
+        if path.endswith('.parquet'):
+            frames.append(pd.read_parquet(path))
+        else:
+            with np.load(path, allow_pickle=False) as data:
+                frames.append(pd.DataFrame({name: data[name] for name in data.files}))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def _save_manifest(output_dir, manifest):
+    with replace_atomically(os.path.join(output_dir, MANIFEST)) as tmp_path:
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+
+# -- driver ----------------------------------------------------------------
+
+def run_backfill(input_path, output_dir, model_dir='.', chunk_rows=DEFAULT_CHUNK_ROWS, workers=None,
+                 output_format=None, tier='full', restart=False, log=print):
+    """
+    Score ``input_path`` into ``output_dir`` and return a throughput summary.
+
+    Chunks are submitted to ``workers`` processes (0 scores in this
+    process), with at most two per worker in flight so memory stays bounded
+    whatever the input size. Results are written in input order as
+    ``part-NNNNN`` files; after each part the manifest records it together
+    with the input position after it, so a rerun with the same input,
+    model and chunk size continues after the last written part.
+
+    Raises:
+        ValueError: If ``output_dir`` holds a run for another input, model or chunk size
+            (pass ``restart=True`` to discard it), or ``tier`` is 'fast' and
+            ``model_dir`` has no fast-tier model
+    """
+    fmt = input_format(input_path)
+    output_format = output_format or ('parquet' if pq is not None else 'npz')
+    if output_format == 'parquet' and pq is None:
+        raise RuntimeError("Writing Parquet needs pyarrow (pip install pyarrow); use --output-format npz")
+    workers = os.cpu_count() if workers is None else workers
+    kwargs = artifact_kwargs(model_dir, tier)
+
+    identity = {
+        'input': os.path.abspath(input_path),
+        'input_fingerprint': fingerprint([input_path]),
+        'model_fingerprint': fingerprint(kwargs.values()),
+        'chunk_rows': chunk_rows,
+        'tier': tier,
+        'output_format': output_format
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST)
+    manifest = None
+    if os.path.exists(manifest_path) and not restart:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        mismatched = [key for key, value in identity.items() if manifest.get(key) != value]
+        if mismatched:
+            raise ValueError(f"{output_dir} holds a backfill with a different {', '.join(mismatched)}; "
+                             "use --restart to discard it")
+    if manifest is None:
+        for name in os.listdir(output_dir):
+            if name.startswith('part-') or name == MANIFEST:
+                os.remove(os.path.join(output_dir, name))
+        manifest = {**identity, 'parts': [], 'rows': 0, 'offset': 0, 'complete': False}
+        _save_manifest(output_dir, manifest)
+
+    if manifest['complete']:
+        log(f"✅ {output_dir} is already complete ({manifest['rows']:,} rows)")
+        return {'rows': 0, 'resumed_rows': manifest['rows'], 'seconds': 0.0, 'workers': workers}
+
+    resumed_rows = manifest['rows']
+    if resumed_rows:
+        log(f"🔄 Resuming after {len(manifest['parts'])} part(s), {resumed_rows:,} rows")
+
+    chunks = iter_chunks(input_path, fmt, chunk_rows, offset=manifest['offset'], skip_rows=manifest['rows'])
+    start = time.perf_counter()
+    busy_seconds = 0.0
+    scored_rows = invalid_rows = 0
+
+    def finish(columns, end_offset):
+        nonlocal scored_rows, invalid_rows
+        index = len(manifest['parts'])
+        rows = len(columns['row'])
+        name = write_part(output_dir, index, columns, output_format)
+        manifest['parts'].append({'file': name, 'rows': rows})
+        manifest['rows'] += rows
+        if end_offset is not None:
+            manifest['offset'] = end_offset
+        _save_manifest(output_dir, manifest)
+        scored_rows += rows
+        invalid_rows += int(rows - columns['scored'].sum())
+        elapsed = time.perf_counter() - start
+        log(f"   part {index:05d}: {manifest['rows']:,} rows done ({scored_rows / elapsed:,.0f} rows/s)")
+
+    if workers == 0:
+        _init_worker(kwargs)
+        first_row = manifest['rows']
+        for index, (chunk, rows, end_offset) in enumerate(chunks, start=len(manifest['parts'])):
+            _, columns, seconds = _score_chunk(index, first_row, chunk, tier)
+            busy_seconds += seconds
+            first_row += rows
+            finish(columns, end_offset)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(kwargs,)) as pool:
+            pending = []  # (future, end_offset) in input order
+            first_row = manifest['rows']
+            index = len(manifest['parts'])
+            for chunk, rows, end_offset in chunks:
+                pending.append((pool.submit(_score_chunk, index, first_row, chunk, tier), end_offset))
+                index += 1
+                first_row += rows
+                # Write finished chunks in order; block once 2 per worker are queued
+                while pending and (pending[0][0].done() or len(pending) >= 2 * workers):
+                    future, chunk_end = pending.pop(0)
+                    _, columns, seconds = future.result()
+                    busy_seconds += seconds
+                    finish(columns, chunk_end)
+            for future, chunk_end in pending:
+                _, columns, seconds = future.result()
+                busy_seconds += seconds
+                finish(columns, chunk_end)
+
+    manifest['complete'] = True
+    _save_manifest(output_dir, manifest)
+    seconds = time.perf_counter() - start
+    return {
+        'rows': scored_rows,
+        'invalid_rows': invalid_rows,
+        'resumed_rows': resumed_rows,
+        'parts': len(manifest['parts']),
+        'seconds': seconds,
+        'workers': workers,
+        'rows_per_second': scored_rows / seconds if seconds else 0.0,
+        'rows_per_second_per_core': scored_rows / seconds / max(workers, 1) if seconds else 0.0,
+        'rows_per_busy_second': scored_rows / busy_seconds if busy_seconds else 0.0
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Re-score an archived sensor log with the trained model')
+    parser.add_argument('input', help='CSV, NDJSON (.ndjson/.jsonl) or Parquet file of readings')
+    parser.add_argument('output_dir', help='Directory for the columnar part files and manifest')
+    parser.add_argument('--model-dir', default='.', help='Directory holding the trained artifacts')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS,
+                        help='Rows per chunk (bounds memory per worker)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Scoring processes (default: all cores, 0 = score in this process)')
+    parser.add_argument('--output-format', choices=['parquet', 'npz'],
+                        help='Part file format (default parquet when pyarrow is installed, else npz)')
+    parser.add_argument('--tier', default='full', choices=['full', 'fast'])
+    parser.add_argument('--restart', action='store_true', help='Discard any previous run in output_dir')
+    args = parser.parse_args()
+
+    print("🗂️ Rockfall Backfill Scorer")
+    print("=" * 50)
+
+    summary = run_backfill(args.input, args.output_dir, model_dir=args.model_dir, chunk_rows=args.chunk_rows,
+                           workers=args.workers, output_format=args.output_format, tier=args.tier,
+                           restart=args.restart)
+
+    if summary['rows']:
+        print(f"\n✅ Scored {summary['rows']:,} rows into {summary['parts']} part(s) "
+              f"in {summary['seconds']:.1f}s with {summary['workers']} worker(s)")
+        if summary['invalid_rows']:
+            print(f"⚠️ {summary['invalid_rows']:,} rows had missing or non-numeric features and were not scored")
+        print(f"   Throughput: {summary['rows_per_second']:,.0f} rows/s, "
+              f"{summary['rows_per_second_per_core']:,.0f} rows/s per core "
+              f"({summary['rows_per_busy_second']:,.0f} rows/s per busy worker second)")
@@ -0,0 +1,112 @@
+"""
+Inference Benchmark
+Compares the sklearn prediction path with the compiled flat-array engine
+for single readings and batches, and checks that both agree bit for bit
+"""
+
+import argparse
+import json
+import time
+
+import joblib
+import numpy as np
+
+from compiled_forest import CompiledForest
+
+
+def time_call(func, repeat):
+    """Return per-call latencies in seconds."""
+    func()  # warm up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return np.array(timings)
+
+
+def make_inputs(sample_path, feature_columns, n_rows, seed=0):
+    """Build a raw feature matrix by jittering the stored sample readings."""
+    with open(sample_path, 'r') as f:
+        samples = json.load(f)
+    base = np.array([[s[c] for c in feature_columns] for s in samples], dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    rows = base[rng.integers(0, len(base), n_rows)]
+    return rows * rng.uniform(0.9, 1.1, rows.shape)
+
+
+def run_benchmark(model_path='rockfall_model.pkl', scaler_path='feature_scaler.pkl',
+                  info_path='model_info.json', sample_path='sample_data.json',
+                  batch_sizes=(1, 100, 10000), repeat=50):
+    """Benchmark both inference paths and return a result dictionary."""
+    model = joblib.load(model_path)
+    scaler = joblib.load(scaler_path)
+    with open(info_path, 'r') as f:
+        feature_columns = json.load(f)['feature_columns']
+
+    start = time.perf_counter()
+    engine = CompiledForest.from_sklearn(model, scaler, feature_columns)
+    compile_time = time.perf_counter() - start
+
+    def sklearn_path(X):
+        return model.predict_proba(scaler.transform(X))
+
+    # The scaler may have been fitted with feature names
+    if hasattr(scaler, 'feature_names_in_'):
+        import pandas as pd
+
+        def sklearn_path(X):
+            return model.predict_proba(scaler.transform(pd.DataFrame(X, columns=feature_columns)))
+
+    results = {
+        'n_trees': engine.n_trees,
+        'n_nodes': engine.n_nodes,
+        'max_depth': engine.max_depth,
+        'compile_seconds': compile_time,
+        'batches': []
+    }
+
+    for batch_size in batch_sizes:
+        X = make_inputs(sample_path, feature_columns, batch_size)
+        identical = bool(np.array_equal(sklearn_path(X), engine.predict_proba(X)))
+        n_repeat = max(3, repeat if batch_size < 1000 else repeat // 10)
+
+        sk = time_call(lambda: sklearn_path(X), n_repeat)
+        cf = time_call(lambda: engine.predict_proba(X), n_repeat)
+
+        results['batches'].append({
+            'batch_size': batch_size,
+            'bit_identical': identical,
+            'sklearn_ms': float(np.median(sk) * 1000),
+            'compiled_ms': float(np.median(cf) * 1000),
+            'sklearn_rows_per_sec': batch_size / float(np.median(sk)),
+            'compiled_rows_per_sec': batch_size / float(np.median(cf)),
+            'speedup': float(np.median(sk) / np.median(cf))
+        })
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark sklearn vs compiled forest inference')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 100, 10000])
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--output', help='Optional path for a JSON copy of the results')
+    args = parser.parse_args()
+
+    print("⏱️ Benchmarking Rockfall Inference")
+    print("=" * 50)
+
+    results = run_benchmark(batch_sizes=args.batch_sizes, repeat=args.repeat)
+
+    print(f"🌲 {results['n_trees']} trees, {results['n_nodes']} nodes, "
+          f"max depth {results['max_depth']} (compiled in {results['compile_seconds']:.2f}s)")
+    print(f"\n{'batch':>8} {'sklearn ms':>12} {'compiled ms':>12} {'speedup':>9}  identical")
+    for row in results['batches']:
+        print(f"{row['batch_size']:>8} {row['sklearn_ms']:>12.3f} {row['compiled_ms']:>12.3f} "
+              f"{row['speedup']:>8.1f}x  {'✅' if row['bit_identical'] else '❌'}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results saved to {args.output}")
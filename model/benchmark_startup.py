@@ -0,0 +1,121 @@
+"""
+Startup Benchmark
+Measures time-to-first-prediction in fresh interpreter processes for the
+pickled sklearn artifacts and for the compiled .forest artifact
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Loading strategies compared: (name, RockfallPredictor arguments)
+STRATEGIES = [
+    ('pickle + compile', {'model_path': 'rockfall_model.pkl', 'use_compiled': True, 'mmap_mode': 'r'}),
+    ('pickle (sklearn)', {'model_path': 'rockfall_model.pkl', 'use_compiled': False, 'mmap_mode': 'r'}),
+    ('forest artifact', {'model_path': 'rockfall_model.forest', 'mmap_mode': 'r'}),
+]
+
+# Runs in the child process; prints one JSON line of timings
+_CHILD = """
+import contextlib, io, json, os, resource, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {model_dir!r})
+from predictor import RockfallPredictor
+imported = time.perf_counter()
+os.chdir({artifact_dir!r})
+with contextlib.redirect_stdout(io.StringIO()):
+    predictor = RockfallPredictor(**{kwargs!r})
+loaded = time.perf_counter()
+with open('sample_data.json') as f:
+    reading = json.load(f)[0]
+predictor.predict(reading)
+done = time.perf_counter()
+print(json.dumps({{
+    'import_seconds': imported - start,
+    'load_seconds': loaded - imported,
+    'first_prediction_seconds': done - loaded,
+    'in_process_seconds': done - start,
+    'sklearn_imported': 'sklearn' in sys.modules,
+    'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+}}))
+"""
+
+
+def time_startup(artifact_dir, kwargs):
+    """Run one cold start in a new interpreter and return its timings."""
+    script = _CHILD.format(model_dir=MODEL_DIR, artifact_dir=os.path.abspath(artifact_dir), kwargs=kwargs)
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+    wall = time.perf_counter() - start
+    return {**json.loads(output.strip().splitlines()[-1]), 'wall_seconds': wall}
+
+
+def run_benchmark(artifact_dir='.', repeat=7):
+    """
+    Time every available loading strategy and return a result dictionary.
+
+    Runs are interleaved so that page cache and CPU frequency effects hit
+    all strategies alike; the first round only warms the page cache and is
+    discarded. Each figure is the median over ``repeat`` runs.
+    """
+    strategies = [(name, kwargs) for name, kwargs in STRATEGIES
+                  if os.path.exists(os.path.join(artifact_dir, kwargs['model_path']))]
+    if not strategies:
+        raise FileNotFoundError(f"No model artifacts in {artifact_dir}; run train_model.py first")
+
+    runs = {name: [] for name, _ in strategies}
+    for round_ in range(repeat + 1):
+        for name, kwargs in strategies:
+            timings = time_startup(artifact_dir, kwargs)
+            if round_ > 0:
+                runs[name].append(timings)
+
+    results = {'repeat': repeat, 'strategies': []}
+    for name, kwargs in strategies:
+        row = {'strategy': name,
+               'artifact': kwargs['model_path'],
+               'artifact_kb': os.path.getsize(os.path.join(artifact_dir, kwargs['model_path'])) / 1024,
+               'sklearn_imported': runs[name][0]['sklearn_imported']}
+        for key in ('wall_seconds', 'in_process_seconds', 'import_seconds', 'load_seconds',
+                    'first_prediction_seconds', 'peak_rss_mb'):
+            row[key] = float(np.median([run[key] for run in runs[name]]))
+        results['strategies'].append(row)
+
+    baseline = results['strategies'][0]['wall_seconds']
+    for row in results['strategies']:
+        row['speedup'] = baseline / row['wall_seconds']
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark cold-start time to first prediction')
+    parser.add_argument('--artifact-dir', default='.', help='Directory holding the trained artifacts')
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--output', help='Optional path for a JSON copy of the results')
+    args = parser.parse_args()
+
+    print("🚀 Benchmarking Rockfall Model Startup")
+    print("=" * 50)
+
+    results = run_benchmark(args.artifact_dir, args.repeat)
+
+    print(f"Median of {results['repeat']} fresh processes (all times in ms)\n")
+    print(f"{'strategy':<18} {'wall':>8} {'import':>8} {'load':>8} {'first':>7} {'RSS MB':>7} "
+          f"{'size KB':>8} {'speedup':>8}  sklearn")
+    for row in results['strategies']:
+        print(f"{row['strategy']:<18} {row['wall_seconds'] * 1000:>8.1f} {row['import_seconds'] * 1000:>8.1f} "
+              f"{row['load_seconds'] * 1000:>8.1f} {row['first_prediction_seconds'] * 1000:>7.2f} "
+              f"{row['peak_rss_mb']:>7.0f} {row['artifact_kb']:>8.0f} {row['speedup']:>7.1f}x  "
+              f"{'yes' if row['sklearn_imported'] else 'no'}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results saved to {args.output}")
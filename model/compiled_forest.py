@@ -0,0 +1,283 @@
+"""
+Compiled Random Forest Inference Engine
+Flattens a trained RandomForestClassifier and its StandardScaler into
+contiguous NumPy node arrays and evaluates raw feature vectors with them
+"""
+
+import numpy as np
+
+TREE_LEAF = -1
+SMALL_BATCH = 24     # rows evaluated with the simple traversal
+BLOCK_ROWS = 512     # rows per cache-sized block for larger batches
+_INT64_MIN = np.int64(np.iinfo(np.int64).min)
+
+
+def _float_to_key(x):
+    """Map float64 values to int64 keys with the same ordering."""
+    bits = np.asarray(x, dtype=np.float64).view(np.int64)
+    return np.where(bits >= 0, bits, _INT64_MIN - bits)
+
+
+def _key_to_float(key):
+    """Inverse of :func:`_float_to_key`."""
+    bits = np.where(key >= 0, key, _INT64_MIN - key)
+    return bits.astype(np.int64).view(np.float64)
+
+
+def fold_scaler_thresholds(thresholds, mean, scale):
+    """
+    Fold StandardScaler parameters into split thresholds.
+
+    sklearn decides a split with ``float32((x - mean) / scale) <= threshold``.
+    That test is monotonic in the raw value ``x``, so it is equivalent to
+    ``x <= T`` where ``T`` is the largest float64 for which it still holds.
+    ``T`` is found by bisection over the ordered bit patterns of float64,
+    which makes the folded comparison exact rather than approximately equal.
+
+    Args:
+        thresholds (np.ndarray): Thresholds in scaled feature space
+        mean (np.ndarray): Scaler mean for each threshold's feature
+        scale (np.ndarray): Scaler scale for each threshold's feature
+
+    Returns:
+        np.ndarray: Equivalent thresholds in raw feature space
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    mean = np.asarray(mean, dtype=np.float64)
+    scale = np.asarray(scale, dtype=np.float64)
+
+    def holds(x):
+        with np.errstate(over='ignore', invalid='ignore'):
+            scaled = ((x - mean) / scale).astype(np.float32).astype(np.float64)
+        return scaled <= thresholds
+
+    lo = np.full(thresholds.shape, _float_to_key(-np.inf), dtype=np.int64)
+    hi = np.full(thresholds.shape, _float_to_key(np.inf), dtype=np.int64)
+    for _ in range(66):
+        # Overflow-safe floor((lo + hi) / 2)
+        mid = (lo >> 1) + (hi >> 1) + (lo & hi & 1)
+        ok = holds(_key_to_float(mid))
+        lo = np.where(ok, mid, lo)
+        hi = np.where(ok, hi, mid)
+
+    folded = _key_to_float(lo)
+    return np.where(holds(np.full(thresholds.shape, np.inf)), np.inf, folded)
+
+
+def _tree_values_are_counts():
+    """
+    Whether fitted trees store class counts (sklearn < 1.4).
+
+    Newer releases store class fractions in ``tree_.value`` and return them
+    from ``predict_proba`` as-is; older ones store weighted counts and
+    normalize at prediction time.
+    """
+    import sklearn
+
+    major, minor = (int(part) for part in sklearn.__version__.split('.')[:2])
+    return (major, minor) < (1, 4)
+
+
+class CompiledForest:
+    """
+    Flat-array evaluator for a fitted RandomForestClassifier.
+
+    All trees share one set of node arrays. Leaves point to themselves, so
+    every row can be advanced ``max_depth`` times without branching, and the
+    per-tree class distributions are accumulated in estimator order to give
+    the same floating point result as ``RandomForestClassifier.predict_proba``.
+    """
+
+    def __init__(self, feature, threshold, children, value, roots, classes,
+                 feature_columns, max_depth, scaler_mean=None, scaler_scale=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.classes_ = np.asarray(classes)
+        self.feature_columns = list(feature_columns)
+        self.max_depth = int(max_depth)
+        self.n_features = len(self.feature_columns)
+        self.n_trees = len(roots)
+        # Kept for reference only; thresholds already have the scaler folded in
+        self.scaler_mean = scaler_mean
+        self.scaler_scale = scaler_scale
+
+    @classmethod
+    def from_sklearn(cls, model, scaler, feature_columns):
+        """
+        Compile a fitted forest and the scaler it was trained behind.
+
+        Args:
+            model: Fitted RandomForestClassifier (single output)
+            scaler: Fitted StandardScaler, or None if the model takes raw features
+            feature_columns (list): Feature order used for training
+
+        Returns:
+            CompiledForest: Engine that evaluates raw feature vectors
+        """
+        n_features = len(feature_columns)
+        if scaler is not None:
+            mean = np.asarray(scaler.mean_, dtype=np.float64)
+            scale = np.asarray(scaler.scale_, dtype=np.float64)
+        else:
+            mean = np.zeros(n_features)
+            scale = np.ones(n_features)
+
+        normalize_values = _tree_values_are_counts()
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            is_leaf = tree.children_left == TREE_LEAF
+            node_ids = np.arange(n_nodes)
+
+            feature = np.where(is_leaf, 0, tree.feature).astype(np.int32)
+            threshold = np.where(
+                is_leaf, np.inf,
+                fold_scaler_thresholds(tree.threshold, mean[feature], scale[feature])
+            )
+            left = np.where(is_leaf, node_ids, tree.children_left) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right) + offset
+
+            value = np.array(tree.value[:, 0, :], dtype=np.float64)
+            if normalize_values:
+                # Normalize exactly like DecisionTreeClassifier.predict_proba
+                normalizer = value.sum(axis=1)[:, np.newaxis]
+                normalizer[normalizer == 0.0] = 1.0
+                value /= normalizer
+
+            features.append(feature)
+            thresholds.append(threshold)
+            children.append(np.column_stack([left, right]))
+            values.append(value)
+            roots.append(offset)
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.int32),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            children=np.ascontiguousarray(np.concatenate(children).ravel(), dtype=np.int32),
+            value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            classes=model.classes_,
+            feature_columns=feature_columns,
+            max_depth=max_depth,
+            scaler_mean=mean,
+            scaler_scale=scale
+        )
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @property
+    def nbytes(self):
+        """Memory held by the node arrays."""
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.children,
+                                      self.value, self.roots))
+
+    def apply(self, X):
+        """
+        Return the global leaf index reached in every tree.
+
+        Args:
+            X (np.ndarray): Raw features, shape (n_samples, n_features)
+
+        Returns:
+            np.ndarray: Leaf node indices, shape (n_samples, n_trees)
+        """
+        X = self._check_input(X)
+        if len(X) <= SMALL_BATCH:
+            return self._apply_small(X)
+        return np.concatenate([self._apply_block(X[start:start + BLOCK_ROWS]).T
+                               for start in range(0, len(X), BLOCK_ROWS)])
+
+    def _check_input(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+        if not np.isfinite(X).all():
+            raise ValueError("Input contains NaN or infinity")
+        return X
+
+    def _apply_small(self, X):
+        """Traversal with the fewest NumPy calls, for a handful of rows."""
+        flat = X.ravel()
+        row_offsets = (np.arange(X.shape[0], dtype=np.int32) * self.n_features)[:, np.newaxis]
+        node = np.broadcast_to(self.roots, (X.shape[0], self.n_trees))
+
+        for _ in range(self.max_depth):
+            go_right = flat[row_offsets + self.feature[node]] > self.threshold[node]
+            node = self.children[2 * node + go_right]
+
+        return node
+
+    def _apply_block(self, X):
+        """Traversal into preallocated buffers; returns tree-major leaves (n_trees, n_rows)."""
+        n_rows = X.shape[0]
+        shape = (self.n_trees, n_rows)
+        flat = np.ascontiguousarray(X.T).ravel()
+        feature_offsets = self.feature * np.int32(n_rows)
+        rows = np.broadcast_to(np.arange(n_rows, dtype=np.int32), shape)
+
+        node = np.empty(shape, dtype=np.int32)
+        node[:] = self.roots[:, np.newaxis]
+        next_node = np.empty(shape, dtype=np.int32)
+        index = np.empty(shape, dtype=np.int32)
+        x_value = np.empty(shape, dtype=np.float64)
+        threshold = np.empty(shape, dtype=np.float64)
+        go_right = np.empty(shape, dtype=bool)
+
+        # Indices are always in range, so mode='wrap' only skips bounds checks
+        for _ in range(self.max_depth):
+            np.take(feature_offsets, node, out=index, mode='wrap')
+            index += rows
+            np.take(flat, index, out=x_value, mode='wrap')
+            np.take(self.threshold, node, out=threshold, mode='wrap')
+            np.greater(x_value, threshold, out=go_right)
+            node <<= 1
+            node += go_right
+            np.take(self.children, node, out=next_node, mode='wrap')
+            node, next_node = next_node, node
+
+        return node
+
+    def predict_proba(self, X):
+        """
+        Class probabilities for raw (unscaled) feature vectors.
+
+        Args:
+            X (np.ndarray): Raw features in ``feature_columns`` order
+
+        Returns:
+            np.ndarray: Probabilities, columns in ``classes_`` order
+        """
+        X = self._check_input(X)
+        if len(X) <= SMALL_BATCH:
+            # cumsum adds trees one after another, the same order sklearn uses
+            proba = np.cumsum(self.value[self._apply_small(X)], axis=1)[:, -1, :]
+            proba /= self.n_trees
+            return proba
+        return np.concatenate([self._accumulate(self._apply_block(X[start:start + BLOCK_ROWS]))
+                               for start in range(0, len(X), BLOCK_ROWS)])
+
+    def _accumulate(self, leaves):
+        """Average leaf distributions from tree-major leaf indices (n_trees, n_rows)."""
+        # Trees are added one after another, the same order sklearn uses
+        proba = np.take(self.value, leaves[0], axis=0)
+        for tree_leaves in leaves[1:]:
+            proba += np.take(self.value, tree_leaves, axis=0)
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X):
+        """Predicted class label for each row."""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
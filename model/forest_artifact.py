@@ -0,0 +1,198 @@
+"""
+Compiled Forest Artifact
+Versioned, checksummed binary file holding a CompiledForest's flat arrays,
+the scaler parameters and the model metadata, loadable with NumPy alone
+"""
+
+import hashlib
+import json
+import struct
+
+import numpy as np
+
+from compiled_forest import CompiledForest
+
+MAGIC = b'RKFOREST'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+ARTIFACT_SUFFIX = '.forest'
+
+# magic, format version, header length
+_PREAMBLE = struct.Struct('<8sII')
+
+_ARRAYS = {
+    'feature': '<i4',
+    'threshold': '<f8',
+    'children': '<i4',
+    'value': '<f8',
+    'roots': '<i4',
+    'scaler_mean': '<f8',
+    'scaler_scale': '<f8',
+}
+_REQUIRED_ARRAYS = ('feature', 'threshold', 'children', 'value', 'roots')
+_HEADER_KEYS = {'checksum': dict, 'arrays': dict, 'classes': list, 'feature_columns': list,
+                'max_depth': int, 'model_info': dict}
+
+
+class ArtifactError(ValueError):
+    """The file is not a valid compiled forest artifact."""
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def save_forest(path, engine, model_info):
+    """
+    Write ``engine`` and ``model_info`` to a compiled forest artifact.
+
+    Layout: an 8-byte magic, the format version and header length, a JSON
+    header (metadata, array table and SHA-256 of the data section), then
+    every array little-endian at a 64-byte aligned offset so it can be
+    memory-mapped in place.
+
+    Returns:
+        str: Hex SHA-256 of the data section
+    """
+    arrays = {}
+    for name, dtype in _ARRAYS.items():
+        array = getattr(engine, name)
+        if array is None:
+            continue
+        arrays[name] = np.ascontiguousarray(array, dtype=dtype)
+
+    table, offset = {}, 0
+    for name, array in arrays.items():
+        offset = _aligned(offset)
+        table[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+    data = bytearray(offset)
+    for name, array in arrays.items():
+        start = table[name]['offset']
+        data[start:start + array.nbytes] = array.tobytes()
+    digest = hashlib.sha256(data).hexdigest()
+
+    header = json.dumps({
+        'format_version': FORMAT_VERSION,
+        'checksum': {'algorithm': 'sha256', 'digest': digest},
+        'arrays': table,
+        'classes': [str(c) for c in engine.classes_],
+        'feature_columns': engine.feature_columns,
+        'max_depth': engine.max_depth,
+        'model_info': model_info
+    }).encode()
+    data_offset = _aligned(_PREAMBLE.size + len(header))
+
+    with open(path, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+        f.write(header)
+        f.write(b'\0' * (data_offset - _PREAMBLE.size - len(header)))
+        f.write(data)
+    return digest
+
+
+def load_forest(path, mmap=True, verify=True):
+    """
+    Load a compiled forest artifact.
+
+    Args:
+        path (str): Artifact file
+        mmap (bool): Map the arrays read-only from the file instead of reading
+            them, so processes serving the same file share its pages
+        verify (bool): Check the SHA-256 of the data section
+
+    Returns:
+        tuple: (CompiledForest, model_info dict)
+
+    Raises:
+        ArtifactError: If the file is truncated, corrupt, inconsistent or of
+            another format version
+    """
+    buffer = np.memmap(path, dtype=np.uint8, mode='r') if mmap else np.fromfile(path, dtype=np.uint8)
+    if len(buffer) < _PREAMBLE.size:
+        raise ArtifactError(f"{path} is too short to be a compiled forest artifact")
+
+    magic, version, header_length = _PREAMBLE.unpack(buffer[:_PREAMBLE.size].tobytes())
+    if magic != MAGIC:
+        raise ArtifactError(f"{path} is not a compiled forest artifact")
+    if version != FORMAT_VERSION:
+        raise ArtifactError(f"{path} has format version {version}, expected {FORMAT_VERSION}")
+    try:
+        header = json.loads(buffer[_PREAMBLE.size:_PREAMBLE.size + header_length].tobytes())
+    except ValueError as e:
+        raise ArtifactError(f"{path} has a corrupt header: {e}")
+    _check_header(path, header)
+
+    # Plain ndarray views keep the mapping alive without memmap subclass overhead
+    data = buffer[_aligned(_PREAMBLE.size + header_length):].view(np.ndarray)
+    if verify:
+        digest = hashlib.sha256(data).hexdigest()
+        if digest != header['checksum']['digest']:
+            raise ArtifactError(f"{path} failed its checksum (expected {header['checksum']['digest']}, got {digest})")
+
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape']))
+        end = spec['offset'] + count * dtype.itemsize
+        if end > len(data):
+            raise ArtifactError(f"{path} is truncated (array {name})")
+        arrays[name] = data[spec['offset']:end].view(dtype).reshape(spec['shape'])
+    _check_nodes(path, arrays, len(header['classes']), len(header['feature_columns']))
+
+    engine = CompiledForest(
+        classes=np.array(header['classes'], dtype=object),
+        feature_columns=header['feature_columns'],
+        max_depth=header['max_depth'],
+        **arrays
+    )
+    return engine, header['model_info']
+
+
+def _check_header(path, header):
+    """Raise ArtifactError unless the header has every key and array entry load_forest reads."""
+    if not isinstance(header, dict):
+        raise ArtifactError(f"{path} has a corrupt header: not an object")
+    for key, kind in _HEADER_KEYS.items():
+        if not isinstance(header.get(key), kind):
+            raise ArtifactError(f"{path} has a corrupt header: '{key}' is missing or not a {kind.__name__}")
+    if not isinstance(header['checksum'].get('digest'), str):
+        raise ArtifactError(f"{path} has a corrupt header: 'checksum' has no digest")
+    for name in _REQUIRED_ARRAYS:
+        if name not in header['arrays']:
+            raise ArtifactError(f"{path} has a corrupt header: array {name} is missing")
+    for name, spec in header['arrays'].items():
+        if name not in _ARRAYS:
+            raise ArtifactError(f"{path} has a corrupt header: unknown array {name}")
+        if (not isinstance(spec, dict) or spec.get('dtype') != _ARRAYS[name]
+                or not isinstance(spec.get('offset'), int) or spec['offset'] < 0
+                or not isinstance(spec.get('shape'), list)
+                or not all(isinstance(n, int) and n >= 0 for n in spec['shape'])):
+            raise ArtifactError(f"{path} has a corrupt header: bad entry for array {name}")
+
+
+def _check_nodes(path, arrays, n_classes, n_features):
+    """
+    Raise ArtifactError unless every node index is in range.
+
+    Evaluation uses ``np.take(..., mode='wrap')`` to skip bounds checks, so
+    an out-of-range child or feature index would silently read the wrong
+    node instead of failing; it is checked here once instead.
+    """
+    n_nodes = len(arrays['threshold'])
+    shapes = {
+        'feature': (n_nodes,),
+        'threshold': (n_nodes,),
+        'children': (2 * n_nodes,),
+        'value': (n_nodes, n_classes),
+    }
+    for name, shape in shapes.items():
+        if arrays[name].shape != shape:
+            raise ArtifactError(f"{path} is inconsistent: array {name} has shape "
+                                f"{arrays[name].shape}, expected {shape}")
+    if arrays['roots'].ndim != 1 or len(arrays['roots']) == 0:
+        raise ArtifactError(f"{path} is inconsistent: no trees")
+    for name, limit in (('children', n_nodes), ('roots', n_nodes), ('feature', n_features)):
+        values = arrays[name]
+        if len(values) and (values.min() < 0 or values.max() >= limit):
+            raise ArtifactError(f"{path} is inconsistent: {name} indices must be in [0, {limit})")
@@ -5,11 +5,19 @@ Provides easy-to-use functions for loading and using the trained model
 
 import joblib
 import json
+import threading
+import time
 import numpy as np
-import pandas as pd
 from datetime import datetime, timedelta
 import random
 
+from compiled_forest import CompiledForest
+from forest_artifact import ARTIFACT_SUFFIX, load_forest
+from forest_explainer import ForestExplainer
+
+# Model tiers selectable per prediction: the full forest and its distilled companion
+TIERS = ('full', 'fast')
+
 class RockfallPredictor:
     """
     Rockfall risk prediction system wrapper.
@@ -17,17 +25,59 @@ class RockfallPredictor:
     """
     
     def __init__(self, model_path='rockfall_model.pkl', scaler_path='feature_scaler.pkl', 
-                 info_path='model_info.json'):
-        """Initialize the predictor with trained model components."""
+                 info_path='model_info.json', use_compiled=True, mmap_mode=None,
+                 fast_model_path=None):
+        """
+        Initialize the predictor with trained model components.
+        
+        With ``use_compiled`` the forest and scaler are also compiled into a
+        flat-array engine that gives bit-identical probabilities at a fraction
+        of sklearn's per-call overhead. ``mmap_mode`` is passed to
+        ``joblib.load`` (e.g. ``'r'`` to map the pickled arrays read-only).
+        
+        A ``model_path`` ending in ``.forest`` is a compiled forest artifact
+        (see forest_artifact.py) that already holds the scaler and model info;
+        it loads without sklearn or unpickling and is memory-mapped when
+        ``mmap_mode`` is set. ``scaler_path`` and ``info_path`` are ignored,
+        and predictions always use the compiled engine.
+        
+        ``fast_model_path`` optionally loads the distilled fast-tier model
+        written by train_model.py (a ``.forest`` artifact, or a pickle that
+        shares the full model's scaler), selected with ``tier='fast'``.
+        
+        Each tier's ForestExplainer (node value deltas, and for sklearn-only
+        tiers a compiled copy of the forest) is built on the first explained
+        prediction of that tier, so predictors that never explain skip it.
+        
+        ``stage_timer`` may be set to a callable ``(stage, seconds)`` that
+        receives the duration of each prediction stage (feature_assembly,
+        scaling, tree_evaluation, explanation, result_formatting) for
+        monitoring.
+        """
+        self.stage_timer = None
         try:
-            self.model = joblib.load(model_path)
-            self.scaler = joblib.load(scaler_path)
-            
-            with open(info_path, 'r') as f:
-                self.model_info = json.load(f)
+            if str(model_path).endswith(ARTIFACT_SUFFIX):
+                self.model = self.scaler = None
+                self.engine, self.model_info = load_forest(model_path, mmap=mmap_mode is not None)
+            else:
+                self.model = joblib.load(model_path, mmap_mode=mmap_mode)
+                self.scaler = joblib.load(scaler_path, mmap_mode=mmap_mode)
+                
+                with open(info_path, 'r') as f:
+                    self.model_info = json.load(f)
+                self.engine = None
             
             self.feature_columns = self.model_info['feature_columns']
             self.risk_categories = self.model_info['risk_categories']
+            if self.engine is None and use_compiled:
+                self.engine = CompiledForest.from_sklearn(self.model, self.scaler, self.feature_columns)
+            self.classes_ = self.engine.classes_ if self.engine is not None else self.model.classes_
+            
+            self.tiers = {'full': (self.model, self.engine)}
+            if fast_model_path:
+                self.tiers['fast'] = self._load_fast_tier(fast_model_path, use_compiled, mmap_mode)
+            self.explainers = {}  # tier -> ForestExplainer, built on first use
+            self._explainer_lock = threading.Lock()
             print(f"✅ Rockfall predictor loaded successfully")
             print(f"   Model trained: {self.model_info.get('trained_date', 'Unknown')}")
             print(f"   Accuracy: {self.model_info.get('training_accuracy', 0):.1%}")
@@ -37,67 +87,213 @@ class RockfallPredictor:
             print("   Please run train_model.py first to create the model")
             raise
     
-    def predict(self, input_data):
+    def _load_fast_tier(self, path, use_compiled, mmap_mode):
+        """Load the fast-tier model as a (model, engine) pair."""
+        if str(path).endswith(ARTIFACT_SUFFIX):
+            model, (engine, _) = None, load_forest(path, mmap=mmap_mode is not None)
+        elif self.scaler is None:
+            raise ValueError("A pickled fast-tier model needs the pickled full model's scaler")
+        else:
+            model = joblib.load(path, mmap_mode=mmap_mode)
+            engine = (CompiledForest.from_sklearn(model, self.scaler, self.feature_columns)
+                      if use_compiled else None)
+        
+        classes = engine.classes_ if engine is not None else model.classes_
+        if list(classes) != list(self.classes_):
+            raise ValueError(f"Fast-tier classes {list(classes)} do not match {list(self.classes_)}")
+        return model, engine
+    
+    def explainer(self, tier):
+        """The ForestExplainer of a (resolved) tier, built once on first use."""
+        explainer = self.explainers.get(tier)
+        if explainer is None:
+            with self._explainer_lock:
+                explainer = self.explainers.get(tier)
+                if explainer is None:
+                    # Explanations walk the compiled arrays, so sklearn-only tiers get compiled for them
+                    model, engine = self.tiers[tier]
+                    explainer = self.explainers[tier] = ForestExplainer(
+                        engine if engine is not None
+                        else CompiledForest.from_sklearn(model, self.scaler, self.feature_columns))
+        return explainer
+    
+    def resolve_tier(self, tier):
+        """
+        Return the tier that will serve ``tier`` requests.
+        
+        ``'fast'`` falls back to ``'full'`` when no fast-tier model is loaded.
+        
+        Raises:
+            ValueError: If ``tier`` is not one of TIERS
+        """
+        if tier not in TIERS:
+            raise ValueError(f"Unknown tier: {tier} (expected one of {', '.join(TIERS)})")
+        return tier if tier in self.tiers else 'full'
+    
+    def predict(self, input_data, tier='full', explain=False):
         """
         Predict rockfall risk from input features.
         
         Args:
             input_data (dict): Dictionary containing feature values
+            tier (str): 'full' forest or distilled 'fast' model
+            explain (bool): Add per-feature contributions (see predict_batch)
             
         Returns:
             dict: Prediction results with probability and category
         """
-        try:
-            # Convert input to DataFrame
-            if isinstance(input_data, dict):
-                df = pd.DataFrame([input_data])
-            else:
-                df = pd.DataFrame(input_data)
-            
-            # Ensure all required features are present
-            for feature in self.feature_columns:
-                if feature not in df.columns:
-                    raise ValueError(f"Missing required feature: {feature}")
-            
-            # Select and order features correctly
-            X = df[self.feature_columns]
-            
-            # Scale features
-            X_scaled = self.scaler.transform(X)
-            
-            # Get predictions
-            risk_category = self.model.predict(X_scaled)[0]
-            risk_probabilities = self.model.predict_proba(X_scaled)[0]
-            
-            # Calculate overall risk score (0-100)
-            category_to_score = {'Low': 15, 'Medium': 40, 'High': 70, 'Critical': 90}
-            base_score = category_to_score.get(risk_category, 50)
-            
-            # Add some variation based on prediction confidence
-            max_prob = max(risk_probabilities)
-            confidence_adjustment = (max_prob - 0.5) * 20  # -10 to +10 adjustment
-            risk_score = max(0, min(100, base_score + confidence_adjustment))
-            
-            # Prepare result
-            result = {
-                'risk_category': risk_category,
-                'risk_probability': round(risk_score, 1),
-                'confidence': round(max_prob * 100, 1),
-                'prediction_time': datetime.now().isoformat(),
-                'category_probabilities': {
-                    category: round(prob * 100, 1)
-                    for category, prob in zip(self.risk_categories, risk_probabilities)
-                }
-            }
+        return self.predict_batch(input_data, tier, explain)[0]
+    
+    def predict_batch(self, input_data, tier='full', explain=False):
+        """
+        Predict rockfall risk for many readings with a single model call.
+        
+        Args:
+            input_data: A reading dict, a list of reading dicts, a columnar
+                dict mapping each feature name to a sequence of values, or a
+                matrix with columns in ``feature_columns`` order
+            tier (str): 'full' forest or distilled 'fast' model
+            explain (bool): Add an ``explanation`` to each result: how much
+                each feature moved the predicted category's probability away
+                from the model's baseline, in percentage points
             
-            return result
+        Returns:
+            list: One prediction result per reading, in input order
+        """
+        try:
+            tier = self.resolve_tier(tier)
+            X = self._timed('feature_assembly', self._feature_matrix, input_data)
+            probabilities = self.predict_proba_matrix(X, tier)
+            results = self._timed('result_formatting', self._format_results, probabilities, tier)
+            if explain:
+                explanations = self._timed('explanation', self.explainer(tier).explain,
+                                           X, np.argmax(probabilities, axis=1))
+                for result, explanation in zip(results, explanations):
+                    result['explanation'] = explanation
+            return results
             
         except Exception as e:
             print(f"❌ Prediction error: {e}")
             raise
     
+    def predict_proba_matrix(self, X, tier='full'):
+        """Return class probabilities (columns in ``classes_`` order) for a raw feature matrix."""
+        model, engine = self.tiers[self.resolve_tier(tier)]
+        if engine is not None:
+            # Scaling is folded into the compiled thresholds
+            return self._timed('tree_evaluation', engine.predict_proba, X)
+        
+        X_scaled = self._timed('scaling', self._scale, X)
+        return self._timed('tree_evaluation', model.predict_proba, X_scaled)
+    
+    def _scale(self, X):
+        """Scale features (same arithmetic as StandardScaler.transform)."""
+        return (X - self.scaler.mean_) / self.scaler.scale_
+    
+    def _timed(self, stage, func, *args):
+        """Run one prediction stage, reporting its duration to ``stage_timer`` if set."""
+        if self.stage_timer is None:
+            return func(*args)
+        start = time.perf_counter()
+        result = func(*args)
+        self.stage_timer(stage, time.perf_counter() - start)
+        return result
+    
+    def _feature_matrix(self, input_data):
+        """Assemble a float64 matrix with columns in ``feature_columns`` order."""
+        if isinstance(input_data, np.ndarray):
+            # Already assembled (e.g. a validated batch)
+            X = np.asarray(input_data, dtype=np.float64)
+            if X.ndim != 2 or X.shape[1] != len(self.feature_columns):
+                raise ValueError(f"Expected a matrix with {len(self.feature_columns)} feature columns")
+            if X.shape[0] == 0:
+                raise ValueError("No readings provided")
+            return X
+        
+        if isinstance(input_data, dict):
+            first = input_data.get(self.feature_columns[0])
+            if isinstance(first, (list, tuple, np.ndarray)):
+                columns = input_data
+            else:
+                input_data = [input_data]
+                columns = None
+        elif hasattr(input_data, 'columns'):
+            columns = input_data  # pandas DataFrame
+        else:
+            columns = None
+        
+        # Ensure all required features are present
+        for feature in self.feature_columns:
+            if columns is not None:
+                if feature not in columns:
+                    raise ValueError(f"Missing required feature: {feature}")
+            else:
+                for row in input_data:
+                    if feature not in row:
+                        raise ValueError(f"Missing required feature: {feature}")
+        
+        if columns is not None:
+            X = np.column_stack([np.asarray(columns[feature], dtype=np.float64)
+                                 for feature in self.feature_columns])
+        else:
+            X = np.array([[row[feature] for feature in self.feature_columns]
+                          for row in input_data], dtype=np.float64)
+        
+        if X.ndim != 2 or X.shape[0] == 0:
+            raise ValueError("No readings provided")
+        return X
+    
+    def risk_scores(self, probabilities):
+        """
+        Winning class and overall risk score for each row of a probability matrix.
+        
+        Returns:
+            tuple: (winning column in ``classes_``, its probability, risk score 0-100)
+        """
+        winners = np.argmax(probabilities, axis=1)
+        max_probs = probabilities[np.arange(len(probabilities)), winners]
+        
+        # Calculate overall risk score (0-100)
+        category_to_score = {'Low': 15, 'Medium': 40, 'High': 70, 'Critical': 90}
+        base_scores = np.array([category_to_score.get(c, 50) for c in self.classes_])[winners]
+        
+        # Add some variation based on prediction confidence
+        confidence_adjustment = (max_probs - 0.5) * 20  # -10 to +10 adjustment
+        return winners, max_probs, np.clip(base_scores + confidence_adjustment, 0, 100)
+    
+    def _format_results(self, probabilities, tier='full'):
+        """Turn a probability matrix into per-row result dictionaries."""
+        classes = self.classes_
+        winners, max_probs, risk_scores = self.risk_scores(probabilities)
+        
+        # Report category probabilities in risk_categories order; predict_proba
+        # columns follow the (alphabetical) classes_ order
+        class_index = {c: i for i, c in enumerate(classes)}
+        ordered = [(category, class_index[category]) for category in self.risk_categories
+                   if category in class_index]
+        prediction_time = datetime.now().isoformat()
+        
+        results = []
+        for row, winner, max_prob, risk_score in zip(probabilities, winners, max_probs, risk_scores):
+            results.append({
+                'risk_category': str(classes[winner]),
+                'risk_probability': round(float(risk_score), 1),
+                'confidence': round(float(max_prob) * 100, 1),
+                'prediction_time': prediction_time,
+                'model_tier': tier,
+                'category_probabilities': {
+                    category: round(float(row[i]) * 100, 1)
+                    for category, i in ordered
+                }
+            })
+        
+        return results
+    
     def get_feature_importance(self):
         """Get feature importance scores from the trained model."""
+        if self.model is None:
+            importances = self.model_info.get('feature_importance')
+            return sorted(importances.items(), key=lambda x: x[1], reverse=True) if importances else None
         if hasattr(self.model, 'feature_importances_'):
             importance_data = list(zip(self.feature_columns, self.model.feature_importances_))
             importance_data.sort(key=lambda x: x[1], reverse=True)
@@ -145,16 +341,13 @@ def load_predictor():
 def generate_sample_data(n_samples=10):
     """Generate multiple samples of mock sensor data."""
     predictor = RockfallPredictor()
-    samples = []
+    samples = [predictor.generate_mock_sensor_data() for _ in range(n_samples)]
     
-    for i in range(n_samples):
-        sample = predictor.generate_mock_sensor_data()
-        prediction = predictor.predict(sample)
+    for sample, prediction in zip(samples, predictor.predict_batch(samples)):
         sample.update({
             'predicted_risk': prediction['risk_category'],
             'predicted_probability': prediction['risk_probability']
         })
-        samples.append(sample)
     
     return samples
 
@@ -0,0 +1,240 @@
+"""
+Model Selection Sweep
+Trains a grid of forest configurations in a process pool and measures each
+one's cross-validated accuracy, inference latency and size, then reports
+the Pareto frontier of accuracy against serving cost
+"""
+
+import argparse
+import itertools
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import StratifiedKFold
+from sklearn.preprocessing import StandardScaler
+
+from compiled_forest import CompiledForest
+from train_model import FEATURE_COLUMNS, RISK_CATEGORIES, generate_training_arrays
+
+# Objectives used for the Pareto frontier: (result key, True if higher is better)
+OBJECTIVES = [
+    ('cv_accuracy', True),
+    ('single_row_ms', False),
+    ('batch_row_us', False),
+    ('memory_kb', False),
+]
+
+
+def prepare_folds(cache_dir, n_samples, seed, n_folds):
+    """
+    Generate and scale the sweep dataset once and cache it for the workers.
+
+    The feature matrix is written with joblib and reopened memory-mapped, so
+    every worker process shares the same pages instead of holding its own
+    copy. The scaler is fitted on the whole sweep dataset; it only shifts
+    split thresholds and does not change which trees are grown.
+
+    Returns:
+        tuple: (path of the cached dataset, list of (train, test) index pairs)
+    """
+    X, codes, _ = generate_training_arrays(n_samples, seed)
+    y = np.asarray(RISK_CATEGORIES, dtype=object)[codes]
+    scaler = StandardScaler().fit(X)
+    X = np.ascontiguousarray(scaler.transform(X))
+
+    folds = list(StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed).split(X, codes))
+    path = os.path.join(cache_dir, 'sweep_data.joblib')
+    joblib.dump({'X': X, 'y': y, 'scaler': scaler}, path)
+    return path, folds
+
+
+def evaluate_config(config, data_path, folds, seed, model_dir):
+    """
+    Cross-validate one configuration (runs in a worker process).
+
+    The model fitted on the first fold is saved to ``model_dir`` so that the
+    parent process can time it without other workers competing for the CPU.
+    """
+    data = joblib.load(data_path, mmap_mode='r')
+    X, y = data['X'], data['y']
+
+    scores, fit_seconds = [], []
+    model_path = None
+    for fold, (train, test) in enumerate(folds):
+        # Settings not swept keep their train_model.py values
+        params = {'min_samples_split': 5, **config}
+        model = RandomForestClassifier(random_state=seed, n_jobs=1, **params)
+        start = time.perf_counter()
+        model.fit(X[train], y[train])
+        fit_seconds.append(time.perf_counter() - start)
+        scores.append(float(np.mean(model.predict(X[test]) == y[test])))
+
+        if fold == 0:
+            name = '_'.join(f'{k}{v}' for k, v in sorted(config.items()))
+            model_path = os.path.join(model_dir, f'{name}.pkl')
+            joblib.dump(model, model_path)
+
+    return {
+        **config,
+        'cv_accuracy': round(float(np.mean(scores)), 4),
+        'cv_accuracy_std': round(float(np.std(scores)), 4),
+        'fit_seconds': round(float(np.mean(fit_seconds)), 3),
+        'model_path': model_path
+    }
+
+
+def measure_serving_cost(result, scaler, X_sample, repeat=200, batch_size=1000):
+    """Add latency and size measurements of the compiled engine to ``result``."""
+    model = joblib.load(result['model_path'])
+    engine = CompiledForest.from_sklearn(model, scaler, FEATURE_COLUMNS)
+
+    row = X_sample[:1]
+    batch = X_sample[:batch_size]
+    engine.predict_proba(row)  # warm up
+
+    single = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        engine.predict_proba(row)
+        single.append(time.perf_counter() - start)
+
+    batched = []
+    for _ in range(max(3, repeat // 20)):
+        start = time.perf_counter()
+        engine.predict_proba(batch)
+        batched.append(time.perf_counter() - start)
+
+    result.update({
+        'n_nodes': engine.n_nodes,
+        'single_row_ms': round(float(np.median(single)) * 1000, 4),
+        'single_row_p99_ms': round(float(np.percentile(single, 99)) * 1000, 4),
+        'batch_row_us': round(float(np.median(batched)) / len(batch) * 1e6, 3),
+        'memory_kb': round(engine.nbytes / 1024, 1),
+        'disk_kb': round(os.path.getsize(result['model_path']) / 1024, 1)
+    })
+    return result
+
+
+def pareto_frontier(results, objectives=OBJECTIVES):
+    """Indices of results not dominated on every objective by another result."""
+    def at_least_as_good(a, b):
+        return all((a[k] >= b[k]) if higher else (a[k] <= b[k]) for k, higher in objectives)
+
+    frontier = []
+    for i, candidate in enumerate(results):
+        dominated = any(
+            at_least_as_good(other, candidate) and any(other[k] != candidate[k] for k, _ in objectives)
+            for j, other in enumerate(results) if j != i
+        )
+        if not dominated:
+            frontier.append(i)
+    return frontier
+
+
+def run_sweep(grid, n_samples=20000, n_folds=3, seed=42, workers=None, output_dir='sweep'):
+    """Run the whole sweep and write ``sweep_report.json`` and ``sweep_report.md``."""
+    os.makedirs(output_dir, exist_ok=True)
+    configs = [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+
+    with tempfile.TemporaryDirectory(prefix='rockfall-sweep-') as cache_dir:
+        print(f"📦 Caching {n_samples:,} samples and {n_folds} folds")
+        data_path, folds = prepare_folds(cache_dir, n_samples, seed, n_folds)
+
+        print(f"🌲 Training {len(configs)} configurations on {workers or os.cpu_count()} worker(s)")
+        results = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(evaluate_config, config, data_path, folds, seed, cache_dir)
+                       for config in configs]
+            for future in futures:
+                result = future.result()
+                results.append(result)
+                print(f"   {len(results):>3}/{len(configs)} "
+                      f"{json.dumps({k: result[k] for k in grid})}: accuracy {result['cv_accuracy']:.3f}")
+
+        print("⏱️ Measuring inference cost")
+        data = joblib.load(data_path, mmap_mode='r')
+        X_sample = data['scaler'].inverse_transform(np.asarray(data['X'][:1000]))
+        for result in results:
+            measure_serving_cost(result, data['scaler'], X_sample)
+            del result['model_path']
+
+    frontier = set(pareto_frontier(results))
+    for i, result in enumerate(results):
+        result['pareto'] = i in frontier
+    results.sort(key=lambda r: (not r['pareto'], -r['cv_accuracy'], r['single_row_ms']))
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'n_samples': n_samples,
+        'n_folds': n_folds,
+        'seed': seed,
+        'grid': grid,
+        'objectives': {key: 'max' if higher else 'min' for key, higher in OBJECTIVES},
+        'results': results
+    }
+    with open(os.path.join(output_dir, 'sweep_report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+    with open(os.path.join(output_dir, 'sweep_report.md'), 'w') as f:
+        f.write(format_report(report))
+    return report
+
+
+def format_report(report):
+    """Markdown table of all configurations, Pareto-optimal ones first."""
+    keys = list(report['grid'])
+    lines = [
+        '# Model Sweep Report',
+        '',
+        f"{report['n_samples']:,} samples, {report['n_folds']}-fold CV, seed {report['seed']}. "
+        "Latency is the compiled engine (single row: median per call; batch: per row in 1000-row batches).",
+        '',
+        '| ' + ' | '.join(keys + ['CV accuracy', 'single row ms', 'p99 ms', 'batch µs/row',
+                                  'memory KB', 'disk KB', 'nodes', 'Pareto']) + ' |',
+        '|' + '---|' * (len(keys) + 8)
+    ]
+    for r in report['results']:
+        cells = [str(r[k]) for k in keys] + [
+            f"{r['cv_accuracy']:.4f} ± {r['cv_accuracy_std']:.4f}",
+            f"{r['single_row_ms']:.4f}", f"{r['single_row_p99_ms']:.4f}", f"{r['batch_row_us']:.3f}",
+            f"{r['memory_kb']:.0f}", f"{r['disk_kb']:.0f}", str(r['n_nodes']),
+            '✅' if r['pareto'] else ''
+        ]
+        lines.append('| ' + ' | '.join(cells) + ' |')
+    return '\n'.join(lines) + '\n'
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Sweep forest configurations for accuracy vs inference cost')
+    parser.add_argument('--samples', type=int, default=20000)
+    parser.add_argument('--folds', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--n-estimators', type=int, nargs='+', default=[25, 50, 100])
+    parser.add_argument('--max-depth', type=int, nargs='+', default=[6, 10, 14])
+    parser.add_argument('--min-samples-leaf', type=int, nargs='+', default=[2, 5])
+    parser.add_argument('--workers', type=int, help='Worker processes (default: all cores)')
+    parser.add_argument('--output-dir', default='sweep')
+    args = parser.parse_args()
+
+    print("🔬 Rockfall Model Sweep")
+    print("=" * 50)
+
+    report = run_sweep(
+        {'n_estimators': args.n_estimators, 'max_depth': args.max_depth,
+         'min_samples_leaf': args.min_samples_leaf},
+        n_samples=args.samples, n_folds=args.folds, seed=args.seed,
+        workers=args.workers, output_dir=args.output_dir
+    )
+
+    print("\n🏆 Pareto frontier:")
+    for r in report['results']:
+        if r['pareto']:
+            print(f"   trees={r['n_estimators']:<4} depth={r['max_depth']:<3} leaf={r['min_samples_leaf']:<2} "
+                  f"accuracy {r['cv_accuracy']:.3f}  single {r['single_row_ms']:.3f} ms  "
+                  f"batch {r['batch_row_us']:.2f} µs/row  {r['memory_kb']:.0f} KB")
+    print(f"\n💾 Report saved to {args.output_dir}/sweep_report.md and sweep_report.json")
@@ -3,6 +3,7 @@ Rockfall Risk Prediction Model Training Script
 Creates a trained model for predicting rockfall risk in open-pit mines
 """
 
+import argparse
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
@@ -11,58 +12,138 @@ from sklearn.metrics import accuracy_score, classification_report
 from sklearn.preprocessing import StandardScaler
 import joblib
 import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
 from datetime import datetime
 
-def generate_synthetic_training_data(n_samples=5000):
+from compiled_forest import CompiledForest
+from forest_artifact import save_forest
+
+FEATURE_COLUMNS = [
+    'slope_angle', 'joint_spacing', 'joint_orientation', 'rock_strength',
+    'weathering_index', 'rainfall_24h', 'rainfall_7d', 'temperature_variation',
+    'freeze_thaw_cycles', 'wind_speed', 'vibration_intensity', 'blast_distance',
+    'excavation_height', 'support_density', 'previous_rockfall_30d',
+    'maintenance_days_since'
+]
+RISK_CATEGORIES = ['Low', 'Medium', 'High', 'Critical']
+RISK_THRESHOLDS = [0.25, 0.5, 0.75]
+
+# Rows generated per block: bounds the temporaries of data generation
+DEFAULT_CHUNK_SIZE = 500_000
+
+# Distilled fast tier: a small forest fitted to the full forest's soft labels
+FAST_N_ESTIMATORS = 10
+FAST_MAX_DEPTH = 6
+DISTILL_MAX_SAMPLES = 200_000
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in megabytes."""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+@contextmanager
+def stage(name, report):
+    """
+    Time a training stage and record its memory use.
+
+    ``heap_peak_mb`` is the peak of Python/NumPy allocations during the stage
+    (from tracemalloc, when tracing is on); ``peak_rss_mb`` is the process
+    peak so far, which also covers memory allocated inside sklearn's C code.
+    """
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    yield
+    entry = {'stage': name, 'seconds': round(time.perf_counter() - start, 3),
+             'peak_rss_mb': round(peak_rss_mb(), 1)}
+    if tracing:
+        entry['heap_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+    report.append(entry)
+    print(f"   ⏱️ {name}: {entry['seconds']:.2f}s, peak RSS {entry['peak_rss_mb']:.0f} MB"
+          + (f", heap peak {entry['heap_peak_mb']:.0f} MB" if tracing else ""))
+
+
+@contextmanager
+def replace_atomically(path):
     """
-    Generate synthetic training data for rockfall prediction.
+    Yield a temporary path next to ``path`` and rename it into place afterwards.
+
+    A running server memory-maps the current artifacts and hot-reloads new
+    ones, so files are never rewritten in place.
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def generate_feature_block(rng, n_samples):
+    """
+    Draw ``n_samples`` rows of raw features from ``rng`` (a ``RandomState``).
     Features represent various geological, environmental, and structural factors.
     """
-    np.random.seed(42)
-    
     # Feature definitions based on real-world rockfall risk factors
     data = {
         # Geological factors
-        'slope_angle': np.random.normal(45, 15, n_samples),  # degrees
-        'joint_spacing': np.random.exponential(0.5, n_samples),  # meters
-        'joint_orientation': np.random.uniform(0, 360, n_samples),  # degrees
-        'rock_strength': np.random.normal(50, 20, n_samples),  # MPa
-        'weathering_index': np.random.uniform(0, 10, n_samples),  # 0-10 scale
-        
+        'slope_angle': rng.normal(45, 15, n_samples),  # degrees
+        'joint_spacing': rng.exponential(0.5, n_samples),  # meters
+        'joint_orientation': rng.uniform(0, 360, n_samples),  # degrees
+        'rock_strength': rng.normal(50, 20, n_samples),  # MPa
+        'weathering_index': rng.uniform(0, 10, n_samples),  # 0-10 scale
+
         # Environmental factors
-        'rainfall_24h': np.random.exponential(2, n_samples),  # mm
-        'rainfall_7d': np.random.exponential(10, n_samples),  # mm
-        'temperature_variation': np.random.normal(15, 8, n_samples),  # °C
-        'freeze_thaw_cycles': np.random.poisson(2, n_samples),  # count
-        'wind_speed': np.random.exponential(3, n_samples),  # m/s
-        
+        'rainfall_24h': rng.exponential(2, n_samples),  # mm
+        'rainfall_7d': rng.exponential(10, n_samples),  # mm
+        'temperature_variation': rng.normal(15, 8, n_samples),  # °C
+        'freeze_thaw_cycles': rng.poisson(2, n_samples),  # count
+        'wind_speed': rng.exponential(3, n_samples),  # m/s
+
         # Structural factors
-        'vibration_intensity': np.random.exponential(1, n_samples),  # mm/s
-        'blast_distance': np.random.uniform(50, 500, n_samples),  # meters
-        'excavation_height': np.random.normal(25, 10, n_samples),  # meters
-        'support_density': np.random.uniform(0, 1, n_samples),  # ratio
-        
+        'vibration_intensity': rng.exponential(1, n_samples),  # mm/s
+        'blast_distance': rng.uniform(50, 500, n_samples),  # meters
+        'excavation_height': rng.normal(25, 10, n_samples),  # meters
+        'support_density': rng.uniform(0, 1, n_samples),  # ratio
+
         # Historical factors
-        'previous_rockfall_30d': np.random.poisson(1, n_samples),  # count
-        'maintenance_days_since': np.random.exponential(15, n_samples),  # days
+        'previous_rockfall_30d': rng.poisson(1, n_samples),  # count
+        'maintenance_days_since': rng.exponential(15, n_samples),  # days
     }
-    
-    df = pd.DataFrame(data)
-    
+
     # Ensure realistic bounds
-    df['slope_angle'] = np.clip(df['slope_angle'], 10, 90)
-    df['joint_spacing'] = np.clip(df['joint_spacing'], 0.1, 5.0)
-    df['rock_strength'] = np.clip(df['rock_strength'], 10, 100)
-    df['excavation_height'] = np.clip(df['excavation_height'], 5, 100)
-    df['blast_distance'] = np.clip(df['blast_distance'], 50, 1000)
-    
-    return df
+    data['slope_angle'] = np.clip(data['slope_angle'], 10, 90)
+    data['joint_spacing'] = np.clip(data['joint_spacing'], 0.1, 5.0)
+    data['rock_strength'] = np.clip(data['rock_strength'], 10, 100)
+    data['excavation_height'] = np.clip(data['excavation_height'], 5, 100)
+    data['blast_distance'] = np.clip(data['blast_distance'], 50, 1000)
+
+    return data
 
-def calculate_risk_labels(df):
+
+def calculate_risk_labels(df, rng=None):
     """
     Calculate risk labels based on engineered risk score.
     This simulates expert knowledge for risk assessment.
+
+    Args:
+        df: DataFrame or dict of feature arrays
+        rng: ``RandomState`` for the label noise (default: global NumPy state)
+
+    Returns:
+        tuple: (category code array indexing ``RISK_CATEGORIES``, risk probability array)
     """
+    rng = rng if rng is not None else np.random
+
     # Risk scoring based on multiple factors
     risk_score = (
         (df['slope_angle'] / 90) * 0.25 +  # Steeper slopes = higher risk
@@ -72,113 +153,329 @@ def calculate_risk_labels(df):
         (df['rainfall_24h'] / 20) * 0.1 +  # More rain = higher risk
         (df['vibration_intensity'] / 5) * 0.1  # More vibration = higher risk
     )
-    
+
     # Add some randomness to make it more realistic
-    risk_score += np.random.normal(0, 0.1, len(df))
+    risk_score = np.asarray(risk_score, dtype=np.float64) + rng.normal(0, 0.1, len(risk_score))
     risk_score = np.clip(risk_score, 0, 1)
-    
-    # Convert to categorical labels
-    risk_labels = []
-    risk_probabilities = []
-    
-    for score in risk_score:
-        if score < 0.25:
-            risk_labels.append('Low')
-            risk_probabilities.append(score * 25)  # 0-25%
-        elif score < 0.5:
-            risk_labels.append('Medium')
-            risk_probabilities.append(25 + (score - 0.25) * 100)  # 25-50%
-        elif score < 0.75:
-            risk_labels.append('High')
-            risk_probabilities.append(50 + (score - 0.5) * 100)  # 50-75%
-        else:
-            risk_labels.append('Critical')
-            risk_probabilities.append(75 + (score - 0.75) * 100)  # 75-100%
-    
-    return risk_labels, risk_probabilities
-
-def train_rockfall_model():
+
+    # Convert to categories: Low 0-25%, Medium 25-50%, High 50-75%, Critical 75-100%
+    codes = np.digitize(risk_score, RISK_THRESHOLDS).astype(np.int8)
+    risk_probabilities = np.select(
+        [codes == 0],
+        [risk_score * 25],
+        default=25 * codes + (risk_score - 0.25 * codes) * 100
+    )
+
+    return codes, risk_probabilities
+
+
+def generate_training_arrays(n_samples=5000, seed=42, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Generate features and labels block by block into preallocated arrays.
+
+    Block ``b`` draws from ``RandomState(seed + b)``, so the data depends only
+    on ``seed`` and ``chunk_size``; with a single block it matches the
+    original unchunked generator exactly. ``X`` is column-major, like the
+    DataFrame it replaces, so column statistics sum in the same order.
+
+    Returns:
+        tuple: (X float64 matrix in ``FEATURE_COLUMNS`` order, category codes,
+        risk probabilities)
+    """
+    chunk_size = max(1, int(chunk_size))
+    X = np.empty((n_samples, len(FEATURE_COLUMNS)), dtype=np.float64, order='F')
+    codes = np.empty(n_samples, dtype=np.int8)
+    probabilities = np.empty(n_samples, dtype=np.float64)
+
+    for block, start in enumerate(range(0, n_samples, chunk_size)):
+        stop = min(start + chunk_size, n_samples)
+        rng = np.random.RandomState(seed + block)
+        data = generate_feature_block(rng, stop - start)
+        for j, column in enumerate(FEATURE_COLUMNS):
+            X[start:stop, j] = data[column]
+        codes[start:stop], probabilities[start:stop] = calculate_risk_labels(data, rng)
+
+    return X, codes, probabilities
+
+
+def take_rows(X, index):
+    """Rows of a column-major matrix, copied column by column into a new column-major matrix."""
+    out = np.empty((len(index), X.shape[1]), dtype=X.dtype, order='F')
+    for j in range(X.shape[1]):
+        np.take(X[:, j], index, out=out[:, j])
+    return out
+
+
+def generate_synthetic_training_data(n_samples=5000, seed=42, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Generate synthetic training data for rockfall prediction as a DataFrame.
+    Includes the ``risk_category`` and ``risk_probability`` labels.
+    """
+    X, codes, probabilities = generate_training_arrays(n_samples, seed, chunk_size)
+    df = pd.DataFrame(X, columns=FEATURE_COLUMNS)
+    df['risk_category'] = np.asarray(RISK_CATEGORIES, dtype=object)[codes]
+    df['risk_probability'] = probabilities
+    return df
+
+
+def distill_fast_model(teacher, X, n_estimators=FAST_N_ESTIMATORS, max_depth=FAST_MAX_DEPTH,
+                       max_samples=DISTILL_MAX_SAMPLES, seed=42, n_jobs=-1):
+    """
+    Fit a small forest to the soft labels of a trained forest.
+
+    Every row is repeated once per class it has probability for, labelled
+    with that class and weighted by the teacher's probability. Minimizing
+    weighted impurity on these rows fits the teacher's class distribution
+    rather than only its winning class, and the leaves store probability
+    vectors, so the student plugs into the same compiled engine.
+
+    Args:
+        teacher: Fitted RandomForestClassifier
+        X (np.ndarray): Scaled features (at most ``max_samples`` rows are used)
+        n_estimators (int): Trees in the fast model
+        max_depth (int): Depth limit of the fast model's trees
+
+    Returns:
+        RandomForestClassifier: The fast model (``n_jobs`` reset to None)
+    """
+    if len(X) > max_samples:
+        index = np.sort(np.random.RandomState(seed).choice(len(X), max_samples, replace=False))
+        X = take_rows(X, index)
+
+    soft = teacher.predict_proba(X)
+    keep = (soft > 0).ravel()
+    X_soft = np.repeat(X, soft.shape[1], axis=0)[keep]
+    y_soft = np.tile(teacher.classes_, len(X))[keep]
+
+    # Without bootstrapping, so that a row's per-class copies stay together
+    student = RandomForestClassifier(
+        n_estimators=n_estimators,
+        max_depth=max_depth,
+        min_samples_leaf=2,
+        bootstrap=False,
+        random_state=seed,
+        n_jobs=n_jobs
+    )
+    student.fit(X_soft, y_soft, sample_weight=soft.ravel()[keep])
+    student.set_params(n_jobs=None)
+    return student
+
+
+def measure_latency(engine, X, repeat=200):
+    """Median single-row latency (ms) and per-row batch cost (µs) of a compiled engine on raw rows."""
+    def median_seconds(batch, n):
+        engine.predict_proba(batch)  # warm up
+        timings = []
+        for _ in range(n):
+            start = time.perf_counter()
+            engine.predict_proba(batch)
+            timings.append(time.perf_counter() - start)
+        return float(np.median(timings))
+
+    X = np.ascontiguousarray(X)
+    return {
+        'single_row_ms': round(median_seconds(X[:1], repeat) * 1000, 4),
+        'batch_row_us': round(median_seconds(X, max(3, repeat // 20)) / len(X) * 1e6, 3)
+    }
+
+
+def train_rockfall_model(n_samples=5000, seed=42, n_jobs=-1, chunk_size=DEFAULT_CHUNK_SIZE,
+                         n_estimators=100, max_depth=10, output_dir='.',
+                         fast_n_estimators=FAST_N_ESTIMATORS, fast_max_depth=FAST_MAX_DEPTH):
     """
     Train the rockfall prediction model and save it along with preprocessing components.
+
+    The forest is fitted on ``n_jobs`` cores. Every tree's random state is
+    drawn from ``seed`` up front, so the fitted model is identical whatever
+    the number of jobs; ``n_jobs`` is reset before saving so that inference
+    in the API runs single-threaded with a deterministic summation order.
+
+    A fast-tier companion (``fast_n_estimators`` trees, 0 to skip) is then
+    distilled from the forest; its agreement with the full forest on the
+    test split is recorded under ``tiers`` in ``model_info.json``.
     """
-    print("🏗️ Generating synthetic training data...")
-    df = generate_synthetic_training_data(5000)
-    
-    print("📊 Calculating risk labels...")
-    risk_labels, risk_probabilities = calculate_risk_labels(df)
-    df['risk_category'] = risk_labels
-    df['risk_probability'] = risk_probabilities
-    
-    # Prepare features for training
-    feature_columns = [col for col in df.columns if col not in ['risk_category', 'risk_probability']]
-    X = df[feature_columns]
-    y = df['risk_category']
-    
-    print(f"🎯 Training on {len(X)} samples with {len(feature_columns)} features")
-    
-    # Split the data
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
-    
-    # Scale the features
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
-    
+    report = []
+
+    print(f"🏗️ Generating {n_samples:,} synthetic training samples...")
+    with stage('generate', report):
+        X, codes, probabilities = generate_training_arrays(n_samples, seed, chunk_size)
+        y = np.asarray(RISK_CATEGORIES, dtype=object)[codes]
+
+    print(f"🎯 Training on {len(X):,} samples with {len(FEATURE_COLUMNS)} features")
+
+    # Split the data (by index, so the feature matrix is copied only once)
+    with stage('split', report):
+        # Stratify on integer codes ranked like the category names: the
+        # same split as stratifying on the strings, without sorting objects
+        name_rank = np.argsort(np.argsort(RISK_CATEGORIES)).astype(np.int8)
+        train_idx, test_idx = train_test_split(np.arange(n_samples), test_size=0.2,
+                                               random_state=seed, stratify=name_rank[codes])
+        X_train, X_test = take_rows(X, train_idx), take_rows(X, test_idx)
+        y_train, y_test = y[train_idx], y[test_idx]
+        sample_idx = np.random.RandomState(seed).choice(n_samples, min(100, n_samples), replace=False)
+        sample = pd.DataFrame(X[sample_idx], columns=FEATURE_COLUMNS)
+        sample['risk_category'] = y[sample_idx]
+        sample['risk_probability'] = probabilities[sample_idx]
+        del X, codes, probabilities
+
+    # Scale the features in place (same arithmetic as StandardScaler.transform)
+    with stage('scale', report):
+        scaler = StandardScaler()
+        scaler.fit(X_train)
+        for X_part in (X_train, X_test):
+            for start in range(0, len(X_part), chunk_size):
+                block = X_part[start:start + chunk_size]
+                block -= scaler.mean_
+                block /= scaler.scale_
+
     # Train the model
     model = RandomForestClassifier(
-        n_estimators=100,
-        max_depth=10,
+        n_estimators=n_estimators,
+        max_depth=max_depth,
         min_samples_split=5,
         min_samples_leaf=2,
-        random_state=42
+        random_state=seed,
+        n_jobs=n_jobs
     )
-    
-    model.fit(X_train_scaled, y_train)
-    
+
+    with stage('fit', report):
+        model.fit(X_train, y_train)
+
     # Evaluate the model
-    y_pred = model.predict(X_test_scaled)
-    accuracy = accuracy_score(y_test, y_pred)
-    
+    with stage('evaluate', report):
+        y_pred = model.predict(X_test)
+        accuracy = accuracy_score(y_test, y_pred)
+
     print(f"✅ Model trained with accuracy: {accuracy:.3f}")
     print("\n📈 Classification Report:")
     print(classification_report(y_test, y_pred))
-    
+
+    fast_model = None
+    if fast_n_estimators:
+        print(f"⚡ Distilling fast tier ({fast_n_estimators} trees, depth {fast_max_depth})...")
+        with stage('distill', report):
+            fast_model = distill_fast_model(model, X_train, fast_n_estimators, fast_max_depth,
+                                            seed=seed, n_jobs=n_jobs)
+            fast_pred = fast_model.predict(X_test)
+            fast_accuracy = accuracy_score(y_test, fast_pred)
+            agreement = float(np.mean(fast_pred == y_pred))
+        print(f"✅ Fast tier accuracy: {fast_accuracy:.3f}, agrees with the full model on {agreement:.1%}")
+    model.set_params(n_jobs=None)
+
+    # Compiled engines, for the serving artifacts and tier latencies
+    engine = CompiledForest.from_sklearn(model, scaler, FEATURE_COLUMNS)
+    X_raw = X_test[:1000] * scaler.scale_ + scaler.mean_
+    tiers = {'full': {'n_estimators': n_estimators, 'max_depth': max_depth, 'accuracy': accuracy,
+                      **measure_latency(engine, X_raw)}}
+    if fast_model is not None:
+        fast_engine = CompiledForest.from_sklearn(fast_model, scaler, FEATURE_COLUMNS)
+        tiers['fast'] = {
+            'n_estimators': fast_n_estimators,
+            'max_depth': fast_max_depth,
+            'accuracy': fast_accuracy,
+            'agreement_rate': agreement,
+            **measure_latency(fast_engine, X_raw)
+        }
+
     # Save model components
     model_info = {
-        'feature_columns': feature_columns,
-        'risk_categories': ['Low', 'Medium', 'High', 'Critical'],
+        'feature_columns': FEATURE_COLUMNS,
+        'risk_categories': RISK_CATEGORIES,
         'training_accuracy': accuracy,
         'trained_date': datetime.now().isoformat(),
         'model_type': 'RandomForestClassifier',
-        'n_samples': len(X),
-        'n_features': len(feature_columns)
+        'n_samples': n_samples,
+        'n_features': len(FEATURE_COLUMNS),
+        'seed': seed,
+        'tiers': tiers,
+        'training_stages': report
     }
-    
+
     # Save all components
-    joblib.dump(model, 'rockfall_model.pkl')
-    joblib.dump(scaler, 'feature_scaler.pkl')
-    
-    with open('model_info.json', 'w') as f:
-        json.dump(model_info, f, indent=2)
-    
-    # Save sample data for testing
-    sample_data = df.sample(100).to_json(orient='records', indent=2)
-    with open('sample_data.json', 'w') as f:
-        f.write(sample_data)
-    
+    with stage('save', report):
+        os.makedirs(output_dir, exist_ok=True)
+        with replace_atomically(os.path.join(output_dir, 'rockfall_model.pkl')) as path:
+            joblib.dump(model, path)
+        with replace_atomically(os.path.join(output_dir, 'feature_scaler.pkl')) as path:
+            joblib.dump(scaler, path)
+        if fast_model is not None:
+            with replace_atomically(os.path.join(output_dir, 'rockfall_model_fast.pkl')) as path:
+                joblib.dump(fast_model, path)
+
+        # Save sample data for testing
+        with replace_atomically(os.path.join(output_dir, 'sample_data.json')) as path:
+            with open(path, 'w') as f:
+                f.write(sample.to_json(orient='records', indent=2))
+
+    with replace_atomically(os.path.join(output_dir, 'model_info.json')) as path:
+        with open(path, 'w') as f:
+            json.dump(model_info, f, indent=2)
+
+    # Pickle-free artifacts for serving; the full model's is written last so
+    # that a server watching it only sees a complete set of files
+    if fast_model is not None:
+        fast_info = {
+            **model_info,
+            'tier': 'fast',
+            'feature_importance': dict(zip(FEATURE_COLUMNS, fast_model.feature_importances_.tolist()))
+        }
+        with replace_atomically(os.path.join(output_dir, 'rockfall_model_fast.forest')) as path:
+            save_forest(path, fast_engine, fast_info)
+    artifact_info = {
+        **model_info,
+        'tier': 'full',
+        'feature_importance': dict(zip(FEATURE_COLUMNS, model.feature_importances_.tolist()))
+    }
+    with replace_atomically(os.path.join(output_dir, 'rockfall_model.forest')) as path:
+        save_forest(path, engine, artifact_info)
+
     print("💾 Model saved successfully!")
     print(f"   - rockfall_model.pkl (trained model)")
     print(f"   - feature_scaler.pkl (preprocessing)")
     print(f"   - model_info.json (metadata)")
+    print(f"   - rockfall_model.forest (compiled model, scaler and metadata for serving)")
+    if fast_model is not None:
+        print(f"   - rockfall_model_fast.pkl / rockfall_model_fast.forest (distilled fast tier)")
     print(f"   - sample_data.json (test data)")
-    
+
     return model, scaler, model_info
 
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Train the rockfall prediction model')
+    parser.add_argument('--samples', type=int, default=5000, help='Number of synthetic samples')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--n-jobs', type=int, default=-1, help='Cores used to fit the forest (-1 = all)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help='Rows generated and scaled per block (bounds temporary memory)')
+    parser.add_argument('--n-estimators', type=int, default=100)
+    parser.add_argument('--max-depth', type=int, default=10)
+    parser.add_argument('--fast-estimators', type=int, default=FAST_N_ESTIMATORS,
+                        help='Trees in the distilled fast tier (0 = no fast tier)')
+    parser.add_argument('--fast-max-depth', type=int, default=FAST_MAX_DEPTH)
+    parser.add_argument('--output-dir', default='.', help='Where to write the model artifacts')
+    parser.add_argument('--no-trace-memory', action='store_true',
+                        help='Skip tracemalloc heap tracking (reports peak RSS only)')
+    args = parser.parse_args()
+
     print("🚀 Training Rockfall Prediction Model")
     print("=" * 50)
-    
-    model, scaler, info = train_rockfall_model()
-    
+
+    if not args.no_trace_memory:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    model, scaler, info = train_rockfall_model(
+        n_samples=args.samples, seed=args.seed, n_jobs=args.n_jobs, chunk_size=args.chunk_size,
+        n_estimators=args.n_estimators, max_depth=args.max_depth, output_dir=args.output_dir,
+        fast_n_estimators=args.fast_estimators, fast_max_depth=args.fast_max_depth
+    )
+
+    print("\n⏱️ Stage breakdown:")
+    for entry in info['training_stages']:
+        print(f"   {entry['stage']:<10} {entry['seconds']:>9.2f}s   peak RSS {entry['peak_rss_mb']:>8.0f} MB"
+              + (f"   heap peak {entry['heap_peak_mb']:>8.0f} MB" if 'heap_peak_mb' in entry else ""))
+    print(f"   {'total':<10} {time.perf_counter() - start:>9.2f}s")
+
     print("\n🎉 Model training completed successfully!")
-    print(f"Ready to predict rockfall risk with {info['training_accuracy']:.1%} accuracy")
\ No newline at end of file
+    print(f"Ready to predict rockfall risk with {info['training_accuracy']:.1%} accuracy")